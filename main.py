@@ -1,42 +1,214 @@
 import logging
 import os
-import subprocess
+from pathlib import Path
 
 import requests
 
+from datafortelling_utils.arkiv import (
+    arkiver_dokumenter,
+    arkivversjon,
+    hent_arkiverte_dokumenter,
+)
+from datafortelling_utils.datakilde import DATAKILDE_MILJØVARIABEL
+from datafortelling_utils.dataloader import last_ned_snapshot
+from datafortelling_utils.figurer import skill_ut_figurer
+from datafortelling_utils.forberedt import FORBEREDT_MILJØVARIABEL, forbered_data
+from datafortelling_utils.helper import NÅ_MILJØVARIABEL
+from datafortelling_utils.konstanter import saksflyt_arkivversjon
+from datafortelling_utils.opplasting import (
+    DELVIS_OPPLASTING_MILJØVARIABEL,
+    finn_filer,
+    last_opp_endringer,
+)
+from datafortelling_utils.profilering import (
+    PROFILERING_MILJØVARIABEL,
+    fase,
+    skriv_kjørerapport,
+)
+from datafortelling_utils.rendercache import (
+    datafingeravtrykk,
+    datatidspunkt,
+    dokument_nøkkel,
+    lagre_rendercache,
+    uendrede_dokumenter,
+)
+from datafortelling_utils.rendering import (
+    les_minnemålinger,
+    logg_renderrapport,
+    minnebudsjett_mb,
+    render_dokument,
+    render_dokumenter,
+    skriv_minnemålinger,
+)
+from datafortelling_utils.snapshot import SNAPSHOT_MILJØVARIABEL
+
+PROJECT = "pia-prod-85b2"
+DATASET = "pia_bigquery_sink_v1_dataset_prod"
+SNAPSHOT_KATALOG = "snapshot"
+FORBEREDT_KATALOG = "forberedt"
+# Lokalt lager som beholdes mellom kjøringer, slik at hendelsestabeller kan hentes inkrementelt
+INKREMENTELT_LAGER_MILJØVARIABEL = "FIA_INKREMENTELT_LAGER"
+INKREMENTELT_LAGER = os.environ.get(INKREMENTELT_LAGER_MILJØVARIABEL)
+# Output fra forrige kjøring, gjenbrukes for dokumenter som ikke er endret
+RENDERCACHE = (
+    os.path.join(INKREMENTELT_LAGER, "render_cache") if INKREMENTELT_LAGER else None
+)
+# Frosne datafortellinger som rendres én gang og deretter kopieres inn i pages
+ARKIV = os.path.join(INKREMENTELT_LAGER, "arkiv") if INKREMENTELT_LAGER else None
+# Katalog for profiler fra hver kjerne, profilering er kun på når denne er satt
+PROFILERING = os.environ.get(PROFILERING_MILJØVARIABEL)
+
+RESULTATOMRÅDER = [
+    "norge",
+    "agder",
+    "innlandet",
+    "more_og_romsdal",
+    "nordland",
+    "oslo",
+    "ost-viken",
+    "rogaland",
+    "troms_og_finnmark",
+    "trondelag",
+    "vest-viken",
+    "vestfold_og_telemark",
+    "vestland",
+]
+DATAFORTELLINGER = ["sak", "samarbeid", "samarbeidsplan"]
+
 logging.basicConfig(
     level=logging.DEBUG, format="%(asctime)s - %(levelname)s - %(message)s"
 )
 
 
-def kjør_quarto_render(path_to_file: str) -> None:
-    logging.info(f"Kjører quarto render for {path_to_file}")
-    try:
-        result = subprocess.run(
-            ["quarto", "render", path_to_file],
-            check=True,
-            capture_output=True,
-            text=True,
+def lag_snapshot() -> None:
+    """
+    Henter alle tabeller fra BigQuery én gang før rendering.
+    Quarto-prosessene arver miljøvariabelen og leser data fra snapshot i stedet for BigQuery.
+    """
+    if os.environ.get(DATAKILDE_MILJØVARIABEL):
+        logging.info(
+            f"{DATAKILDE_MILJØVARIABEL} er satt, leser data fra {os.environ[DATAKILDE_MILJØVARIABEL]} med DuckDB"
         )
-        logging.info(f"Output fra quarto: \n{result.stdout} \n{result.stderr}")
-    except subprocess.CalledProcessError as e:
-        logging.error(f"Feil ved rendering av quarto dokument: {e.stderr}")
-        raise
+        return
+
+    logging.info(f"Lager snapshot av {PROJECT}.{DATASET} i {SNAPSHOT_KATALOG}")
+    last_ned_snapshot(
+        project=PROJECT,
+        dataset=DATASET,
+        katalog=SNAPSHOT_KATALOG,
+        inkrementelt_lager=INKREMENTELT_LAGER,
+    )
+    os.environ[SNAPSHOT_MILJØVARIABEL] = os.path.abspath(SNAPSHOT_KATALOG)
+
+
+def lag_forberedte_data(saksflyt: bool = True) -> None:
+    """
+    Laster inn og preprosesserer data for hele landet én gang, og deler dem opp per resultatområde.
+    Quarto-prosessene arver miljøvariabelen og leser sitt resultatområde i stedet for å laste inn selv.
+    """
+    logging.info(f"Forbereder data for alle resultatområder i {FORBEREDT_KATALOG}")
+    forbered_data(
+        project=PROJECT,
+        dataset=DATASET,
+        katalog=FORBEREDT_KATALOG,
+        saksflyt=saksflyt,
+    )
+    os.environ[FORBEREDT_MILJØVARIABEL] = os.path.abspath(FORBEREDT_KATALOG)
+
+
+def render_datafortellinger() -> None:
+    """
+    Renderer index først, så den lager felles filer for nettsiden (site_libs) alene,
+    og deretter alle datafortellingene parallelt innenfor minnebudsjettet.
+    Saksflyt-sidene er frosne, og kopieres fra arkivet uten å kjøres når versjonen er arkivert.
+    Ellers rendres de og arkiveres når alle er rendret.
+    Dokumenter med samme nøkkel som forrige kjøring (samme kilde og data) gjenbrukes fra rendercachen,
+    og data forberedes kun om noen datafortellinger må rendres. Med rendercachen regner figurene
+    nå fra høyeste tidsstempel i dataene, så output kun avhenger av dataene.
+    Maks minne per dokument lagres i det inkrementelle lageret og brukes til å planlegge neste kjøring.
+    Feiler etter at alle dokumenter er forsøkt rendret, om noen av dem feilet.
+    """
+    saksflyt = [
+        f"datafortelling/sak/{resultatområde}.qmd" for resultatområde in RESULTATOMRÅDER
+    ]
+    datafortellinger = [
+        f"datafortelling/{datafortelling}/{resultatområde}.qmd"
+        for resultatområde in RESULTATOMRÅDER
+        for datafortelling in DATAFORTELLINGER
+    ]
+
+    data = datafingeravtrykk()
+    nøkler = (
+        {}
+        if RENDERCACHE is None or data is None
+        else {
+            dokument: dokument_nøkkel(dokument, data)
+            for dokument in ["index.qmd", *datafortellinger]
+        }
+    )
+    uendret = uendrede_dokumenter(RENDERCACHE, nøkler) if nøkler else []
+    if nøkler and datatidspunkt():
+        os.environ[NÅ_MILJØVARIABEL] = datatidspunkt()
+    # Hentes etter rendercachen, så arkivert output ikke overskrives
+    saksflyt_versjon = None if ARKIV is None else arkivversjon(saksflyt_arkivversjon)
+    arkivert = (
+        []
+        if ARKIV is None
+        else hent_arkiverte_dokumenter(ARKIV, "saksflyt", saksflyt_versjon)
+    )
+
+    må_rendres = [
+        dokument
+        for dokument in datafortellinger
+        if dokument not in uendret and dokument not in arkivert
+    ]
+    if må_rendres:
+        with fase("forbered data"):
+            lag_forberedte_data(
+                saksflyt=any(dokument in saksflyt for dokument in må_rendres)
+            )
+
+    with fase("render"):
+        resultater = [] if "index.qmd" in uendret else [render_dokument("index.qmd")]
+        resultater += render_dokumenter(
+            dokumenter=må_rendres,
+            minnebudsjett=minnebudsjett_mb(),
+            målinger=les_minnemålinger(INKREMENTELT_LAGER),
+        )
+
+    logg_renderrapport(resultater)
+    if PROFILERING:
+        skriv_kjørerapport(PROFILERING, resultater)
+    skriv_minnemålinger(INKREMENTELT_LAGER, resultater)
+    rendret = [resultat["dokument"] for resultat in resultater if resultat["ok"]]
+    if (
+        ARKIV is not None
+        and not arkivert
+        and all(dokument in rendret + uendret for dokument in saksflyt)
+    ):
+        arkiver_dokumenter(ARKIV, "saksflyt", saksflyt_versjon, saksflyt)
+    if nøkler:
+        lagre_rendercache(
+            RENDERCACHE,
+            {dokument: nøkler[dokument] for dokument in uendret + rendret},
+        )
+
+    antall_feilet = sum(not resultat["ok"] for resultat in resultater)
+    if antall_feilet:
+        raise RuntimeError(f"Rendering feilet for {antall_feilet} dokumenter")
 
 
 def last_opp_filer_til_nada() -> None:
     logging.info("Henter filer å laste opp til NADA")
+    files_to_upload: dict[str, Path] = finn_filer("pages")
     total_file_size_bytes: int = 0
-    files_to_upload: list[str] = []
-    for root, _, files in os.walk("pages"):
-        for file in files:
-            files_to_upload.append(os.path.join(root, file))
-            file_size_bytes: int = os.path.getsize(os.path.join(root, file))
-            total_file_size_bytes += file_size_bytes
-            file_size_kb: float = file_size_bytes / 1024
-            logging.info(
-                f"Fil '{os.path.join(root, file)}' på {file_size_kb:.2f} KB lagt til i liste for opplasting"
-            )
+    for file_path in files_to_upload.values():
+        file_size_bytes: int = file_path.stat().st_size
+        total_file_size_bytes += file_size_bytes
+        file_size_kb: float = file_size_bytes / 1024
+        logging.info(
+            f"Fil '{file_path}' på {file_size_kb:.2f} KB lagt til i liste for opplasting"
+        )
 
     file_size_mb: float = total_file_size_bytes / 1024 / 1024
     logging.info(
@@ -48,23 +220,14 @@ def last_opp_filer_til_nada() -> None:
             f"Total filstørrelse: {file_size_mb:.2f} MB overstiger 100 MB. Opplasting vil sannsynligvis feile pga begrensning i NADA. Sjekk at vi ikke embedder resources"
         )
 
-    multipart_form_data: dict[str, tuple[str, bytes]] = {}
-    for file_path in files_to_upload:
-        file_name: str = file_path.replace("pages/", "", 1)
-        with open(file_path, "rb") as file:
-            file_contents: bytes = file.read()
-            multipart_form_data[file_name] = (file_name, file_contents)
-            logging.info(f"Fil klar for opplasting: {file_name}")
-
-    logging.info("multipart form data prepared.")
-
     try:
-        response: requests.Response = requests.put(
+        last_opp_endringer(
             url=f"https://{os.environ['NADA_ENV']}/quarto/update/{os.environ['QUARTO_ID']}",
-            headers={"Authorization": f"Bearer {os.environ['QUARTO_TOKEN']}"},
-            files=multipart_form_data,
+            token=os.environ["QUARTO_TOKEN"],
+            filer=files_to_upload,
+            katalog=INKREMENTELT_LAGER,
+            delvis=bool(os.environ.get(DELVIS_OPPLASTING_MILJØVARIABEL)),
         )
-        response.raise_for_status()
         logging.info("Quarto update completed successfully.")
     except requests.RequestException as e:
         logging.error(f"Error updating Quarto document: {e}")
@@ -73,28 +236,17 @@ def last_opp_filer_til_nada() -> None:
 
 if __name__ == "__main__":
     logging.info("Starter render av datafortellinger.")
+    if not INKREMENTELT_LAGER:
+        logging.warning(
+            f"{INKREMENTELT_LAGER_MILJØVARIABEL} er ikke satt: inkrementell lasting, minnemålinger, "
+            "rendercache, arkiv for saksflyt og manifest over publiserte filer er av, og alt hentes, rendres og lastes opp på nytt"
+        )
     try:
-        kjør_quarto_render("index.qmd")
-
-        for resultatområde in [
-            "norge",
-            "agder",
-            "innlandet",
-            "more_og_romsdal",
-            "nordland",
-            "oslo",
-            "ost-viken",
-            "rogaland",
-            "troms_og_finnmark",
-            "trondelag",
-            "vest-viken",
-            "vestfold_og_telemark",
-            "vestland",
-        ]:
-            kjør_quarto_render(f"datafortelling/sak/{resultatområde}.qmd")
-            kjør_quarto_render(f"datafortelling/samarbeid/{resultatområde}.qmd")
-            kjør_quarto_render(f"datafortelling/samarbeidsplan/{resultatområde}.qmd")
-
+        with fase("snapshot"):
+            lag_snapshot()
+        render_datafortellinger()
+        with fase("figurer"):
+            skill_ut_figurer()
         last_opp_filer_til_nada()
 
     except Exception as e:
@@ -1 +1,10 @@
 # Diverse utils for å bygge datafortellinger
+import os
+
+from datafortelling_utils.profilering import (
+    PROFILERING_MILJØVARIABEL,
+    start_profilering,
+)
+
+if os.environ.get(PROFILERING_MILJØVARIABEL):
+    start_profilering()
@@ -0,0 +1,147 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import subprocess
+from datetime import UTC, datetime
+from pathlib import Path
+
+MANIFEST_FILNAVN = "manifest.json"
+PAGES_KATALOG = "pages"
+SITE_LIBS_KATALOG = "site_libs"
+QUARTO_KONFIGURASJON = "_quarto.yml"
+
+# Relative lenker i src og href, uten protokoll, anker eller query
+lenke_re = re.compile(r'(?:src|href)="([^":#?]+)')
+
+
+def _sha256_fil(fil: Path) -> str:
+    with open(fil, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+def quarto_versjon() -> str:
+    return subprocess.run(
+        ["quarto", "--version"], capture_output=True, text=True, check=True
+    ).stdout.strip()
+
+
+def arkivversjon(
+    versjon: str, quarto_konfigurasjon: str | Path = QUARTO_KONFIGURASJON
+) -> str:
+    """
+    Versjonen det arkiveres under: versjonen fra konstanter, quarto-versjonen og hash av
+    _quarto.yml. Ny quarto eller endret navigasjon og tema gir en ny versjon, så arkivert
+    html aldri blandes med site_libs eller meny fra en annen quarto-versjon eller konfigurasjon.
+    """
+    return f"{versjon}-quarto{quarto_versjon()}-{_sha256_fil(Path(quarto_konfigurasjon))[:12]}"
+
+
+def brukte_site_libs(html: Path, pages: str | Path = PAGES_KATALOG) -> list[Path]:
+    """
+    Filer i site_libs som html-filen lenker til, relativt til pages.
+    """
+    pages = Path(pages)
+    innhold = (pages / html).read_text(encoding="utf-8")
+    filer = {
+        Path(os.path.normpath(html.parent / lenke))
+        for lenke in lenke_re.findall(innhold)
+    }
+    return sorted(
+        fil
+        for fil in filer
+        if fil.parts[0] == SITE_LIBS_KATALOG and (pages / fil).is_file()
+    )
+
+
+def dokumentfiler(dokument: str, pages: str | Path = PAGES_KATALOG) -> list[Path]:
+    """
+    Output fra et rendret dokument, relativt til pages: html-filen, figurer og andre
+    ressurser i <dokument>_files, og filene i site_libs som html-filen bruker.
+    """
+    pages = Path(pages)
+    html = Path(dokument).with_suffix(".html")
+    ressurser = pages / html.with_name(f"{html.stem}_files")
+    filer = [html]
+    if ressurser.exists():
+        filer += sorted(
+            fil.relative_to(pages) for fil in ressurser.rglob("*") if fil.is_file()
+        )
+    return filer + brukte_site_libs(html, pages)
+
+
+def arkivkatalog(katalog: str | Path, navn: str, versjon: str) -> Path:
+    return Path(katalog) / navn / versjon
+
+
+def arkiver_dokumenter(
+    katalog: str | Path,
+    navn: str,
+    versjon: str,
+    dokumenter: list[str],
+    pages: str | Path = PAGES_KATALOG,
+) -> None:
+    """
+    Lagrer output fra rendrede dokumenter som en frosset versjon, med et manifest med sha256 per fil.
+    Felles filer i site_libs lagres én gang.
+    """
+    arkiv = arkivkatalog(katalog, navn, versjon)
+    filer = list(
+        dict.fromkeys(
+            fil for dokument in dokumenter for fil in dokumentfiler(dokument, pages)
+        )
+    )
+    for fil in filer:
+        (arkiv / PAGES_KATALOG / fil).parent.mkdir(parents=True, exist_ok=True)
+        shutil.copy2(Path(pages) / fil, arkiv / PAGES_KATALOG / fil)
+
+    manifest = {
+        "navn": navn,
+        "versjon": versjon,
+        "opprettet": datetime.now(UTC).isoformat(),
+        "dokumenter": dokumenter,
+        "filer": {fil.as_posix(): _sha256_fil(Path(pages) / fil) for fil in filer},
+    }
+    with open(arkiv / MANIFEST_FILNAVN, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    logging.info(
+        f"Arkiverte {len(dokumenter)} dokumenter ({len(filer)} filer) som {navn} versjon {versjon} i {arkiv}"
+    )
+
+
+def hent_arkiverte_dokumenter(
+    katalog: str | Path,
+    navn: str,
+    versjon: str,
+    pages: str | Path = PAGES_KATALOG,
+) -> list[str]:
+    """
+    Kopierer en frosset versjon inn i pages uten å rendre noe.
+    Returnerer de arkiverte dokumentene, eller tom liste om versjonen ikke finnes
+    eller en fil ikke stemmer med manifestet, da må dokumentene rendres og arkiveres på nytt.
+    """
+    arkiv = arkivkatalog(katalog, navn, versjon)
+    manifest_fil = arkiv / MANIFEST_FILNAVN
+    if not manifest_fil.exists():
+        logging.info(f"Fant ikke {navn} versjon {versjon} i {katalog}")
+        return []
+    with open(manifest_fil, encoding="utf-8") as f:
+        manifest = json.load(f)
+
+    for fil, sha256 in manifest["filer"].items():
+        arkivert = arkiv / PAGES_KATALOG / fil
+        if not arkivert.exists() or _sha256_fil(arkivert) != sha256:
+            logging.warning(
+                f"{arkivert} mangler eller er endret, arkiverer {navn} på nytt"
+            )
+            return []
+
+    for fil in manifest["filer"]:
+        (Path(pages) / fil).parent.mkdir(parents=True, exist_ok=True)
+        shutil.copy2(arkiv / PAGES_KATALOG / fil, Path(pages) / fil)
+    logging.info(
+        f"Kopierte {len(manifest['dokumenter'])} dokumenter fra {navn} versjon {versjon}, opprettet {manifest['opprettet']}"
+    )
+    return manifest["dokumenter"]
@@ -1,12 +1,24 @@
+import logging
 from datetime import datetime, timedelta
+from pathlib import Path
 from typing import Any
 
+import numpy as np
 import pandas as pd
+import pyarrow as pa
 from google.cloud import bigquery
 
+from datafortelling_utils.helper import nå
 from datafortelling_utils.konstanter import (
     intervall_sortering,
 )
+from datafortelling_utils.snapshot import (
+    les_manifest,
+    les_tabell_fra_snapshot,
+    skriv_tabell_til_snapshot,
+)
+from datafortelling_utils.sporing import spor
+from datafortelling_utils.tidslinje import lag_tidslinje, status_på
 
 
 def samarbeid_med_spørreundersøkelse(
@@ -77,6 +89,7 @@ def samarbeid_med_spørreundersøkelse(
     return result
 
 
+@spor
 def load_data_deduplicate(
     project: str,
     dataset: str,
@@ -84,24 +97,201 @@ def load_data_deduplicate(
     distinct_colunms: str,
     dtypes: dict[str, Any] | None = None,
     limit: str = "",
+    kolonner: list[str] | None = None,
+    filtre: list[str] | None = None,
+    strømming: bool = True,
 ) -> pd.DataFrame:
     """
     Henter data fra BigQuery og fjerner duplikater med å beholde siste tidsstempel av repeterende distinct_colunms.
+    Med kolonner hentes kun de oppgitte kolonnene, slik at resten ikke skannes eller lastes ned.
+    Filtre er SQL-betingelser som brukes på de dedupliserte radene, før de lastes ned.
+    Med strømming lastes resultatet ned som Arrow record batches, se last_ned_arrow.
+    """
+    sql_query = dedupliser_sql(
+        kilde=f"`{project}.{dataset}.{table}`",
+        distinct_colunms=distinct_colunms,
+        limit=limit,
+        kolonner=kolonner,
+        filtre=filtre,
+    )
+    bq_client = bigquery.Client(project=project)
+    query_job = bq_client.query(query=sql_query)
+    if dtypes is not None and kolonner:
+        dtypes = {k: v for k, v in dtypes.items() if k in kolonner}
+
+    if not strømming:
+        return query_job.to_dataframe(dtypes=dtypes)  # type: ignore
+
+    return arrow_til_pandas(
+        last_ned_arrow(query_job=query_job, table=table), dtypes=dtypes
+    )
+
+
+def dedupliser_sql(
+    kilde: str,
+    distinct_colunms: str,
+    limit: str = "",
+    kolonner: list[str] | None = None,
+    filtre: list[str] | None = None,
+    dialekt: str = "bigquery",
+) -> str:
+    """
+    Lager spørringen som beholder raden med siste tidsstempel per distinct_colunms.
+    Brukes både mot BigQuery og DuckDB, dialekt styrer de få stedene syntaksen er ulik.
     """
-    sql_query = f"""
+    sitat, utelat = ("`", "except") if dialekt == "bigquery" else ('"', "exclude")
+    utvalgte_kolonner = (
+        ", ".join(f"{sitat}{kolonne}{sitat}" for kolonne in kolonner)
+        if kolonner
+        else "*"
+    )
+    ekstra_filtre = "".join(f" AND {filter}" for filter in filtre or [])
+    return f"""
         SELECT
-           * except (radnummerBasertPaaTidsstempel)
+           * {utelat} (radnummerBasertPaaTidsstempel)
         FROM (
             SELECT
-                *,
+                {utvalgte_kolonner},
                 row_number() over (partition by {distinct_colunms} order by tidsstempel desc) radnummerBasertPaaTidsstempel
-            FROM `{project}.{dataset}.{table}`
+            FROM {kilde}
             {limit}
-        ) WHERE radnummerBasertPaaTidsstempel = 1;
+        ) WHERE radnummerBasertPaaTidsstempel = 1{ekstra_filtre};
     """
-    bq_client = bigquery.Client(project=project)
-    query_job = bq_client.query(query=sql_query)
-    return query_job.to_dataframe(dtypes=dtypes)  # type: ignore
+
+
+def arrow_til_pandas(
+    tabell: pa.Table, dtypes: dict[str, Any] | None = None
+) -> pd.DataFrame:
+    """
+    Gjør om en Arrow-tabell til DataFrame med samme datatyper som når data hentes fra BigQuery.
+    """
+    data = tabell.to_pandas(types_mapper=_arrow_til_pandas_dtype)
+    if dtypes:
+        data = data.astype({k: v for k, v in dtypes.items() if k in data.columns})
+    return data
+
+
+def last_ned_arrow(
+    query_job: bigquery.QueryJob,
+    table: str,
+    antall_strømmer: int = 4,
+) -> pa.Table:
+    """
+    Laster ned resultatet av en spørring som Arrow record batches via BigQuery Storage Read API,
+    fordelt på flere parallelle strømmer. Er ikke google-cloud-bigquery-storage installert
+    lastes batchene ned via REST API, fortsatt som Arrow.
+    """
+    try:
+        from google.cloud import bigquery_storage
+
+        bqstorage_client = bigquery_storage.BigQueryReadClient()
+    except ImportError:
+        logging.warning(
+            "google-cloud-bigquery-storage er ikke installert, laster ned via REST API"
+        )
+        bqstorage_client = None
+
+    rader = query_job.result()
+    batches: list[pa.RecordBatch] = []
+    antall_rader = 0
+    antall_bytes = 0
+    for batch in rader.to_arrow_iterable(
+        bqstorage_client=bqstorage_client, max_stream_count=antall_strømmer
+    ):
+        batches.append(batch)
+        antall_rader += batch.num_rows
+        antall_bytes += batch.nbytes
+        logging.debug(
+            f"{table}: lastet ned {antall_rader} av {rader.total_rows} rader ({antall_bytes / 1024 / 1024:.2f} MB)"
+        )
+
+    logging.info(
+        f"Lastet ned {antall_rader} rader fra {table} i {len(batches)} batcher ({antall_bytes / 1024 / 1024:.2f} MB)"
+    )
+
+    if not batches:
+        return rader.to_arrow(bqstorage_client=bqstorage_client)
+    return pa.Table.from_batches(batches)
+
+
+def _arrow_til_pandas_dtype(arrow_type: pa.DataType) -> Any | None:
+    """
+    Tekst lagres som Arrow-baserte kolonner i pandas, i stedet for python-objekter per rad.
+    Heltall og boolske verdier får samme nullable dtypes som to_dataframe gir.
+    Andre typer (f.eks. tidsstempler og datoer) konverteres som standard av pyarrow.
+    """
+    if pa.types.is_string(arrow_type) or pa.types.is_large_string(arrow_type):
+        return pd.StringDtype(storage="pyarrow")
+    if pa.types.is_integer(arrow_type):
+        return pd.Int64Dtype()
+    if pa.types.is_boolean(arrow_type):
+        return pd.BooleanDtype()
+    return None
+
+
+def load_data_inkrementelt(
+    project: str,
+    dataset: str,
+    table: str,
+    distinct_colunms: str,
+    lager: str | Path,
+    dtypes: dict[str, Any] | None = None,
+    kolonner: list[str] | None = None,
+) -> pd.DataFrame:
+    """
+    Henter kun rader nyere enn høyeste tidsstempel i et lokalt lager av deduplisert data,
+    og slår dem sammen med lageret slik at siste tidsstempel per distinct_colunms beholdes.
+    Finnes ikke lageret hentes hele tabellen, og lageret opprettes.
+    """
+    lagret_data = les_tabell_fra_snapshot(katalog=lager, table=table)
+    vannmerke = (
+        les_manifest(lager).get("tabeller", {}).get(table, {}).get("maks_tidsstempel")
+    )
+
+    if lagret_data is None or vannmerke is None:
+        logging.info(f"Fant ikke lokalt lager for {table}, henter hele tabellen")
+        data = load_data_deduplicate(
+            project=project,
+            dataset=dataset,
+            table=table,
+            distinct_colunms=distinct_colunms,
+            dtypes=dtypes,
+            kolonner=kolonner,
+        )
+    else:
+        # Tidsstempel i UTC uten tidssone, tolkes likt for både TIMESTAMP og DATETIME i BigQuery
+        # Bruker >= så rader med samme tidsstempel som vannmerket ikke går tapt
+        vannmerke = pd.Timestamp(vannmerke)
+        if vannmerke.tz is not None:
+            vannmerke = vannmerke.tz_convert(None)
+        fra_tidsstempel = vannmerke.strftime("%Y-%m-%d %H:%M:%S.%f")
+        nye_rader = load_data_deduplicate(
+            project=project,
+            dataset=dataset,
+            table=table,
+            distinct_colunms=distinct_colunms,
+            dtypes=dtypes,
+            limit=f" WHERE tidsstempel >= '{fra_tidsstempel}' ",
+            kolonner=kolonner,
+        )
+        logging.info(
+            f"Hentet {len(nye_rader)} nye rader fra {table} etter {fra_tidsstempel}"
+        )
+        data = (
+            pd.concat([lagret_data, nye_rader], ignore_index=True)
+            .sort_values("tidsstempel", kind="stable")
+            .drop_duplicates(distinct_colunms, keep="last")
+            .reset_index(drop=True)
+        )
+
+    skriv_tabell_til_snapshot(
+        katalog=lager,
+        project=project,
+        dataset=dataset,
+        table=table,
+        data=data,
+    )
+    return data
 
 
 def fjern_tidssone(data: pd.DataFrame) -> pd.DataFrame:
@@ -114,6 +304,7 @@ def fjern_tidssone(data: pd.DataFrame) -> pd.DataFrame:
     return data
 
 
+@spor
 def split_data_statistikk(
     data_statistikk: pd.DataFrame,
 ) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
@@ -146,6 +337,7 @@ def split_data_statistikk(
     return preprocess_data_status(data_status), data_eierskap, data_prosess
 
 
+@spor
 def preprocess_data_status(data_status: pd.DataFrame) -> pd.DataFrame:
     # Sorter basert på sak og endret tidspunkt
     data_status = data_status.sort_values(
@@ -168,16 +360,17 @@ def preprocess_data_status(data_status: pd.DataFrame) -> pd.DataFrame:
     data_status = data_status[~feil_tilbake]
     data_status.drop(["forrige_status_med_tilbake"], axis=1, inplace=True)
 
-    # Fjern rader som var angret med bruk av tilbake-knappen
+    # Fjern rader som var angret med bruk av tilbake-knappen.
+    # Hver TILBAKE angrer siste rad i saken som ikke allerede er angret, som en stakk:
+    # dybden øker med 1 for hver rad og synker med 1 for hver TILBAKE, og en rad er angret
+    # om dybden senere i saken blir lavere enn rett etter raden.
     data_status.reset_index(drop=True, inplace=True)
-    tilbake_rader = data_status[data_status["hendelse"] == "TILBAKE"].index.tolist()
-    fjern_rader = set(tilbake_rader)
-    for index in tilbake_rader:
-        rad = index - 1
-        while rad in fjern_rader:
-            rad -= 1
-        fjern_rader.add(rad)
-    data_status = data_status.drop(index=fjern_rader).reset_index(drop=True)
+    tilbake = (data_status["hendelse"] == "TILBAKE").to_numpy()
+    sak, _ = pd.factorize(data_status["saksnummer"])
+    dybde = pd.Series(np.where(tilbake, -1, 1)).groupby(sak).cumsum()
+    lavest_senere = dybde[::-1].groupby(sak[::-1]).cummin()[::-1].groupby(sak).shift(-1)
+    angret = ~tilbake & (lavest_senere < dybde).to_numpy()
+    data_status = data_status[~(tilbake | angret)].reset_index(drop=True)
 
     # Forrige status
     data_status.loc[
@@ -239,36 +432,40 @@ def beregn_siste_oppdatering(
     data_status: pd.DataFrame,
     data_eierskap: pd.DataFrame,
     data_leveranse: pd.DataFrame,
-    beregningsdato=datetime.now(),
+    beregningsdato: datetime | None = None,
+    tidslinje: pd.DataFrame | None = None,
 ) -> pd.DataFrame:
     """
-    Beregner siste oppdatering for hver sak
+    Beregner siste oppdatering for hver sak, som på beregningsdato eller nå
     """
+    beregningsdato = beregningsdato or nå()
     # Filtrere på beregningsdato
-    data_status = data_status[data_status.endretTidspunkt < beregningsdato]
     data_eierskap = data_eierskap[data_eierskap.endretTidspunkt < beregningsdato]
     data_leveranse = data_leveranse[data_leveranse.sistEndret < beregningsdato]
 
-    # Status på beregningsdato
+    # Status på beregningsdato, og når saken fikk den
+    tidslinje = lag_tidslinje(data_status) if tidslinje is None else tidslinje
     status_beregningsdato = (
-        data_status[["saksnummer", "status"]]
-        .drop_duplicates("saksnummer", keep="last")
-        .rename(columns={"status": "status_beregningsdato"})
+        status_på(tidslinje, beregningsdato)
+        .astype({"saksnummer": data_status.saksnummer.dtype})
+        .rename(
+            columns={
+                "status": "status_beregningsdato",
+                "gyldig_fra": "siste_oppdatering_status",
+            }
+        )
     )
-    data_status = data_status.merge(status_beregningsdato, on="saksnummer", how="left")
 
     # Filtrere bort saker med avsluttet status på beregningsdato
     aktive_statuser = ["VURDERES", "KONTAKTES", "KARTLEGGES", "VI_BISTÅR"]
-    aktiv_sak_beregningsdato = data_status.status_beregningsdato.isin(aktive_statuser)
-    data_status = data_status[aktiv_sak_beregningsdato]
+    status_beregningsdato = status_beregningsdato[
+        status_beregningsdato.status_beregningsdato.isin(aktive_statuser)
+    ]
 
     # Hente rader med siste oppdatering for hver sak i hvert enkelt datasett
-    siste_oppdatering_status = (
-        data_status.groupby("saksnummer")
-        .endretTidspunkt.max()
-        .reset_index()
-        .rename(columns={"endretTidspunkt": "siste_oppdatering_status"})
-    )
+    siste_oppdatering_status = status_beregningsdato[
+        ["saksnummer", "siste_oppdatering_status"]
+    ].reset_index(drop=True)
     siste_oppdatering_eierskap = (
         data_eierskap.groupby("saksnummer")
         .endretTidspunkt.max()
@@ -306,9 +503,7 @@ def beregn_siste_oppdatering(
 
     # Hente informasjon/kolonner fra data_status
     siste_oppdatering = siste_oppdatering.merge(
-        data_status[["saksnummer", "status_beregningsdato"]].drop_duplicates(
-            "saksnummer"
-        ),
+        status_beregningsdato[["saksnummer", "status_beregningsdato"]],
         on="saksnummer",
         how="left",
     )
@@ -370,13 +565,87 @@ def beregn_ikke_aktuell(data_statistikk):
     return explode_ikke_aktuell_begrunnelse(data_status)
 
 
+def intervaller_mellom_endringer(
+    data_status: pd.DataFrame,
+    data_eierskap: pd.DataFrame,
+    data_leveranse: pd.DataFrame,
+    nå: datetime,
+) -> pd.DataFrame:
+    """
+    Tidslinje over alle endringer på saker (status, eierskap og leveranser), der hver endring
+    varer til neste endring på samme sak. Siste endring på en sak varer til nå.
+    """
+    data = pd.concat(
+        [
+            data_status[["saksnummer", "status", "endretTidspunkt"]],
+            data_eierskap[["saksnummer", "status", "endretTidspunkt"]],
+            (
+                data_leveranse[["saksnummer", "sistEndret"]]
+                .rename(columns={"sistEndret": "endretTidspunkt"})
+                .assign(status="VI_BISTÅR")
+            ),
+        ]
+    )
+    data = data.sort_values(["saksnummer", "endretTidspunkt"], ascending=True)
+    # Tidligere ble siste endring satt til nå med astype(str) == "NaT", som aldri slår til med
+    # pandas 3, så saker som fortsatt ikke var endret falt bort. Nå telles de med frem til nå.
+    return lag_tidslinje(data, nå)
+
+
+def antall_i_intervaller_per_dato(
+    datoer: pd.DatetimeIndex,
+    start: pd.Series,
+    slutt: pd.Series,
+    gruppe: pd.Series,
+    grupper: list[str],
+) -> pd.DataFrame:
+    """
+    Teller hvor mange intervaller (start, slutt) hver dato ligger strengt innenfor, per gruppe.
+    Hvert intervall blir +1 på første dato etter start og -1 på første dato fra og med slutt,
+    og en kumulativ sum over datoene gir antallet, i stedet for å sjekke hver dato mot hvert intervall.
+    """
+    første = datoer.searchsorted(start.to_numpy(), side="right")
+    etter_siste = datoer.searchsorted(slutt.to_numpy(), side="left")
+    antall = {}
+    for navn in grupper:
+        i_gruppe = (gruppe == navn).to_numpy() & (første < etter_siste)
+        differanse = np.bincount(
+            første[i_gruppe], minlength=len(datoer) + 1
+        ) - np.bincount(etter_siste[i_gruppe], minlength=len(datoer) + 1)
+        antall[navn] = differanse.cumsum()[: len(datoer)]
+    return pd.DataFrame(antall, index=datoer)
+
+
+def urørte_saker_per_dato(
+    intervaller: pd.DataFrame,
+    datoer: pd.DatetimeIndex,
+    antall_dager: int,
+    statuser: list[str],
+) -> pd.DataFrame:
+    """
+    Antall saker per status som på hver dato ikke har vært endret på mer enn antall_dager,
+    regnet fra intervaller_mellom_endringer.
+    """
+    urørt = intervaller[
+        ((intervaller.gyldig_til - intervaller.gyldig_fra).dt.days > antall_dager)
+        & intervaller.status.isin(statuser)
+    ]
+    return antall_i_intervaller_per_dato(
+        datoer,
+        start=urørt.gyldig_fra + timedelta(days=antall_dager),
+        slutt=urørt.gyldig_til,
+        gruppe=urørt.status,
+        grupper=statuser,
+    )
+
+
 def filtrer_bort_saker_på_avsluttet_tidspunkt(
     data: pd.DataFrame, antall_dager=365
 ) -> pd.DataFrame:
     """
     Filtrerer bort saker avsluttet for over "x" antall dager siden
     """
-    dato_some_time_ago = datetime.now() - timedelta(days=antall_dager)
+    dato_some_time_ago = nå() - timedelta(days=antall_dager)
     saker_some_time_ago = data[
         data.avsluttetTidspunkt < dato_some_time_ago
     ].saksnummer.unique()
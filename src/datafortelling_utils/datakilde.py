@@ -0,0 +1,256 @@
+import logging
+import os
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any
+
+import pandas as pd
+
+from datafortelling_utils.datahandler import (
+    arrow_til_pandas,
+    dedupliser_sql,
+    load_data_deduplicate,
+)
+from datafortelling_utils.konstanter import (
+    Resultatområde,
+    delte_fylker,
+    resultatområder,
+)
+from datafortelling_utils.snapshot import (
+    finn_snapshot,
+    les_tabell_fra_snapshot,
+    tabell_filnavn,
+)
+
+# Miljøvariabel som peker på en mappe med parquet-filer, gir offline kjøring med DuckDB
+DATAKILDE_MILJØVARIABEL = "FIA_DATAKILDE"
+
+
+class Datakilde(ABC):
+    """
+    Henter tabeller deduplisert på distinct_colunms, med siste tidsstempel per rad.
+    Alle last_inn_* funksjonene henter data gjennom en datakilde.
+    """
+
+    @abstractmethod
+    def hent_tabell(
+        self,
+        table: str,
+        distinct_colunms: str,
+        dtypes: dict[str, Any] | None = None,
+        limit: str = "",
+        kolonner: list[str] | None = None,
+        resultatområde: Resultatområde | None = None,
+    ) -> pd.DataFrame:
+        """
+        Henter en deduplisert tabell. Med kolonner hentes kun de oppgitte kolonnene,
+        og med resultatområde kun rader med fylkesnummer og kommunenummer i resultatområdet.
+        """
+
+
+class BigQueryDatakilde(Datakilde):
+    """
+    Henter data direkte fra BigQuery.
+    """
+
+    def __init__(self, project: str, dataset: str):
+        self.project = project
+        self.dataset = dataset
+
+    def hent_tabell(
+        self,
+        table: str,
+        distinct_colunms: str,
+        dtypes: dict[str, Any] | None = None,
+        limit: str = "",
+        kolonner: list[str] | None = None,
+        resultatområde: Resultatområde | None = None,
+    ) -> pd.DataFrame:
+        return load_data_deduplicate(
+            project=self.project,
+            dataset=self.dataset,
+            table=table,
+            distinct_colunms=distinct_colunms,
+            dtypes=dtypes,
+            limit=limit,
+            kolonner=kolonner,
+            filtre=None
+            if resultatområde is None
+            else [resultatområde_sql_filter(resultatområde)],
+        )
+
+
+class SnapshotDatakilde(Datakilde):
+    """
+    Leser dedupliserte tabeller fra et snapshot laget av last_ned_snapshot.
+    Snapshot inneholder hele tabellen, så spørringer med limit, og tabeller
+    som mangler i snapshot, hentes fra reserve.
+    """
+
+    def __init__(self, katalog: str | Path, reserve: Datakilde):
+        self.katalog = Path(katalog)
+        self.reserve = reserve
+
+    def hent_tabell(
+        self,
+        table: str,
+        distinct_colunms: str,
+        dtypes: dict[str, Any] | None = None,
+        limit: str = "",
+        kolonner: list[str] | None = None,
+        resultatområde: Resultatområde | None = None,
+    ) -> pd.DataFrame:
+        if limit == "":
+            data = les_tabell_fra_snapshot(
+                katalog=self.katalog,
+                table=table,
+                kolonner=kolonner,
+                filtre=None
+                if resultatområde is None
+                else resultatområde_parquet_filter(resultatområde),
+            )
+            if data is not None:
+                return data
+
+        return self.reserve.hent_tabell(
+            table=table,
+            distinct_colunms=distinct_colunms,
+            dtypes=dtypes,
+            limit=limit,
+            kolonner=kolonner,
+            resultatområde=resultatområde,
+        )
+
+
+class DuckDBDatakilde(Datakilde):
+    """
+    Kjører samme dedupliseringsspørring som mot BigQuery med DuckDB, på parquet-filer i en mappe.
+    Filene heter <tabell>.parquet, samme som i snapshot, så et snapshot kan brukes direkte.
+    Gir kjøring uten tilgang til BigQuery, f.eks. for profilering og lokal utvikling.
+    """
+
+    def __init__(self, katalog: str | Path):
+        self.katalog = Path(katalog)
+
+    def hent_tabell(
+        self,
+        table: str,
+        distinct_colunms: str,
+        dtypes: dict[str, Any] | None = None,
+        limit: str = "",
+        kolonner: list[str] | None = None,
+        resultatområde: Resultatområde | None = None,
+    ) -> pd.DataFrame:
+        import duckdb
+
+        fil = self.katalog / tabell_filnavn(table)
+        if not fil.exists():
+            raise FileNotFoundError(f"Fant ikke {table} i {self.katalog}")
+
+        sql_query = dedupliser_sql(
+            kilde=f"read_parquet('{fil.as_posix()}')",
+            distinct_colunms=distinct_colunms,
+            limit=limit,
+            kolonner=kolonner,
+            filtre=None
+            if resultatområde is None
+            else [resultatområde_sql_filter(resultatområde)],
+            dialekt="duckdb",
+        )
+        logging.info(f"Leser {table} fra {fil} med DuckDB")
+        # Egen tilkobling per spørring, så tabeller kan hentes fra flere tråder samtidig
+        with duckdb.connect() as tilkobling:
+            tabell = tilkobling.sql(sql_query).fetch_arrow_table()
+
+        if dtypes is not None and kolonner:
+            dtypes = {k: v for k, v in dtypes.items() if k in kolonner}
+        return arrow_til_pandas(tabell, dtypes=dtypes)
+
+
+def standard_datakilde(project: str, dataset: str) -> Datakilde:
+    """
+    Velger datakilde ut fra miljøet: DuckDB om FIA_DATAKILDE er satt,
+    snapshot om FIA_SNAPSHOT er satt (se main.py), ellers BigQuery.
+    """
+    katalog = os.environ.get(DATAKILDE_MILJØVARIABEL)
+    if katalog:
+        return DuckDBDatakilde(katalog=katalog)
+
+    bigquery_datakilde = BigQueryDatakilde(project=project, dataset=dataset)
+    snapshot = finn_snapshot(project=project, dataset=dataset)
+    if snapshot is not None:
+        return SnapshotDatakilde(katalog=snapshot, reserve=bigquery_datakilde)
+    return bigquery_datakilde
+
+
+def _normaliser_resultatområde(navn: str) -> str:
+    return navn.replace(" ", "_").lower()
+
+
+def geografi_i_resultatområde(
+    resultatområde: Resultatområde,
+) -> tuple[list[str], dict[str, list[str]]]:
+    """
+    Finner fylkesnumre og kommunenumre som hører til et resultatområde,
+    med samme regler som legg_til_regional_tilhørighet (deling av Akershus og Lund kommune).
+    Returnerer fylkesnumre som hører til i sin helhet, og kommunenumre per delt fylke.
+    """
+    hele_fylker = [
+        fylkesnummer
+        for fylkesnummer, navn in resultatområder.items()
+        if fylkesnummer not in delte_fylker
+        and _normaliser_resultatområde(navn) == resultatområde.value
+    ]
+    kommuner_i_delte_fylker = {
+        fylkesnummer: [
+            kommunenummer
+            for kommunenummer, navn in kommuner.items()
+            if _normaliser_resultatområde(navn) == resultatområde.value
+        ]
+        for fylkesnummer, kommuner in delte_fylker.items()
+    }
+    return hele_fylker, {
+        fylkesnummer: kommunenumre
+        for fylkesnummer, kommunenumre in kommuner_i_delte_fylker.items()
+        if kommunenumre
+    }
+
+
+def resultatområde_sql_filter(resultatområde: Resultatområde) -> str:
+    """
+    Lager en SQL-betingelse på fylkesnummer og kommunenummer for et resultatområde.
+    """
+    hele_fylker, kommuner_i_delte_fylker = geografi_i_resultatområde(resultatområde)
+
+    def sql_liste(verdier: list[str]) -> str:
+        return ", ".join(f"'{verdi}'" for verdi in verdier)
+
+    betingelser: list[str] = []
+    if hele_fylker:
+        betingelser.append(f"fylkesnummer IN ({sql_liste(hele_fylker)})")
+    for fylkesnummer, kommunenumre in kommuner_i_delte_fylker.items():
+        betingelser.append(
+            f"(fylkesnummer = '{fylkesnummer}' AND kommunenummer IN ({sql_liste(kommunenumre)}))"
+        )
+    return "(" + " OR ".join(betingelser) + ")"
+
+
+def resultatområde_parquet_filter(
+    resultatområde: Resultatområde,
+) -> list[list[tuple]]:
+    """
+    Lager et pyarrow-filter på fylkesnummer og kommunenummer for et resultatområde.
+    """
+    hele_fylker, kommuner_i_delte_fylker = geografi_i_resultatområde(resultatområde)
+
+    filtre: list[list[tuple]] = []
+    if hele_fylker:
+        filtre.append([("fylkesnummer", "in", hele_fylker)])
+    for fylkesnummer, kommunenumre in kommuner_i_delte_fylker.items():
+        filtre.append(
+            [
+                ("fylkesnummer", "==", fylkesnummer),
+                ("kommunenummer", "in", kommunenumre),
+            ]
+        )
+    return filtre
@@ -1,33 +1,212 @@
+import hashlib
 import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from functools import cache
 from pathlib import Path
 from typing import Any
 
+import numpy as np
 import pandas as pd
 
-from datafortelling_utils.datahandler import (
-    load_data_deduplicate,
+from datafortelling_utils import konstanter
+from datafortelling_utils.datahandler import load_data_inkrementelt
+from datafortelling_utils.datakilde import (
+    BigQueryDatakilde,
+    Datakilde,
+    standard_datakilde,
 )
 from datafortelling_utils.konstanter import (
     Resultatområde,
+    delte_fylker,
     fylker,
     resultatområder,
-    rogaland_lund,
-    viken_akershus,
+    statusordre,
+    undertema_navn,
 )
+from datafortelling_utils.snapshot import (
+    SNAPSHOT_MILJØVARIABEL,
+    skriv_tabell_til_snapshot,
+)
+from datafortelling_utils.sporing import spor
+
+
+def last_ned_snapshot(
+    project: str,
+    dataset: str,
+    katalog: str | Path,
+    inkrementelt_lager: str | Path | None = None,
+    datakilde: Datakilde | None = None,
+) -> None:
+    """
+    Henter alle tabellene datafortellingene bruker fra BigQuery én gang,
+    og lagrer dem deduplisert i et lokalt snapshot som leses av last_inn_* funksjonene.
+    Med inkrementelt_lager hentes ia-sak-statistikk-v1 kun fra siste tidsstempel i lageret.
+    Med datakilde hentes tabellene derfra i stedet for BigQuery (ikke inkrementelt).
+    """
+    if datakilde is None:
+        datakilde = BigQueryDatakilde(project=project, dataset=dataset)
+
+    def hent(table: str) -> pd.DataFrame:
+        distinct_colunms, dtypes, kolonner = tabeller[table]
+        if (
+            inkrementelt_lager is not None
+            and table in inkrementelle_tabeller
+            and isinstance(datakilde, BigQueryDatakilde)
+        ):
+            return load_data_inkrementelt(
+                project=project,
+                dataset=dataset,
+                table=table,
+                distinct_colunms=distinct_colunms,
+                lager=inkrementelt_lager,
+                dtypes=dtypes,
+                kolonner=kolonner,
+            )
+        return datakilde.hent_tabell(
+            table=table,
+            distinct_colunms=distinct_colunms,
+            dtypes=dtypes,
+            kolonner=kolonner,
+        )
+
+    # Tabellene hentes samtidig, men skrives én og én siden de deler manifest
+    with ThreadPoolExecutor(max_workers=len(tabeller)) as executor:
+        for table, data in zip(tabeller, executor.map(hent, tabeller)):
+            skriv_tabell_til_snapshot(
+                katalog=katalog,
+                project=project,
+                dataset=dataset,
+                table=table,
+                data=data,
+            )
+
+
+@spor
+def hent_alle_tabeller(
+    datakilde: Datakilde,
+    resultatområde: Resultatområde | None = None,
+) -> dict[str, pd.DataFrame]:
+    """
+    Henter statistikk, samarbeid, spørreundersøkelser og samarbeidsplaner samtidig.
+    Spørringene er uavhengige av hverandre, så total tid blir omtrent som for den tregeste spørringen.
+    Med resultatområde hentes kun statistikk for resultatområdet, de andre tabellene filtreres
+    når de slås sammen med statistikk.
+    """
+    with ThreadPoolExecutor(max_workers=len(tabeller)) as executor:
+        # Hver henting kjøres i en kopi av konteksten, så spans fra sporing blir barn av dette kallet
+        hentinger = {
+            table: executor.submit(
+                copy_context().run,
+                datakilde.hent_tabell,
+                table=table,
+                distinct_colunms=distinct_colunms,
+                dtypes=dtypes,
+                kolonner=kolonner,
+                # Kun statistikk har geografi, de andre tabellene filtreres etter sammenslåing
+                resultatområde=resultatområde
+                if table == "ia-sak-statistikk-v1"
+                else None,
+            )
+            for table, (distinct_colunms, dtypes, kolonner) in tabeller.items()
+        }
+        return {table: henting.result() for table, henting in hentinger.items()}
+
+
+def preprocess_samarbeidsdata(
+    rådata: dict[str, pd.DataFrame],
+    data_statistikk: pd.DataFrame,
+    resultatområde: Resultatområde | None = None,
+) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    """
+    Preprosesserer samarbeid, spørreundersøkelser og samarbeidsplaner fra hent_alle_tabeller.
+    Hvert samarbeid får resultatområdet fra siste rad for saken i data_statistikk.
+    Returns:
+        tuple: data_samarbeid, data_spørreundersøkelse, data_samarbeidsplan
+    """
+    data_samarbeid = preprocess_samarbeid(
+        raw_data_samarbeid=rådata["samarbeid-v1"],
+        data_statistikk=data_statistikk,
+        resultatområde=resultatområde,
+    )
+    data_spørreundersøkelse = preprocess_spørreundersøkelser(
+        data_spørreundersøkelse=rådata["sporreundersokelse-v1"],
+        data_samarbeid=data_samarbeid,
+        resultatområde=resultatområde,
+    )
+    data_samarbeidsplan = preprocess_samarbeidsplan(
+        data_samarbeidsplan=rådata["samarbeidsplan-v1"],
+        data_samarbeid=data_samarbeid,
+        resultatområde=resultatområde,
+    )
+    return data_samarbeid, data_spørreundersøkelse, data_samarbeidsplan
+
+
+@spor
+def last_inn_alle_data(
+    project: str,
+    dataset: str,
+    resultatområde: Resultatområde | None = None,
+    datakilde: Datakilde | None = None,
+) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    """
+    Henter statistikk, samarbeid, spørreundersøkelser og samarbeidsplaner samtidig,
+    og slår dem sammen når alle er hentet.
+    Returns:
+        tuple: data_statistikk, data_samarbeid, data_spørreundersøkelse, data_samarbeidsplan
+    """
+    if datakilde is None:
+        datakilde = standard_datakilde(project=project, dataset=dataset)
+
+    rådata = hent_alle_tabeller(datakilde=datakilde, resultatområde=resultatområde)
+    data_statistikk = preprocess_data_statistikk(
+        data_statistikk=rådata["ia-sak-statistikk-v1"],
+        resultatområde=resultatområde,
+    )
+    return (
+        data_statistikk,
+        *preprocess_samarbeidsdata(
+            rådata=rådata,
+            data_statistikk=data_statistikk,
+            resultatområde=resultatområde,
+        ),
+    )
 
 
+@spor
 def last_inn_spørreundersøkelser(
     project: str,
     dataset: str,
     data_samarbeid: pd.DataFrame,
     resultatområde: Resultatområde | None = None,
+    kolonner: list[str] | None = None,
+    datakilde: Datakilde | None = None,
 ) -> pd.DataFrame:
-    data_spørreundersøkelse: pd.DataFrame = load_data_deduplicate(
-        project=project,
-        dataset=dataset,
+    if datakilde is None:
+        datakilde = standard_datakilde(project=project, dataset=dataset)
+
+    data_spørreundersøkelse: pd.DataFrame = datakilde.hent_tabell(
         table="sporreundersokelse-v1",
         distinct_colunms="id",
-    ).rename(columns={"samarbeidId": "samarbeid_id"})
+        kolonner=kolonner or spørreundersøkelse_kolonner,
+    )
+
+    return preprocess_spørreundersøkelser(
+        data_spørreundersøkelse=data_spørreundersøkelse,
+        data_samarbeid=data_samarbeid,
+        resultatområde=resultatområde,
+    )
+
+
+def preprocess_spørreundersøkelser(
+    data_spørreundersøkelse: pd.DataFrame,
+    data_samarbeid: pd.DataFrame,
+    resultatområde: Resultatområde | None = None,
+) -> pd.DataFrame:
+    data_spørreundersøkelse = data_spørreundersøkelse.rename(
+        columns={"samarbeidId": "samarbeid_id"}
+    )
 
     # filtrer ut spørreundersøkelser uten svar og de som har blitt slettet.
     data_spørreundersøkelse = data_spørreundersøkelse[
@@ -56,22 +235,39 @@ def last_inn_spørreundersøkelser(
             data_spørreundersøkelse["resultatomrade"] == resultatområde.value
         ]
 
-    return data_spørreundersøkelse
+    return som_kategorier(data_spørreundersøkelse, spørreundersøkelse_kategorier)
 
 
+@spor
 def last_inn_samarbeid(
     project: str,
     dataset: str,
     data_statistikk: pd.DataFrame,
     resultatområde: Resultatområde | None = None,
+    kolonner: list[str] | None = None,
+    datakilde: Datakilde | None = None,
 ):
-    raw_data_samarbeid = load_data_deduplicate(
-        project=project,
-        dataset=dataset,
+    if datakilde is None:
+        datakilde = standard_datakilde(project=project, dataset=dataset)
+
+    raw_data_samarbeid = datakilde.hent_tabell(
         table="samarbeid-v1",
         distinct_colunms="id",
+        kolonner=kolonner or samarbeid_kolonner,
     )
 
+    return preprocess_samarbeid(
+        raw_data_samarbeid=raw_data_samarbeid,
+        data_statistikk=data_statistikk,
+        resultatområde=resultatområde,
+    )
+
+
+def preprocess_samarbeid(
+    raw_data_samarbeid: pd.DataFrame,
+    data_statistikk: pd.DataFrame,
+    resultatområde: Resultatområde | None = None,
+) -> pd.DataFrame:
     data_samarbeid: pd.DataFrame = raw_data_samarbeid[
         raw_data_samarbeid["status"] != "SLETTET"
     ]
@@ -107,18 +303,21 @@ def last_inn_samarbeid(
 
     data_samarbeid["opprettet"] = pd.to_datetime(data_samarbeid["opprettet"])
 
-    return data_samarbeid
+    return som_kategorier(data_samarbeid, samarbeid_kategorier)
 
 
 def antall_planer(data_samarbeidsplan: pd.DataFrame) -> int:
     return data_samarbeidsplan["plan_id"].nunique()
 
 
+@spor
 def last_inn_data_samarbeidsplan(
     project: str,
     dataset: str,
     data_samarbeid: pd.DataFrame,
     resultatområde: Resultatområde | None = None,
+    kolonner: list[str] | None = None,
+    datakilde: Datakilde | None = None,
 ) -> pd.DataFrame:
     """
     Henter data for samarbeidsplaner og legger til mer data fra samarbeid.
@@ -127,17 +326,33 @@ def last_inn_data_samarbeidsplan(
         dataset (str): BigQuery dataset
         data_samarbeid (pd.DataFrame): DataFrame med samarbeid
         resultatområde (Resultatområde | None): Filtrering på resultatområde, hvis None hentes alle
+        kolonner (list[str] | None): Kolonner som hentes fra BigQuery, hvis None brukes samarbeidsplan_kolonner
+        datakilde (Datakilde | None): Hvor data hentes fra, hvis None velges den ut fra miljøet
     Returns:
         pd.DataFrame: DataFrame med samarbeidsplaner og data om samarbeid
     """
 
-    data_samarbeidsplan: pd.DataFrame = load_data_deduplicate(
-        project=project,
-        dataset=dataset,
+    if datakilde is None:
+        datakilde = standard_datakilde(project=project, dataset=dataset)
+
+    data_samarbeidsplan: pd.DataFrame = datakilde.hent_tabell(
         table="samarbeidsplan-v1",
         distinct_colunms="id",
+        kolonner=kolonner or samarbeidsplan_kolonner,
     )
 
+    return preprocess_samarbeidsplan(
+        data_samarbeidsplan=data_samarbeidsplan,
+        data_samarbeid=data_samarbeid,
+        resultatområde=resultatområde,
+    )
+
+
+def preprocess_samarbeidsplan(
+    data_samarbeidsplan: pd.DataFrame,
+    data_samarbeid: pd.DataFrame,
+    resultatområde: Resultatområde | None = None,
+) -> pd.DataFrame:
     # Filtrer ut ikke-inkludert innhold.
     # Bryr oss kun om undertemaer som er inkludert.
     data_samarbeidsplan: pd.DataFrame = data_samarbeidsplan[
@@ -175,45 +390,41 @@ def last_inn_data_samarbeidsplan(
         data_samarbeidsplan["slutt_dato"] - data_samarbeidsplan["start_dato"]
     ).dt.days
 
-    return data_samarbeidsplan
+    return som_kategorier(data_samarbeidsplan, samarbeidsplan_kategorier)
 
 
+@spor
 def last_inn_data_statistikk(
     project: str,
     dataset: str,
     resultatområde: Resultatområde | None = None,
     limit: str = "",
+    kolonner: list[str] | None = None,
+    datakilde: Datakilde | None = None,
 ) -> pd.DataFrame:
-    data_file = Path(__file__).resolve().parent / "data" / "administrative_enheter.csv"
-    adm_enheter: pd.DataFrame = pd.read_csv(data_file, dtype=str)
+    if datakilde is None:
+        datakilde = standard_datakilde(project=project, dataset=dataset)
 
-    data_statistikk = load_data_deduplicate(
-        project=project,
-        dataset=dataset,
+    data_statistikk = datakilde.hent_tabell(
         table="ia-sak-statistikk-v1",
         distinct_colunms="endretAvHendelseId",
         dtypes=statistikk_dtypes,
         limit=limit,
+        kolonner=kolonner or statistikk_kolonner,
+        resultatområde=resultatområde,
     )
 
-    kolonner_ikke_i_bruk_i_datafortellinger: list[str] = [
-        "arstall",
-        "kvartal",
-        "kvartaler",
-        "tapteDagsverkGradert",
-        "graderingsprosent",
-        "enhetsnummer",
-        "postnummer",
-        "muligeDagsverkSiste4Kvartal",
-        "sykefraversprosentSiste4Kvartal",
-        "tapteDagsverkSiste4Kvartal",
-        "tapteDagsverkGradertSiste4Kvartal",
-        "graderingsprosentSiste4Kvartal",
-    ]
+    return preprocess_data_statistikk(
+        data_statistikk=data_statistikk,
+        resultatområde=resultatområde,
+    )
 
-    data_statistikk = data_statistikk.drop(
-        columns=kolonner_ikke_i_bruk_i_datafortellinger
-    ).reset_index(drop=True)
+
+def preprocess_data_statistikk(
+    data_statistikk: pd.DataFrame,
+    resultatområde: Resultatområde | None = None,
+) -> pd.DataFrame:
+    data_statistikk = data_statistikk.reset_index(drop=True)
 
     # BUG: 6 rader mangler neringer, dropper disse
     data_statistikk: pd.DataFrame = data_statistikk[data_statistikk["neringer"] != "[]"]
@@ -226,19 +437,16 @@ def last_inn_data_statistikk(
         "endretTidspunkt"
     ].dt.strftime("%Y-%m")
 
-    data_statistikk = legg_til_regional_tilhørighet(
-        data=data_statistikk,
-        adm_enheter=adm_enheter,
-    )
+    data_statistikk = legg_til_regional_tilhørighet(data=data_statistikk)
 
-    data_statistikk["hoved_nering"] = data_statistikk["neringer"].apply(parse_næring)
+    data_statistikk["hoved_nering"] = hovednæring(data_statistikk["neringer"])
 
     # TODO: Bruker vi egentlig bare hoved_nering_truncated for printing?
     # kan vi heller ta kolonnen inn i en funksjon før output? Hvorfor pre-processere noe som ikke alltid brukes
-    data_statistikk["hoved_nering_truncated"] = data_statistikk["hoved_nering"]
-    data_statistikk.loc[
-        data_statistikk["hoved_nering"].str.len() > 50, "hoved_nering_truncated"
-    ] = data_statistikk["hoved_nering"].str[:47] + "..."
+    # hoved_nering er kategorier, så map forkorter kun hver unike næring
+    data_statistikk["hoved_nering_truncated"] = data_statistikk["hoved_nering"].map(
+        lambda næring: næring if len(næring) <= 50 else næring[:47] + "..."
+    )
 
     # Gruppering av virksomheter per antall ansatte
     col_name = "antallPersoner_gruppe"
@@ -263,7 +471,7 @@ def last_inn_data_statistikk(
             data_statistikk["resultatomrade"] == resultatområde.value
         ]
 
-    return data_statistikk
+    return som_kategorier(data_statistikk, statistikk_kategorier)
 
 
 def parse_næring(json_string: str) -> str:
@@ -275,51 +483,172 @@ def parse_næring(json_string: str) -> str:
         return data[0]["navn"]
 
 
-def legg_til_regional_tilhørighet(
-    data: pd.DataFrame,
-    adm_enheter: pd.DataFrame,
+def hovednæring(neringer: pd.Series) -> pd.Categorical:
+    """
+    Finner hovednæring fra neringer (json) som kategorier.
+    Samme neringer gjentas for alle hendelser i en sak, så json parses kun én gang per unike verdi.
+    """
+    koder, unike_neringer = pd.factorize(neringer)
+    # Sorterte kategorier, slik som astype("category") gir
+    næring_koder, næringer = pd.factorize(unike_neringer.map(parse_næring), sort=True)
+    # Manglende neringer har kode -1 og blir NaN
+    return pd.Categorical.from_codes(
+        np.where(koder >= 0, næring_koder[koder], -1), categories=næringer
+    )
+
+
+GEOGRAFI_NØKKEL = ["fylkesnummer", "kommunenummer"]
+
+
+def _regional_tilhørighet(
+    par: pd.DataFrame, kommunenummer_2024: pd.Series
 ) -> pd.DataFrame:
-    # BUG: noen kolonner mangler data, dropper disse for å unngå følgefeil i utledede kolonner som resultatområde
-    # Dette gjelder (per 2025-06-04): 6 rader uten kommunenummer, 22 rader uten fylkesnummer
-    data_statistikk = data.copy()
-    data_statistikk = data_statistikk.dropna(subset=["kommunenummer", "fylkesnummer"])
+    """
+    Utleder fylkesnavn, resultatområde og kommunenummer 2024 for unike (fylkesnummer, kommunenummer).
+    """
+    oppslag = par[GEOGRAFI_NØKKEL].reset_index(drop=True)
 
     # Legger til en kolonne fylkesnavn basert på fylkesnummer
-    data_statistikk["fylkesnavn"] = data_statistikk["fylkesnummer"].map(fylker)
+    oppslag["fylkesnavn"] = oppslag["fylkesnummer"].map(fylker)
 
     # Legger til en kolonne resultatomrade basert på fylkesnummer (før og etter 2024 kommune- og fylkesendringer)
-    data_statistikk["resultatomrade"] = data_statistikk["fylkesnummer"].map(
-        resultatområder
+    # Akershus fylke (fylkesnummer 32), må deles i øst- og vest-viken for å få rett grenser i resultatområde
+    # Lund kommune i Rogaland følges opp av resultatområdet Agder, så regnes som en del av Agder resultatområde
+    resultatområde = oppslag["fylkesnummer"].map(resultatområder)
+    for fylkesnummer, kommuner in delte_fylker.items():
+        i_fylket = oppslag["fylkesnummer"] == fylkesnummer
+        resultatområde[i_fylket] = oppslag.loc[i_fylket, "kommunenummer"].map(kommuner)
+    # Manglende resultatområde blir "nan", som før
+    oppslag["resultatomrade"] = (
+        resultatområde.fillna("nan").str.replace(" ", "_").str.lower()
     )
 
-    # Akershus fylke (fylkesnummer 32), må deles i øst- og vest-viken for å få rett grenser i resultatområde
-    data_statistikk.loc[data_statistikk["fylkesnummer"] == "32", "resultatomrade"] = (
-        data_statistikk["kommunenummer"].map(viken_akershus)
+    oppslag["kommunenummer 2024"] = (
+        oppslag["kommunenummer"]
+        .map(kommunenummer_2024)
+        .fillna(oppslag["kommunenummer"])
     )
+    return oppslag
 
-    # Lund kommune i Rogaland følges opp av resultatområdet Agder, så regnes som en del av Agder resultatområde
-    data_statistikk.loc[data_statistikk["fylkesnummer"] == "11", "resultatomrade"] = (
-        data_statistikk["kommunenummer"].map(rogaland_lund)
+
+ADMINISTRATIVE_ENHETER = (
+    Path(__file__).resolve().parent / "data" / "administrative_enheter.csv"
+)
+OPPSLAG_KATALOG = "oppslag"
+
+
+@cache
+def _kommunenummer_2024() -> pd.Series:
+    adm_enheter: pd.DataFrame = pd.read_csv(ADMINISTRATIVE_ENHETER, dtype=str)
+    return adm_enheter.set_index("kommunenummer 2023")["kommunenummer"]
+
+
+def geografisk_oppslag_fil() -> Path | None:
+    """
+    Parquet-fil med oppslagstabellen i snapshot, i en egen katalog så den ikke leses som en tabell.
+    Navnet har hash av administrative_enheter.csv og koden og konstantene tabellen utledes med,
+    så en endring i noen av dem gir en ny fil. None om FIA_SNAPSHOT ikke er satt.
+    """
+    katalog = os.environ.get(SNAPSHOT_MILJØVARIABEL)
+    if not katalog:
+        return None
+    sha256 = hashlib.sha256()
+    for fil in [ADMINISTRATIVE_ENHETER, Path(__file__), Path(konstanter.__file__)]:
+        sha256.update(fil.read_bytes())
+    return (
+        Path(katalog)
+        / OPPSLAG_KATALOG
+        / f"geografisk_oppslag-{sha256.hexdigest()[:16]}.parquet"
     )
 
-    data_statistikk["resultatomrade"] = data_statistikk["resultatomrade"].apply(
-        lambda x: str(x).replace(" ", "_").lower()
+
+@cache
+def geografisk_oppslag() -> pd.DataFrame:
+    """
+    Oppslagstabell for regional tilhørighet per (fylkesnummer, kommunenummer),
+    for alle kommuner i administrative_enheter.csv, med både 2023 og 2024 kommunenummer.
+    Leses fra geografisk_oppslag_fil om den finnes, ellers bygges den og lagres der,
+    så prosessene som deler et snapshot kun bygger den én gang. Holdes i minnet resten av prosessen.
+    """
+    fil = geografisk_oppslag_fil()
+    if fil is not None and fil.exists():
+        return pd.read_parquet(fil)
+
+    kommunenummer_2024 = _kommunenummer_2024()
+    kommunenumre = pd.Series(
+        pd.concat(
+            [pd.Series(kommunenummer_2024.index), pd.Series(kommunenummer_2024.values)]
+        )
+        .dropna()
+        .unique()
     )
+    # De to første sifrene i kommunenummeret er fylkesnummeret
+    par = pd.DataFrame(
+        {"fylkesnummer": kommunenumre.str[:2], "kommunenummer": kommunenumre}
+    )
+    oppslag = _regional_tilhørighet(par, kommunenummer_2024)
+    if fil is not None:
+        fil.parent.mkdir(parents=True, exist_ok=True)
+        oppslag.to_parquet(fil, index=False)
+    return oppslag
 
-    # Leser alle kommunenummer og mapper til 2024 kommunenummer
-    # TODO: Bør dette skje før vi ordner fylkesnavn og resultatområde?
-    # Kan gjøre mapping enklere
-    alle_kommunenummer: pd.DataFrame = adm_enheter[
-        ["kommunenummer", "kommunenummer 2023"]
-    ]
 
-    data_statistikk["kommunenummer 2024"] = (
-        data_statistikk["kommunenummer"]
-        .map(alle_kommunenummer.set_index("kommunenummer 2023")["kommunenummer"])
-        .fillna(data_statistikk["kommunenummer"])
+def legg_til_regional_tilhørighet(
+    data: pd.DataFrame,
+    oppslag: pd.DataFrame | None = None,
+) -> pd.DataFrame:
+    """
+    Legger til fylkesnavn, resultatomrade og kommunenummer 2024 med én join mot oppslagstabellen.
+    Kombinasjoner av fylkesnummer og kommunenummer som ikke finnes i tabellen utledes for seg.
+    """
+    # BUG: noen kolonner mangler data, dropper disse for å unngå følgefeil i utledede kolonner som resultatområde
+    # Dette gjelder (per 2025-06-04): 6 rader uten kommunenummer, 22 rader uten fylkesnummer
+    data_statistikk = data.dropna(subset=GEOGRAFI_NØKKEL)
+
+    if oppslag is None:
+        oppslag = geografisk_oppslag()
+
+    par = data_statistikk[GEOGRAFI_NØKKEL].drop_duplicates().astype(str)
+    ukjente = par.merge(oppslag[GEOGRAFI_NØKKEL], how="left", indicator=True)
+    ukjente = ukjente[ukjente["_merge"] == "left_only"]
+    if not ukjente.empty:
+        oppslag = pd.concat(
+            [oppslag, _regional_tilhørighet(ukjente, _kommunenummer_2024())],
+            ignore_index=True,
+        )
+
+    oppslag = oppslag.astype(
+        {kolonne: data_statistikk[kolonne].dtype for kolonne in GEOGRAFI_NØKKEL}
+    )
+    return data_statistikk.merge(oppslag, on=GEOGRAFI_NØKKEL, how="left").set_axis(
+        data_statistikk.index
     )
 
-    return data_statistikk
+
+def som_kategorier(
+    data: pd.DataFrame, kategorier: dict[str, list[str] | None]
+) -> pd.DataFrame:
+    """
+    Gjør kolonner med få unike verdier om til kategorier, så hver verdi lagres én gang.
+    Med en liste får kategoriene fast rekkefølge (f.eks. statusordre), som også gir sortering,
+    og verdier som ikke finnes i listen legges til sist. Med None brukes verdiene i dataene.
+    Kolonner som allerede er kategorier får kun kategoriene til verdiene som finnes i dataene,
+    slik at et utsnitt av dataene får de samme kategoriene som om det ble lastet inn alene.
+    """
+    data = data.copy()
+    for kolonne, rekkefølge in kategorier.items():
+        if kolonne not in data.columns:
+            continue
+        if rekkefølge is None:
+            data[kolonne] = (
+                data[kolonne].astype("category").cat.remove_unused_categories()
+            )
+            continue
+        ukjente = sorted(set(data[kolonne].dropna().unique()) - set(rekkefølge))
+        data[kolonne] = data[kolonne].astype(
+            pd.CategoricalDtype(rekkefølge + ukjente, ordered=True)
+        )
+    return data
 
 
 statistikk_dtypes: dict[str, Any] = {
@@ -352,3 +681,119 @@ statistikk_dtypes: dict[str, Any] = {
     "tapteDagsverkGradertSiste4Kvartal": pd.Float64Dtype(),  # NULLABLE
     "graderingsprosentSiste4Kvartal": pd.Float64Dtype(),  # NULLABLE
 }
+
+
+# Kolonner som hentes fra BigQuery. Kolonner som ikke brukes i datafortellingene
+# (f.eks. arstall, kvartal, postnummer og Siste4Kvartal-tallene) hentes ikke.
+statistikk_kolonner: list[str] = [
+    "saksnummer",
+    "orgnr",
+    "eierAvSak",
+    "status",
+    "hendelse",
+    "endretAvHendelseId",
+    "endretTidspunkt",
+    "opprettetTidspunkt",
+    "avsluttetTidspunkt",
+    "ikkeAktuelBegrunnelse",
+    "antallPersoner",
+    "tapteDagsverk",
+    "muligeDagsverk",
+    "sykefraversprosent",
+    "sektor",
+    "neringer",
+    "bransjeprogram",
+    "kommunenummer",
+    "fylkesnummer",
+    "endretAv",
+    "endretAvRolle",
+    "enhetsnavn",
+    "tidsstempel",
+]
+
+samarbeid_kolonner: list[str] = [
+    "id",
+    "saksnummer",
+    "status",
+    "opprettet",
+    "fullfort",
+    "tidsstempel",
+]
+
+spørreundersøkelse_kolonner: list[str] = [
+    "id",
+    "samarbeidId",
+    "type",
+    "status",
+    "harMinstEttSvar",
+    "endret",
+    "fullfort",
+    "tidsstempel",
+]
+
+samarbeidsplan_kolonner: list[str] = [
+    "id",
+    "plan_id",
+    "samarbeid_id",
+    "navn",
+    "inkludert",
+    "status",
+    "start_dato",
+    "slutt_dato",
+    "tidsstempel",
+]
+
+# Tabeller i BigQuery med kolonne(r) for deduplisering, eventuelle dtypes og kolonner som hentes
+tabeller: dict[str, tuple[str, dict[str, Any] | None, list[str]]] = {
+    "ia-sak-statistikk-v1": (
+        "endretAvHendelseId",
+        statistikk_dtypes,
+        statistikk_kolonner,
+    ),
+    "samarbeid-v1": ("id", None, samarbeid_kolonner),
+    "sporreundersokelse-v1": ("id", None, spørreundersøkelse_kolonner),
+    "samarbeidsplan-v1": ("id", None, samarbeidsplan_kolonner),
+}
+
+# Hendelsestabeller som kun vokser, og kan hentes inkrementelt basert på tidsstempel
+inkrementelle_tabeller: list[str] = ["ia-sak-statistikk-v1"]
+
+# Kategorier per tabell, se som_kategorier. None betyr at kategoriene hentes fra dataene.
+samarbeid_statusordre: list[str] = ["AKTIV", "FULLFØRT", "AVBRUTT", "SLETTET"]
+
+statistikk_kategorier: dict[str, list[str] | None] = {
+    "status": statusordre,
+    "hendelse": None,
+    "resultatomrade": None,
+    "fylkesnavn": None,
+    "sektor": None,
+    "endretAvRolle": None,
+    "antallPersoner_gruppe": ["0", "1-4", "5-19", "20-49", "50-99", "100+", "Ukjent"],
+    "hoved_nering": None,
+    "hoved_nering_truncated": None,
+}
+
+samarbeid_kategorier: dict[str, list[str] | None] = {
+    "status": samarbeid_statusordre,
+    "resultatomrade": None,
+    "sektor": None,
+    "hoved_nering": None,
+}
+
+spørreundersøkelse_kategorier: dict[str, list[str] | None] = {
+    "type": None,
+    "status": ["OPPRETTET", "PÅGÅR", "AVSLUTTET", "SLETTET"],
+    "resultatomrade": None,
+    "sektor": None,
+    "hoved_nering": None,
+    "samarbeid_status": samarbeid_statusordre,
+}
+
+samarbeidsplan_kategorier: dict[str, list[str] | None] = {
+    "navn": undertema_navn,
+    "status": ["PLANLAGT", "PÅGÅR", "FULLFØRT", "AVBRUTT"],
+    "resultatomrade": None,
+    "sektor": None,
+    "hoved_nering": None,
+    "samarbeid_status": samarbeid_statusordre,
+}
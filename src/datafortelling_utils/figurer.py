@@ -0,0 +1,192 @@
+import gzip
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+from pathlib import Path
+
+PAGES_KATALOG = "pages"
+# Katalog i pages med figurene, delt av alle sidene
+FIGUR_KATALOG = "figurer"
+LASTER_FILNAVN = "lastfigur.js"
+# Katalog i figurer med templates, navngitt etter innholdet
+MAL_KATALOG = "maler"
+
+newplot_re = re.compile(r'Plotly\.newPlot\(\s*"([^"]+)"\s*,\s*')
+komma_re = re.compile(r"\s*,\s*")
+slutt_re = re.compile(r"\s*\)")
+
+# Laster figurene først når de vises, og deler template mellom alle figurene på siden.
+# Filene er gzip, og pakkes ut i nettleseren med mindre serveren allerede har gjort det.
+LASTER = """window.lastFigur = (function () {
+  var hentet = {};
+  function hent(url) {
+    if (!hentet[url]) {
+      hentet[url] = fetch(url).then(function (svar) {
+        if (!svar.ok) throw new Error(url + ": HTTP " + svar.status);
+        return svar.arrayBuffer();
+      }).then(function (innhold) {
+        var bytes = new Uint8Array(innhold);
+        var tekst = bytes[0] === 0x1f && bytes[1] === 0x8b
+          ? new Response(new Blob([bytes]).stream().pipeThrough(new DecompressionStream("gzip"))).text()
+          : Promise.resolve(new TextDecoder().decode(bytes));
+        return tekst.then(JSON.parse);
+      });
+    }
+    return hentet[url];
+  }
+  return function (Plotly, id, katalog, fil, config) {
+    return new Promise(function (ferdig, feil) {
+      var observer = new IntersectionObserver(function (synlige) {
+        if (!synlige.some(function (s) { return s.isIntersecting; })) return;
+        observer.disconnect();
+        hent(katalog + "/" + fil).then(function (figur) {
+          var mal = figur.mal ? hent(katalog + "/" + figur.mal) : Promise.resolve(undefined);
+          return mal.then(function (template) {
+            if (template) figur.layout.template = template;
+            return Plotly.newPlot(id, figur.data, figur.layout, config);
+          });
+        }).then(ferdig, feil);
+      }, { rootMargin: "300px" });
+      observer.observe(document.getElementById(id));
+    });
+  };
+})();
+"""
+
+
+def _komprimer(innhold: dict) -> tuple[bytes, str]:
+    data = json.dumps(innhold, ensure_ascii=False, separators=(",", ":")).encode()
+    # mtime=0 gir samme bytes for samme innhold, så opplastingen ser filen som uendret
+    return gzip.compress(data, compresslevel=9, mtime=0), hashlib.sha256(
+        data
+    ).hexdigest()[:20]
+
+
+def _skriv_mal(katalog: Path, template: dict) -> str:
+    """
+    Skriver templaten med hash av innholdet i filnavnet, så alle figurer med samme template deler den.
+    Templaten endres kun med plotly, så navnet er det samme fra kjøring til kjøring.
+    """
+    data, hash_ = _komprimer(template)
+    filnavn = f"{MAL_KATALOG}/{hash_}.json.gz"
+    if not (katalog / filnavn).exists():
+        (katalog / filnavn).parent.mkdir(parents=True, exist_ok=True)
+        (katalog / filnavn).write_bytes(data)
+    return filnavn
+
+
+def _skriv_figur(katalog: Path, figur: dict, navn: str, skrevet: dict[str, str]) -> str:
+    """
+    Skriver figuren til navn, fast for siden og figurens plass på siden, så en figur som får nye
+    data beholder navnet og opplastingen ikke ser filer som forsvinner hver natt. En figur som er
+    lik en som allerede er skrevet, på samme eller en annen side, bruker den filen.
+    Hash av innholdet legges i adressen, så nettleseren ikke bruker en gammel versjon fra cache.
+    """
+    data, hash_ = _komprimer(figur)
+    if hash_ not in skrevet:
+        (katalog / navn).parent.mkdir(parents=True, exist_ok=True)
+        (katalog / navn).write_bytes(data)
+        skrevet[hash_] = navn
+    return f"{skrevet[hash_]}?v={hash_}"
+
+
+def _hopp_over(regex: re.Pattern, html: str, posisjon: int) -> int:
+    treff = regex.match(html, posisjon)
+    if treff is None:
+        raise ValueError(f"Fant ikke {regex.pattern} på posisjon {posisjon}")
+    return treff.end()
+
+
+def _skill_ut_side(
+    html: str,
+    katalog: Path,
+    relativ_katalog: str,
+    side: str,
+    skrevet: dict[str, str],
+) -> tuple[str, int]:
+    """
+    Erstatter Plotly.newPlot med data i siden med lastFigur og en referanse til figurfilen,
+    figurer/<side>/<nummer>.json.gz. Kall som ikke kan leses som JSON blir stående som de er.
+    """
+    dekoder = json.JSONDecoder()
+    deler = []
+    forrige = 0
+    antall = 0
+    for treff in newplot_re.finditer(html):
+        if treff.start() < forrige:
+            continue
+        try:
+            data, posisjon = dekoder.raw_decode(html, treff.end())
+            posisjon = _hopp_over(komma_re, html, posisjon)
+            layout, posisjon = dekoder.raw_decode(html, posisjon)
+            config = {}
+            if komma_re.match(html, posisjon):
+                posisjon = _hopp_over(komma_re, html, posisjon)
+                config, posisjon = dekoder.raw_decode(html, posisjon)
+            posisjon = _hopp_over(slutt_re, html, posisjon)
+        except ValueError:
+            continue
+
+        template = layout.pop("template", None)
+        figur = {
+            "data": data,
+            "layout": layout,
+            "mal": None if template is None else _skriv_mal(katalog, template),
+        }
+        fil = _skriv_figur(katalog, figur, f"{side}/{antall}.json.gz", skrevet)
+        deler += [
+            html[forrige : treff.start()],
+            f'lastFigur(Plotly, "{treff.group(1)}", "{relativ_katalog}", "{fil}", {json.dumps(config)})',
+        ]
+        forrige = posisjon
+        antall += 1
+    return "".join(deler) + html[forrige:], antall
+
+
+def skill_ut_figurer(pages: str | Path = PAGES_KATALOG) -> None:
+    """
+    Flytter Plotly-figurene ut av html-sidene i pages til komprimerte JSON-filer i pages/figurer,
+    med faste navn per side og figur, så like figurer og templates deles av alle sidene.
+    Sidene laster figurene med lastfigur.js først når de vises.
+    """
+    pages = Path(pages)
+    katalog = pages / FIGUR_KATALOG
+    # Figurer fra en tidligere utskilling i samme pages skal ikke lastes opp
+    if katalog.exists():
+        shutil.rmtree(katalog)
+    katalog.mkdir(parents=True)
+    (katalog / LASTER_FILNAVN).write_text(LASTER, encoding="utf-8")
+
+    skrevet: dict[str, str] = {}
+    før = etter = figurer = 0
+    for side in sorted(pages.rglob("*.html")):
+        html = side.read_text(encoding="utf-8")
+        relativ_katalog = Path(os.path.relpath(katalog, side.parent)).as_posix()
+        ny_html, antall = _skill_ut_side(
+            html,
+            katalog,
+            relativ_katalog,
+            side.relative_to(pages).with_suffix("").as_posix(),
+            skrevet,
+        )
+        if antall == 0:
+            continue
+        ny_html = ny_html.replace(
+            "</head>",
+            f'<script src="{relativ_katalog}/{LASTER_FILNAVN}"></script>\n</head>',
+            1,
+        )
+        side.write_text(ny_html, encoding="utf-8")
+        før += len(html.encode())
+        etter += len(ny_html.encode())
+        figurer += antall
+
+    figurfiler = list(katalog.rglob("*.json.gz"))
+    logging.info(
+        f"Skilte ut {figurer} figurer til {len(figurfiler)} filer i {katalog}: "
+        f"sidene gikk fra {før / 1024 / 1024:.1f} MB til {etter / 1024 / 1024:.1f} MB, "
+        f"med {sum(fil.stat().st_size for fil in figurfiler) / 1024 / 1024:.1f} MB figurer"
+    )
@@ -0,0 +1,178 @@
+import logging
+import os
+from pathlib import Path
+
+import pandas as pd
+
+from datafortelling_utils.datahandler import split_data_statistikk
+from datafortelling_utils.datakilde import Datakilde, standard_datakilde
+from datafortelling_utils.dataloader import (
+    hent_alle_tabeller,
+    last_inn_alle_data,
+    last_inn_data_statistikk,
+    preprocess_data_statistikk,
+    preprocess_samarbeidsdata,
+    som_kategorier,
+    statistikk_kategorier,
+)
+from datafortelling_utils.konstanter import Resultatområde, saksflyt_limit
+from datafortelling_utils.sporing import spor
+
+# Miljøvariabel som peker på katalogen med forberedte data, settes av main.py før rendering
+FORBEREDT_MILJØVARIABEL = "FIA_FORBEREDT"
+HELE_LANDET = "norge"
+
+# Forberedte tabeller, i samme rekkefølge som last_inn_saksflyt og last_inn_samarbeidsdata returnerer dem
+saksflyt_tabeller: list[str] = ["status_saksflyt"]
+samarbeid_tabeller: list[str] = ["samarbeid", "sporreundersokelse", "samarbeidsplan"]
+
+
+def forberedt_filnavn(
+    katalog: str | Path, tabell: str, resultatområde: Resultatområde | None
+) -> Path:
+    område = HELE_LANDET if resultatområde is None else resultatområde.value
+    return Path(katalog) / område / f"{tabell}.parquet"
+
+
+def del_på_resultatområde(
+    data: pd.DataFrame,
+    kategorier: dict[str, list[str] | None],
+    resultatområde: Resultatområde | None,
+) -> pd.DataFrame:
+    """
+    Henter radene i et resultatområde fra data for hele landet, med samme indeks og kategorier
+    som om dataene var lastet inn for resultatområdet alene.
+    """
+    if resultatområde is not None:
+        data = data[data["resultatomrade"] == resultatområde.value]
+    return som_kategorier(data.reset_index(drop=True), kategorier)
+
+
+def forbered_data(
+    project: str,
+    dataset: str,
+    katalog: str | Path,
+    datakilde: Datakilde | None = None,
+    saksflyt: bool = True,
+) -> None:
+    """
+    Laster inn data for hele landet én gang, og lagrer dem preprosessert per resultatområde
+    som parquet. Datafortellingene leser sitt utsnitt med last_inn_saksflyt og
+    last_inn_samarbeidsdata når FIA_FORBEREDT peker på katalogen, i stedet for å laste inn selv.
+    Radene deles opp per resultatområde før preprosesseringen per sak, så en sak som har flyttet
+    mellom resultatområder kun har historikken i hvert resultatområde, som når det lastes inn alene.
+    Uten saksflyt forberedes kun samarbeidsdata, f.eks. når saksflyt-sidene hentes fra arkivet.
+    """
+    if datakilde is None:
+        datakilde = standard_datakilde(project=project, dataset=dataset)
+
+    rådata = hent_alle_tabeller(datakilde=datakilde)
+    data_statistikk = preprocess_data_statistikk(rådata["ia-sak-statistikk-v1"])
+    data_saksflyt = (
+        last_inn_data_statistikk(
+            project=project,
+            dataset=dataset,
+            limit=saksflyt_limit,
+            datakilde=datakilde,
+        )
+        if saksflyt
+        else None
+    )
+
+    for resultatområde in [None, *Resultatområde]:
+        tabeller = dict(
+            zip(
+                samarbeid_tabeller,
+                preprocess_samarbeidsdata(
+                    rådata=rådata,
+                    data_statistikk=del_på_resultatområde(
+                        data_statistikk, statistikk_kategorier, resultatområde
+                    ),
+                    resultatområde=resultatområde,
+                ),
+                strict=True,
+            )
+        )
+        if data_saksflyt is not None:
+            tabeller["status_saksflyt"], _, _ = split_data_statistikk(
+                del_på_resultatområde(
+                    data_saksflyt, statistikk_kategorier, resultatområde
+                )
+            )
+        for tabell, data in tabeller.items():
+            fil = forberedt_filnavn(katalog, tabell, resultatområde)
+            fil.parent.mkdir(parents=True, exist_ok=True)
+            data.to_parquet(fil, index=False)
+    logging.info(
+        f"Forberedte {len(tabeller)} tabeller for hele landet og {len(Resultatområde)} resultatområder i {katalog}"
+    )
+
+
+def les_forberedt(
+    tabeller: list[str], resultatområde: Resultatområde | None
+) -> list[pd.DataFrame] | None:
+    """
+    Leser forberedte tabeller for et resultatområde.
+    Returnerer None om FIA_FORBEREDT ikke er satt eller en av tabellene mangler.
+    """
+    katalog = os.environ.get(FORBEREDT_MILJØVARIABEL)
+    if not katalog:
+        return None
+
+    filer = [forberedt_filnavn(katalog, tabell, resultatområde) for tabell in tabeller]
+    mangler = [fil for fil in filer if not fil.exists()]
+    if mangler:
+        logging.warning(f"Mangler forberedte data {mangler}, laster inn på nytt")
+        return None
+
+    logging.info(f"Leser forberedte data fra {katalog}")
+    return [pd.read_parquet(fil) for fil in filer]
+
+
+@spor
+def last_inn_saksflyt(
+    project: str,
+    dataset: str,
+    resultatområde: Resultatområde | None = None,
+) -> pd.DataFrame:
+    """
+    Henter statusendringer for saker (data_status) frem til saksflyt sluttet å bli oppdatert.
+    Returns:
+        pd.DataFrame: data_status
+    """
+    forberedt = les_forberedt(saksflyt_tabeller, resultatområde)
+    if forberedt is not None:
+        return forberedt[0]
+
+    data_status, _, _ = split_data_statistikk(
+        last_inn_data_statistikk(
+            project=project,
+            dataset=dataset,
+            resultatområde=resultatområde,
+            limit=saksflyt_limit,
+        )
+    )
+    return data_status
+
+
+@spor
+def last_inn_samarbeidsdata(
+    project: str,
+    dataset: str,
+    resultatområde: Resultatområde | None = None,
+) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    """
+    Henter samarbeid, spørreundersøkelser og samarbeidsplaner.
+    Returns:
+        tuple: data_samarbeid, data_spørreundersøkelse, data_samarbeidsplan
+    """
+    forberedt = les_forberedt(samarbeid_tabeller, resultatområde)
+    if forberedt is not None:
+        return tuple(forberedt)
+
+    _, data_samarbeid, data_spørreundersøkelse, data_samarbeidsplan = (
+        last_inn_alle_data(
+            project=project, dataset=dataset, resultatområde=resultatområde
+        )
+    )
+    return data_samarbeid, data_spørreundersøkelse, data_samarbeidsplan
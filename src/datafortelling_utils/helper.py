@@ -1,8 +1,21 @@
+import os
 from datetime import datetime
 
 import pandas as pd
 import plotly.graph_objects as go
 
+# Tidspunktet figurene regner tidsvinduer fra, i ISO-format. Settes av main.py fra dataene når
+# rendercachen brukes, så output fra et dokument kun avhenger av dataene og ikke av dagen det rendres.
+NÅ_MILJØVARIABEL = "FIA_NÅ"
+
+
+def nå() -> datetime:
+    """
+    Tidspunktet figurene regner som nå: FIA_NÅ om den er satt, ellers datetime.now().
+    """
+    verdi = os.environ.get(NÅ_MILJØVARIABEL)
+    return datetime.fromisoformat(verdi) if verdi else datetime.now()
+
 
 def annotate_ikke_offisiell_statistikk(
     fig: go.Figure, x=0.5, y=1.05, color="black", weight="normal"
@@ -64,11 +77,12 @@ def ikke_aktuell_begrunnelse_sortering(ikke_aktuell: pd.DataFrame) -> list:
 
 def alle_måneder_mellom_datoer(
     første_dato: str,
-    siste_dato: datetime = datetime.now(),
+    siste_dato: datetime | None = None,
 ) -> pd.Series:
     """
-    Returnerer alle måneder mellom to datoer
+    Returnerer alle måneder mellom to datoer, til og med nå om siste_dato ikke er gitt
     """
+    siste_dato = siste_dato or nå()
     alle_datoer: pd.DatetimeIndex = pd.date_range(
         første_dato, siste_dato, freq="d", normalize=True
     )
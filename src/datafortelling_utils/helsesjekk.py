@@ -4,9 +4,10 @@ from enum import Enum
 import pandas as pd
 import plotly.graph_objects as go
 from dateutil.relativedelta import relativedelta
-
 from utils.helper import annotate_ikke_offisiell_statistikk
 
+from datafortelling_utils.sporing import spor
+
 
 class SakStatus(Enum):
     NY = "NY"
@@ -176,6 +177,7 @@ def data_denne_perioden(
     return (startdato, sluttdato, saker_vi_bistår, fullførte_saker, antall_tjenester)
 
 
+@spor
 def plot_historiske_data(
     data_status,
     antall_perioder: int,
@@ -62,6 +62,11 @@ statusordre: list[str] = [
     "SLETTET",
 ]
 
+# Saksflyt blir ikke lenger oppdatert, siste data er fra 2026-03-31
+saksflyt_limit: str = " WHERE tidsstempel < '2026-04-01' "
+# Saksflyt-sidene rendres én gang og arkiveres, øk versjonen når innholdet skal rendres på nytt
+saksflyt_arkivversjon: str = "2026-04-01.1"
+
 # 'fylker' er fylker før og etter kommune- og fylkesendringer 1.1.2024
 fylker: dict[str, str] = {
     "03": "Oslo",
@@ -157,6 +162,12 @@ rogaland_lund: dict[str, str] = {
     "1160": "Rogaland",  # Vindafjord kommune
 }
 
+# Fylker der resultatområde bestemmes av kommunenummer i stedet for fylkesnummer
+delte_fylker: dict[str, dict[str, str]] = {
+    "32": viken_akershus,
+    "11": rogaland_lund,
+}
+
 
 intervall_sortering: list[str] = [
     "0-1 min",
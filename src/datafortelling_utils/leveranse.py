@@ -7,8 +7,10 @@ from datafortelling_utils.helper import (
     annotate_ikke_offisiell_statistikk,
 )
 from datafortelling_utils.konstanter import ikkeaktuell_hovedgrunn, plotly_colors
+from datafortelling_utils.sporing import spor
 
 
+@spor
 def leveranse_per_maaned(data_leveranse: pd.DataFrame) -> go.Figure:
     data_leveranse["fullfort_yearmonth"] = data_leveranse.fullfort.dt.strftime("%Y-%m")
     alle_måneder = alle_måneder_mellom_datoer(data_leveranse.sistEndret.min())
@@ -38,6 +40,7 @@ def leveranse_per_maaned(data_leveranse: pd.DataFrame) -> go.Figure:
     return annotate_ikke_offisiell_statistikk(fig)
 
 
+@spor
 def leveranse_tjeneste_per_maaned(data_leveranse: pd.DataFrame) -> go.Figure:
     data_leveranse["fullfort_yearmonth"] = data_leveranse.fullfort.dt.strftime("%Y-%m")
     saker_per_tjeneste_og_måned = (
@@ -79,6 +82,7 @@ def leveranse_tjeneste_per_maaned(data_leveranse: pd.DataFrame) -> go.Figure:
     return annotate_ikke_offisiell_statistikk(fig, y=1.2)
 
 
+@spor
 def forskjell_frist_fullfort(data_leveranse: pd.DataFrame) -> go.Figure():
     fullfort_leveranser = data_leveranse[data_leveranse.status == "LEVERT"]
     forskjell_frist_fullfort = (
@@ -114,6 +118,7 @@ def forskjell_frist_fullfort(data_leveranse: pd.DataFrame) -> go.Figure():
     return annotate_ikke_offisiell_statistikk(fig)
 
 
+@spor
 def andel_leveranseregistreringer_gjort_av_superbrukere(
     data_leveranse: pd.DataFrame,
 ) -> go.Figure():
@@ -156,6 +161,7 @@ def andel_leveranseregistreringer_gjort_av_superbrukere(
     return annotate_ikke_offisiell_statistikk(fig)
 
 
+@spor
 def begrunnelse_ikke_aktuell(
     ikke_aktuell: pd.DataFrame, begrunnelse_sortering: list
 ) -> go.Figure:
@@ -245,6 +251,7 @@ def begrunnelse_ikke_aktuell(
     return annotate_ikke_offisiell_statistikk(fig, y=1.2)
 
 
+@spor
 def antall_leveranser_per_tjeneste(
     data_leveranse: pd.DataFrame, alle_iatjenester_og_status=None
 ) -> go.Figure:
@@ -0,0 +1,242 @@
+import hashlib
+import json
+import logging
+import time
+from pathlib import Path
+
+import requests
+from urllib3.fields import RequestField
+from urllib3.filepost import choose_boundary
+
+from datafortelling_utils.figurer import FIGUR_KATALOG
+
+PAGES_KATALOG = "pages"
+PUBLISERT_FILNAVN = "publisert.json"
+# Slår på opplasting av kun endrede filer med PATCH. Det er ikke dokumentert at NADA legger
+# filene i en PATCH til de publiserte i stedet for å erstatte hele datafortellingen,
+# så dette må være bekreftet før det slås på.
+DELVIS_OPPLASTING_MILJØVARIABEL = "FIA_DELVIS_OPPLASTING"
+
+BLOKKSTØRRELSE = 1024 * 1024
+ANTALL_FORSØK = 5
+# Ventetid før første nye forsøk, dobles for hvert forsøk
+VENTETID_SEKUNDER = 2
+# Tilkobling og lesing av svar, NADA svarer først når alle filene er lagret
+TIMEOUT_SEKUNDER = (30, 600)
+MIDLERTIDIGE_STATUSKODER = {408, 429, 500, 502, 503, 504}
+# Svar på PATCH som betyr at NADA ikke tar imot delvis oppdatering, da lastes alt opp med PUT
+IKKE_STØTTET_STATUSKODER = {404, 405, 501}
+
+
+class MultipartStrøm:
+    """
+    multipart/form-data body som leser filene fra disk etter hvert som requests sender den,
+    med samme format som files= i requests. Minnebruken er uavhengig av antall og størrelse på filer.
+    Har lengde, så requests setter Content-Length i stedet for chunked overføring.
+    """
+
+    def __init__(self, filer: dict[str, Path]):
+        self.boundary = choose_boundary()
+        self._deler = []
+        for navn, fil in filer.items():
+            felt = RequestField(name=navn, data=b"", filename=navn)
+            felt.make_multipart()
+            self._deler += [
+                f"--{self.boundary}\r\n{felt.render_headers()}".encode(),
+                Path(fil),
+                b"\r\n",
+            ]
+        self._deler.append(f"--{self.boundary}--\r\n".encode())
+        self._lengde = sum(
+            del_.stat().st_size if isinstance(del_, Path) else len(del_)
+            for del_ in self._deler
+        )
+        self._neste = iter(self._deler)
+        self._åpen = None
+
+    @property
+    def content_type(self) -> str:
+        return f"multipart/form-data; boundary={self.boundary}"
+
+    def __len__(self) -> int:
+        return self._lengde
+
+    def close(self) -> None:
+        if self._åpen is not None:
+            self._åpen.close()
+            self._åpen = None
+
+    def read(self, størrelse: int = -1) -> bytes:
+        """
+        Leser neste blokk av body, opptil størrelse bytes. Tom bytes betyr at alt er lest.
+        """
+        if størrelse is None or størrelse < 0:
+            return b"".join(iter(lambda: self.read(BLOKKSTØRRELSE), b""))
+        while True:
+            if self._åpen is not None:
+                blokk = self._åpen.read(størrelse)
+                if blokk:
+                    return blokk
+                self._åpen.close()
+                self._åpen = None
+            del_ = next(self._neste, None)
+            if del_ is None:
+                return b""
+            if isinstance(del_, Path):
+                # Åpen på tvers av read-kall til filen er lest, lukkes i read eller close
+                self._åpen = open(del_, "rb")  # noqa: SIM115
+            else:
+                return del_
+
+
+def finn_filer(katalog: str | Path = PAGES_KATALOG) -> dict[str, Path]:
+    """
+    Alle filer i katalogen, med stien relativt til katalogen som navn i opplastingen.
+    """
+    katalog = Path(katalog)
+    return {
+        fil.relative_to(katalog).as_posix(): fil
+        for fil in sorted(katalog.rglob("*"))
+        if fil.is_file()
+    }
+
+
+def last_opp_multipart(
+    url: str,
+    token: str,
+    filer: dict[str, Path],
+    metode: str = "PUT",
+    godta_statuskoder: set[int] | None = None,
+) -> requests.Response:
+    """
+    Laster opp filene som multipart/form-data, strømmet fra disk.
+    Prøver på nytt med økende ventetid ved nettverksfeil og midlertidige feil fra serveren.
+    Feilkoder i godta_statuskoder returneres i stedet for å feile.
+    """
+    godta_statuskoder = godta_statuskoder or set()
+    for forsøk in range(1, ANTALL_FORSØK + 1):
+        body = MultipartStrøm(filer)
+        try:
+            response = requests.request(
+                method=metode,
+                url=url,
+                headers={
+                    "Authorization": f"Bearer {token}",
+                    "Content-Type": body.content_type,
+                },
+                data=body,
+                timeout=TIMEOUT_SEKUNDER,
+            )
+            if response.status_code not in MIDLERTIDIGE_STATUSKODER:
+                if response.status_code not in godta_statuskoder:
+                    response.raise_for_status()
+                return response
+            feil = f"HTTP {response.status_code}"
+        except (requests.ConnectionError, requests.Timeout) as e:
+            feil = str(e)
+        finally:
+            body.close()
+
+        if forsøk == ANTALL_FORSØK:
+            raise requests.RequestException(
+                f"Opplasting til {url} feilet etter {ANTALL_FORSØK} forsøk: {feil}"
+            )
+        ventetid = VENTETID_SEKUNDER * 2 ** (forsøk - 1)
+        logging.warning(
+            f"Forsøk {forsøk} av {ANTALL_FORSØK} på opplasting feilet ({feil}), prøver igjen om {ventetid} s"
+        )
+        time.sleep(ventetid)
+
+
+def innholdshash(filer: dict[str, Path]) -> dict[str, str]:
+    def sha256(fil: Path) -> str:
+        with open(fil, "rb") as f:
+            return hashlib.file_digest(f, "sha256").hexdigest()
+
+    return {navn: sha256(fil) for navn, fil in filer.items()}
+
+
+def les_publisert(katalog: str | Path | None, url: str) -> dict[str, str] | None:
+    """
+    Hash per fil som sist ble publisert til url, eller None om det ikke er publisert derfra før.
+    """
+    if katalog is None or not (Path(katalog) / PUBLISERT_FILNAVN).exists():
+        return None
+    with open(Path(katalog) / PUBLISERT_FILNAVN, encoding="utf-8") as f:
+        publisert = json.load(f)
+    return publisert["filer"] if publisert["url"] == url else None
+
+
+def lagre_publisert(
+    katalog: str | Path | None, url: str, hasher: dict[str, str]
+) -> None:
+    if katalog is None:
+        return
+    Path(katalog).mkdir(parents=True, exist_ok=True)
+    with open(Path(katalog) / PUBLISERT_FILNAVN, "w", encoding="utf-8") as f:
+        json.dump({"url": url, "filer": hasher}, f, indent=2, ensure_ascii=False)
+
+
+def endrede_filer(
+    hasher: dict[str, str], publisert: dict[str, str] | None
+) -> list[str] | None:
+    """
+    Filer som er nye eller endret siden forrige publisering.
+    Returnerer None om alt må lastes opp: ingen forrige publisering, eller sider og andre filer
+    er fjernet, siden en delvis oppdatering ikke kan slette filer.
+    Fjernede filer i figurer blir liggende hos NADA uten at noen side bruker dem. Figurene har
+    faste navn per side og figur, så det blir ikke flere slike filer enn det finnes figurer.
+    """
+    if publisert is None:
+        return None
+    if any(
+        not navn.startswith(f"{FIGUR_KATALOG}/")
+        for navn in publisert.keys() - hasher.keys()
+    ):
+        return None
+    return [navn for navn, hash_ in hasher.items() if publisert.get(navn) != hash_]
+
+
+def last_opp_endringer(
+    url: str,
+    token: str,
+    filer: dict[str, Path],
+    katalog: str | Path | None = None,
+    delvis: bool = False,
+) -> None:
+    """
+    Laster opp filene om noen er endret siden forrige publisering, med hash per fil fra forrige
+    publisering lagret i katalogen. Med delvis lastes kun de endrede filene opp med PATCH.
+    Laster opp alt med PUT uten delvis, om det ikke er publisert før, filer er fjernet eller
+    NADA ikke tar imot delvis oppdatering.
+    """
+    hasher = innholdshash(filer)
+    endret = endrede_filer(hasher, les_publisert(katalog, url))
+
+    if endret == []:
+        logging.info(f"Ingen av {len(filer)} filer er endret siden forrige publisering")
+        return
+    if endret is not None and delvis:
+        endrede = {navn: filer[navn] for navn in endret}
+        logging.info(
+            f"Laster opp {len(endrede)} av {len(filer)} filer som er endret, {len(MultipartStrøm(endrede)) / 1024 / 1024:.2f} MB"
+        )
+        response = last_opp_multipart(
+            url,
+            token,
+            endrede,
+            metode="PATCH",
+            godta_statuskoder=IKKE_STØTTET_STATUSKODER,
+        )
+        if response.ok:
+            lagre_publisert(katalog, url, hasher)
+            return
+        logging.warning(
+            f"Delvis oppdatering ble avvist med HTTP {response.status_code}, laster opp alle filer"
+        )
+
+    logging.info(
+        f"Laster opp alle {len(filer)} filer, {len(MultipartStrøm(filer)) / 1024 / 1024:.2f} MB"
+    )
+    last_opp_multipart(url, token, filer)
+    lagre_publisert(katalog, url, hasher)
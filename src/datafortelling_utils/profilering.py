@@ -0,0 +1,262 @@
+import atexit
+import inspect
+import json
+import logging
+import os
+import resource
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from types import CodeType
+
+# Miljøvariabel som slår på profilering, og peker på katalogen profilene skrives til
+PROFILERING_MILJØVARIABEL = "FIA_PROFILERING"
+# Settes av render_dokument, så kjernen vet hvilket dokument den kjører
+DOKUMENT_MILJØVARIABEL = "FIA_DOKUMENT"
+RAPPORT_FILNAVN = "profilering.json"
+
+_PAKKE = Path(__file__).resolve().parent
+_VERKTØY = sys.monitoring.PROFILER_ID
+_IKKE_FUNKSJON = (
+    inspect.CO_GENERATOR | inspect.CO_COROUTINE | inspect.CO_ASYNC_GENERATOR
+)
+
+_offentlige: dict[CodeType, str] = {}
+_funksjoner: dict[str, dict] = {}
+_celler: list[dict] = []
+_faser: list[dict] = []
+_tråder = threading.local()
+_lås = threading.Lock()
+_startet = False
+
+
+def _maks_rss_mb() -> float:
+    # ru_maxrss er i KB på Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _måling() -> tuple[float, float, float]:
+    return time.perf_counter(), time.process_time(), _maks_rss_mb()
+
+
+def _differanse(start: tuple[float, float, float]) -> dict:
+    slutt = _måling()
+    return {
+        "sekunder": slutt[0] - start[0],
+        "cpu_sekunder": slutt[1] - start[1],
+        "maks_rss_mb": slutt[2],
+        "rss_økning_mb": slutt[2] - start[2],
+    }
+
+
+def _funksjonsnavn(code: CodeType) -> str | None:
+    """
+    Navnet til en offentlig funksjon i datafortelling_utils (modul.funksjon), ellers None.
+    """
+    if code in _offentlige:
+        return _offentlige[code]
+    fil = Path(code.co_filename)
+    if (
+        fil.parent != _PAKKE
+        or code.co_qualname.startswith("_")
+        or "<" in code.co_qualname
+        or code.co_flags & _IKKE_FUNKSJON
+    ):
+        return None
+    _offentlige[code] = f"{fil.stem}.{code.co_qualname}"
+    return _offentlige[code]
+
+
+def _stakk() -> list:
+    if not hasattr(_tråder, "stakk"):
+        _tråder.stakk = []
+    return _tråder.stakk
+
+
+def _ved_start(code: CodeType, offset: int):
+    if _funksjonsnavn(code) is None:
+        return sys.monitoring.DISABLE
+    _stakk().append((time.perf_counter(), time.thread_time(), _maks_rss_mb()))
+    return None
+
+
+def _ved_slutt(code: CodeType, offset: int, verdi: object):
+    navn = _funksjonsnavn(code)
+    if navn is None:
+        return sys.monitoring.DISABLE
+    _registrer_kall(navn)
+    return None
+
+
+def _ved_unntak(code: CodeType, offset: int, unntak: BaseException) -> None:
+    # PY_UNWIND kan ikke slås av per funksjon, så kun oppslag for kjente funksjoner
+    navn = _offentlige.get(code)
+    if navn is not None:
+        _registrer_kall(navn)
+
+
+def _registrer_kall(navn: str) -> None:
+    stakk = _stakk()
+    if not stakk:
+        return
+    start_tid, start_cpu, start_rss = stakk.pop()
+    maks_rss = _maks_rss_mb()
+    with _lås:
+        funksjon = _funksjoner.setdefault(
+            navn,
+            {"kall": 0, "sekunder": 0.0, "cpu_sekunder": 0.0, "rss_økning_mb": 0.0},
+        )
+        funksjon["kall"] += 1
+        funksjon["sekunder"] += time.perf_counter() - start_tid
+        funksjon["cpu_sekunder"] += time.thread_time() - start_cpu
+        funksjon["rss_økning_mb"] = max(funksjon["rss_økning_mb"], maks_rss - start_rss)
+
+
+def _registrer_ipython(shell) -> None:
+    """
+    Måler hver celle som kjøres i kjernen, og skriver profilen etter hver celle,
+    siden kjernen kan avsluttes uten at atexit kjøres.
+    """
+    celle = {"start": _måling()}
+
+    def før_celle(info) -> None:
+        celle["start"] = _måling()
+
+    def etter_celle(resultat) -> None:
+        kode = (resultat.info.raw_cell if resultat.info else "").strip()
+        _celler.append(
+            {
+                "nr": len(_celler),
+                "første_linje": kode.splitlines()[0] if kode else "",
+                "ok": resultat.success,
+                **_differanse(celle["start"]),
+            }
+        )
+        skriv_profil()
+
+    shell.events.register("pre_run_cell", før_celle)
+    shell.events.register("post_run_cell", etter_celle)
+
+
+def start_profilering() -> None:
+    """
+    Slår på måling av tid, CPU-tid og økning i maks RSS for hvert kall til offentlige funksjoner
+    i datafortelling_utils, og for hver celle om prosessen er en IPython-kjerne.
+    Bruker sys.monitoring, og slår av hendelser for all annen kode etter første kall.
+    """
+    global _startet
+    if _startet:
+        return
+    _startet = True
+
+    hendelser = sys.monitoring.events
+    sys.monitoring.use_tool_id(_VERKTØY, "datafortelling_utils")
+    sys.monitoring.register_callback(_VERKTØY, hendelser.PY_START, _ved_start)
+    sys.monitoring.register_callback(_VERKTØY, hendelser.PY_RETURN, _ved_slutt)
+    sys.monitoring.register_callback(_VERKTØY, hendelser.PY_UNWIND, _ved_unntak)
+    sys.monitoring.set_events(
+        _VERKTØY, hendelser.PY_START | hendelser.PY_RETURN | hendelser.PY_UNWIND
+    )
+
+    try:
+        from IPython import get_ipython
+
+        shell = get_ipython()
+    except ImportError:
+        shell = None
+    if shell is not None:
+        _registrer_ipython(shell)
+    atexit.register(skriv_profil)
+
+
+@contextmanager
+def fase(navn: str):
+    """
+    Måler en fase i main.py, f.eks. snapshot eller opplasting, til kjørerapporten.
+    """
+    start = _måling()
+    try:
+        yield
+    finally:
+        _faser.append({"fase": navn, **_differanse(start)})
+
+
+def _profilfil(katalog: str | Path, dokument: str) -> Path:
+    return Path(katalog) / "dokumenter" / f"{dokument.replace('/', '__')}.json"
+
+
+def skriv_profil() -> None:
+    """
+    Skriver cellene og funksjonene målt i denne prosessen til FIA_PROFILERING.
+    """
+    katalog = os.environ.get(PROFILERING_MILJØVARIABEL)
+    if not katalog:
+        return
+    dokument = os.environ.get(DOKUMENT_MILJØVARIABEL, "main.py")
+    fil = _profilfil(katalog, dokument)
+    fil.parent.mkdir(parents=True, exist_ok=True)
+    with _lås:
+        funksjoner = dict(
+            sorted(_funksjoner.items(), key=lambda f: f[1]["sekunder"], reverse=True)
+        )
+    with open(fil, "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "dokument": dokument,
+                "maks_rss_mb": _maks_rss_mb(),
+                "celler": _celler,
+                "funksjoner": funksjoner,
+            },
+            f,
+            indent=2,
+            ensure_ascii=False,
+        )
+
+
+def skriv_kjørerapport(katalog: str | Path, resultater: list[dict]) -> None:
+    """
+    Samler fasene i main.py, render-resultatene og profilene fra hver kjerne i én JSON-rapport
+    i katalogen. Tiden et dokument bruker utenfor cellene er quarto, pandoc og skriving av html.
+    """
+    skriv_profil()
+    rapport = Path(katalog) / RAPPORT_FILNAVN
+    main_profil = _profilfil(katalog, "main.py")
+    dokumenter = []
+    for resultat in resultater:
+        profil_fil = _profilfil(katalog, resultat["dokument"])
+        profil = (
+            json.loads(profil_fil.read_text(encoding="utf-8"))
+            if profil_fil.exists()
+            else {}
+        )
+        celler_sekunder = sum(celle["sekunder"] for celle in profil.get("celler", []))
+        dokumenter.append(
+            {
+                **{
+                    nøkkel: verdi
+                    for nøkkel, verdi in resultat.items()
+                    if nøkkel != "feil"
+                },
+                "celler_sekunder": celler_sekunder,
+                "quarto_sekunder": resultat["sekunder"] - celler_sekunder,
+                "celler": profil.get("celler", []),
+                "funksjoner": profil.get("funksjoner", {}),
+            }
+        )
+
+    with open(rapport, "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "faser": _faser,
+                "main": json.loads(main_profil.read_text(encoding="utf-8")),
+                "dokumenter": sorted(
+                    dokumenter, key=lambda d: d["sekunder"], reverse=True
+                ),
+            },
+            f,
+            indent=2,
+            ensure_ascii=False,
+        )
+    logging.info(f"Skrev profileringsrapport til {rapport}")
@@ -0,0 +1,204 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+from functools import cache
+from pathlib import Path
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+from datafortelling_utils.datakilde import DATAKILDE_MILJØVARIABEL
+from datafortelling_utils.snapshot import SNAPSHOT_MILJØVARIABEL, les_manifest
+
+NØKLER_FILNAVN = "nokler.json"
+PAGES_KATALOG = "pages"
+
+inkluder_re = re.compile(r"\{\{<\s*include\s+(\S+)\s*>\}\}")
+
+
+def _sha256(*deler: bytes) -> str:
+    sha = hashlib.sha256()
+    for del_ in deler:
+        sha.update(hashlib.sha256(del_).digest())
+    return sha.hexdigest()
+
+
+@cache
+def kildefingeravtrykk() -> str:
+    """
+    Hash av kildekoden og datafilene i datafortelling_utils, og quarto-konfigurasjonen til prosjektet.
+    """
+    pakke = Path(__file__).resolve().parent
+    filer = sorted(
+        fil
+        for fil in pakke.rglob("*")
+        if fil.is_file() and "__pycache__" not in fil.parts
+    )
+    deler = [
+        fil.relative_to(pakke).as_posix().encode() + fil.read_bytes() for fil in filer
+    ]
+    if Path("_quarto.yml").exists():
+        deler.append(Path("_quarto.yml").read_bytes())
+    return _sha256(*deler)
+
+
+def inkluderte_filer(dokument: str | Path) -> list[Path]:
+    """
+    Finner dokumentet og alle filer det inkluderer med {{< include >}}, rekursivt.
+    """
+    dokument = Path(dokument)
+    filer = [dokument]
+    for inkludert in inkluder_re.findall(dokument.read_text(encoding="utf-8")):
+        filer += inkluderte_filer(dokument.parent / inkludert)
+    return filer
+
+
+def _maks_tidsstempel_i_parquet(fil: Path) -> str | None:
+    """
+    Leser høyeste tidsstempel fra statistikken i parquet-filen, uten å lese dataene.
+    """
+    metadata = pq.read_metadata(fil)
+    if "tidsstempel" not in metadata.schema.names:
+        return None
+    kolonne = metadata.schema.names.index("tidsstempel")
+    maks = [
+        metadata.row_group(i).column(kolonne).statistics.max
+        for i in range(metadata.num_row_groups)
+        if metadata.row_group(i).column(kolonne).is_stats_set
+    ]
+    return str(max(maks)) if maks else None
+
+
+def _tabeller() -> dict[str, dict] | None:
+    """
+    Antall rader og høyeste tidsstempel per tabell datafortellingene rendres fra,
+    fra manifestet til snapshot, eller fra parquet-filene i FIA_DATAKILDE.
+    Returnerer None om dataene hentes direkte fra BigQuery.
+    """
+    if os.environ.get(DATAKILDE_MILJØVARIABEL):
+        tabeller = {
+            fil.name: {
+                "rader": pq.read_metadata(fil).num_rows,
+                "maks_tidsstempel": _maks_tidsstempel_i_parquet(fil),
+            }
+            for fil in sorted(
+                Path(os.environ[DATAKILDE_MILJØVARIABEL]).glob("*.parquet")
+            )
+        }
+    elif os.environ.get(SNAPSHOT_MILJØVARIABEL):
+        tabeller = {
+            table: {
+                "rader": innslag["rader"],
+                "maks_tidsstempel": innslag["maks_tidsstempel"],
+            }
+            for table, innslag in les_manifest(os.environ[SNAPSHOT_MILJØVARIABEL])
+            .get("tabeller", {})
+            .items()
+        }
+    else:
+        return None
+    return tabeller or None
+
+
+def datafingeravtrykk() -> str | None:
+    """
+    Fingeravtrykk av dataene datafortellingene rendres fra: antall rader og høyeste tidsstempel per tabell.
+    Returnerer None om dataene hentes direkte fra BigQuery, da kan ingenting gjenbrukes.
+    """
+    tabeller = _tabeller()
+    if tabeller is None:
+        return None
+    return _sha256(json.dumps(tabeller, sort_keys=True).encode())
+
+
+def datatidspunkt() -> str | None:
+    """
+    Høyeste tidsstempel i dataene, i UTC uten tidssone som kolonnene etter fjern_tidssone.
+    Brukes som nå i figurene med rendercachen, så output kun avhenger av fingeravtrykket til dataene.
+    """
+    tabeller = _tabeller() or {}
+    tidspunkter = [
+        pd.Timestamp(tabell["maks_tidsstempel"])
+        for tabell in tabeller.values()
+        if tabell["maks_tidsstempel"]
+    ]
+    if not tidspunkter:
+        return None
+    maks = max(
+        tidspunkt.tz_convert("UTC").tz_localize(None) if tidspunkt.tzinfo else tidspunkt
+        for tidspunkt in tidspunkter
+    )
+    return maks.isoformat()
+
+
+def dokument_nøkkel(dokument: str, data: str) -> str:
+    """
+    Nøkkel for output fra et dokument: hash av dokumentet og filene det inkluderer, kildekoden,
+    og fingeravtrykket til dataene. Datoen er ikke med, figurene regner tidsvinduer fra
+    datatidspunkt når rendercachen brukes.
+    """
+    filer = inkluderte_filer(dokument)
+    innhold = [fil.read_bytes() for fil in filer]
+    return _sha256(
+        dokument.encode(), kildefingeravtrykk().encode(), data.encode(), *innhold
+    )
+
+
+def output_fil(dokument: str, pages: str | Path = PAGES_KATALOG) -> Path:
+    return Path(pages) / Path(dokument).with_suffix(".html")
+
+
+def les_nøkler(katalog: str | Path) -> dict[str, str]:
+    fil = Path(katalog) / NØKLER_FILNAVN
+    if not fil.exists():
+        return {}
+    with open(fil, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def uendrede_dokumenter(
+    katalog: str | Path,
+    nøkler: dict[str, str],
+    pages: str | Path = PAGES_KATALOG,
+) -> list[str]:
+    """
+    Legger output fra forrige kjøring tilbake i pages, og returnerer dokumentene med
+    samme nøkkel som sist, som ikke trenger å rendres på nytt.
+    """
+    lagret = Path(katalog) / PAGES_KATALOG
+    if not lagret.exists():
+        return []
+    shutil.copytree(lagret, pages, dirs_exist_ok=True)
+
+    forrige = les_nøkler(katalog)
+    uendret = [
+        dokument
+        for dokument, nøkkel in nøkler.items()
+        if forrige.get(dokument) == nøkkel and output_fil(dokument, pages).exists()
+    ]
+    logging.info(
+        f"Gjenbruker output for {len(uendret)} av {len(nøkler)} dokumenter fra {katalog}"
+    )
+    return uendret
+
+
+def lagre_rendercache(
+    katalog: str | Path,
+    nøkler: dict[str, str],
+    pages: str | Path = PAGES_KATALOG,
+) -> None:
+    """
+    Lagrer pages og nøklene til dokumentene som nå har oppdatert output, til neste kjøring.
+    Dokumenter som ikke er med i nøkler må rendres på nytt neste gang.
+    """
+    katalog = Path(katalog)
+    katalog.mkdir(parents=True, exist_ok=True)
+    lagret = katalog / PAGES_KATALOG
+    if lagret.exists():
+        shutil.rmtree(lagret)
+    shutil.copytree(pages, lagret)
+    with open(katalog / NØKLER_FILNAVN, "w", encoding="utf-8") as f:
+        json.dump(nøkler, f, indent=2, ensure_ascii=False)
@@ -0,0 +1,363 @@
+import json
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from datafortelling_utils.arkiv import PAGES_KATALOG, SITE_LIBS_KATALOG
+from datafortelling_utils.datakilde import DATAKILDE_MILJØVARIABEL
+from datafortelling_utils.forberedt import FORBEREDT_MILJØVARIABEL
+from datafortelling_utils.profilering import (
+    DOKUMENT_MILJØVARIABEL,
+    PROFILERING_MILJØVARIABEL,
+)
+from datafortelling_utils.snapshot import SNAPSHOT_MILJØVARIABEL
+from datafortelling_utils.sporing import SPORING_MILJØVARIABEL, STDOUT
+
+# Miljøvariabel for å overstyre minnebudsjettet til parallell rendering (MB)
+MINNEBUDSJETT_MILJØVARIABEL = "FIA_MINNEBUDSJETT_MB"
+MÅLINGER_FILNAVN = "render_minne.json"
+SØKEINDEKS_FILNAVN = "search.json"
+
+# Filene i quarto-prosjektet, som i Dockerfile. Kopieres til en egen katalog for hver parallelle rendering.
+PROSJEKTFILER = ["_quarto.yml", "index.qmd", "datafortelling", "assets"]
+# Miljøvariabler med stier, som gjøres absolutte når quarto kjøres i en kopi av prosjektet
+STI_MILJØVARIABLER = [
+    DATAKILDE_MILJØVARIABEL,
+    FORBEREDT_MILJØVARIABEL,
+    PROFILERING_MILJØVARIABEL,
+    SNAPSHOT_MILJØVARIABEL,
+    SPORING_MILJØVARIABEL,
+]
+
+# Andel av minnegrensen til poden som kan brukes av quarto-prosessene
+ANDEL_AV_MINNEGRENSE = 0.8
+# Påslag på målt minne, siden minnet måles med mellomrom og kan ha toppet mellom to målinger
+PÅSLAG_MÅLT_MINNE = 1.25
+# Sekunder mellom hver måling av minnet til quarto og kjernen
+MÅLEINTERVALL_SEKUNDER = 0.5
+
+
+def minnegrense_mb() -> float | None:
+    """
+    Leser minnegrensen til containeren fra cgroup (v2 og v1).
+    Returnerer None om det ikke er satt en grense.
+    """
+    for fil in [
+        Path("/sys/fs/cgroup/memory.max"),
+        Path("/sys/fs/cgroup/memory/memory.limit_in_bytes"),
+    ]:
+        try:
+            verdi = fil.read_text().strip()
+        except OSError:
+            continue
+        # cgroup v1 bruker et veldig stort tall når grensen ikke er satt
+        if verdi == "max" or int(verdi) >= 2**60:
+            return None
+        return int(verdi) / 1024 / 1024
+    return None
+
+
+def minnebudsjett_mb() -> float:
+    """
+    Minnebudsjett for rendering: miljøvariabelen om den er satt, ellers en andel av
+    minnegrensen til containeren, ellers en andel av fysisk minne.
+    """
+    if os.environ.get(MINNEBUDSJETT_MILJØVARIABEL):
+        return float(os.environ[MINNEBUDSJETT_MILJØVARIABEL])
+
+    grense = minnegrense_mb()
+    if grense is None:
+        grense = os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") / 1024 / 1024
+    return grense * ANDEL_AV_MINNEGRENSE
+
+
+def les_minnemålinger(katalog: str | Path | None) -> dict[str, float]:
+    """
+    Leser målt maks minne (MB) per dokument fra forrige kjøring.
+    Returnerer tom dict om det ikke finnes målinger.
+    """
+    if katalog is None:
+        return {}
+    fil = Path(katalog) / MÅLINGER_FILNAVN
+    if not fil.exists():
+        return {}
+    with open(fil, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def skriv_minnemålinger(katalog: str | Path | None, resultater: list[dict]) -> None:
+    """
+    Lagrer målt maks minne per vellykket dokument, slik at neste kjøring kan planlegge etter det.
+    """
+    if katalog is None:
+        return
+    målinger = les_minnemålinger(katalog)
+    målinger.update(
+        {
+            resultat["dokument"]: resultat["maks_minne_mb"]
+            for resultat in resultater
+            if resultat["ok"]
+        }
+    )
+    Path(katalog).mkdir(parents=True, exist_ok=True)
+    with open(Path(katalog) / MÅLINGER_FILNAVN, "w", encoding="utf-8") as f:
+        json.dump(målinger, f, indent=2, ensure_ascii=False)
+
+
+def _barn_per_prosess() -> dict[int, list[int]]:
+    """
+    Barneprosessene til hver prosess, fra /proc/<pid>/stat.
+    """
+    barn = defaultdict(list)
+    for stat in Path("/proc").glob("[0-9]*/stat"):
+        try:
+            tekst = stat.read_text()
+        except OSError:
+            continue
+        # Navnet i parentes kan inneholde mellomrom, forelderen er andre felt etter navnet
+        forelder = int(tekst.rsplit(")", 1)[1].split()[1])
+        barn[forelder].append(int(stat.parent.name))
+    return barn
+
+
+def prosesstre_minne_mb(pid: int) -> float:
+    """
+    Summen av RSS (MB) for prosessen og alle etterkommerne, dvs. quarto, deno og python-kjernen.
+    Prosesser som avslutter underveis hoppes over. Gir 0 der /proc ikke finnes.
+    """
+    barn = _barn_per_prosess()
+    prosesser = [pid]
+    kb = 0
+    while prosesser:
+        prosess = prosesser.pop()
+        prosesser += barn.get(prosess, [])
+        try:
+            status = Path(f"/proc/{prosess}/status").read_text()
+        except OSError:
+            continue
+        kb += sum(
+            int(linje.split()[1])
+            for linje in status.splitlines()
+            if linje.startswith("VmRSS:")
+        )
+    return kb / 1024
+
+
+def _miljø_for_kopi() -> dict[str, str]:
+    """
+    Stiene i miljøvariablene som absolutte stier, siden kjernen kjøres fra kopien av prosjektet.
+    """
+    return {
+        navn: os.path.abspath(os.environ[navn])
+        for navn in STI_MILJØVARIABLER
+        if os.environ.get(navn) and os.environ[navn] != STDOUT
+    }
+
+
+def kopier_prosjekt(katalog: str | Path) -> None:
+    """
+    Kopierer quarto-prosjektet til katalogen, så quarto kan rendre der uten å dele pages,
+    search.json, site_libs og .quarto med andre quarto-prosesser.
+    """
+    for navn in PROSJEKTFILER:
+        if Path(navn).is_dir():
+            shutil.copytree(navn, Path(katalog) / navn)
+        else:
+            shutil.copy2(navn, Path(katalog) / navn)
+
+
+def flett_søkeindeks(dokument: str, fra: str | Path, til: str | Path) -> None:
+    """
+    Erstatter oppføringene for dokumentets side i søkeindeksen til med oppføringene i fra.
+    Oppføringene for andre sider beholdes.
+    """
+    side = Path(dokument).with_suffix(".html").as_posix()
+
+    def for_siden(oppføring: dict) -> bool:
+        return oppføring["href"].split("#")[0] == side
+
+    nye = []
+    if Path(fra).exists():
+        with open(fra, encoding="utf-8") as f:
+            nye = [oppføring for oppføring in json.load(f) if for_siden(oppføring)]
+    eksisterende = []
+    if Path(til).exists():
+        with open(til, encoding="utf-8") as f:
+            eksisterende = json.load(f)
+    with open(til, "w", encoding="utf-8") as f:
+        json.dump(
+            [oppføring for oppføring in eksisterende if not for_siden(oppføring)] + nye,
+            f,
+            ensure_ascii=False,
+        )
+
+
+def flett_inn_output(
+    dokument: str, prosjekt: str | Path, pages: str | Path = PAGES_KATALOG
+) -> None:
+    """
+    Kopierer output for dokumentet fra en kopi av prosjektet inn i pages: html-filen,
+    <dokument>_files, site_libs og oppføringene for siden i search.json.
+    """
+    fra = Path(prosjekt) / PAGES_KATALOG
+    pages = Path(pages)
+    html = Path(dokument).with_suffix(".html")
+    ressurser = html.with_name(f"{html.stem}_files")
+
+    (pages / html).parent.mkdir(parents=True, exist_ok=True)
+    shutil.copy2(fra / html, pages / html)
+    if (pages / ressurser).exists():
+        shutil.rmtree(pages / ressurser)
+    if (fra / ressurser).exists():
+        shutil.copytree(fra / ressurser, pages / ressurser)
+    if (fra / SITE_LIBS_KATALOG).exists():
+        shutil.copytree(
+            fra / SITE_LIBS_KATALOG, pages / SITE_LIBS_KATALOG, dirs_exist_ok=True
+        )
+    flett_søkeindeks(dokument, fra / SØKEINDEKS_FILNAVN, pages / SØKEINDEKS_FILNAVN)
+
+
+def render_dokument(dokument: str, prosjekt: str | Path | None = None) -> dict:
+    """
+    Kjører quarto render for ett dokument og måler tid, CPU-tid og maks minne.
+    Med prosjekt rendres dokumentet i den kopien av prosjektet, ellers i prosjektet selv.
+    Feiler ikke ved feil i rendering, men returnerer resultatet med feilmeldingen.
+    """
+    logging.info(f"Kjører quarto render for {dokument}")
+    start = time.perf_counter()
+    miljø = os.environ | {DOKUMENT_MILJØVARIABEL: dokument}
+    if prosjekt is not None:
+        miljø |= _miljø_for_kopi()
+    # Output skrives til fil i stedet for pipe, så prosessen ikke blokkeres av full buffer
+    with tempfile.TemporaryFile(mode="w+") as output:
+        prosess = subprocess.Popen(
+            ["quarto", "render", dokument],
+            stdout=output,
+            stderr=subprocess.STDOUT,
+            text=True,
+            env=miljø,
+            cwd=prosjekt,
+        )
+        # Summen for quarto, deno og python-kjernen måles med mellomrom mens quarto kjører
+        maks_minne_mb = 0.0
+        ferdig = threading.Event()
+
+        def mål_minne() -> None:
+            nonlocal maks_minne_mb
+            while not ferdig.wait(MÅLEINTERVALL_SEKUNDER):
+                maks_minne_mb = max(maks_minne_mb, prosesstre_minne_mb(prosess.pid))
+
+        måler = threading.Thread(target=mål_minne, daemon=True)
+        måler.start()
+        # wait4 gir også ressursbruk for prosessen og barna den har ventet på.
+        # ru_maxrss er i KB på Linux, og er maks for én prosess, ikke summen.
+        _, status, ressurser = os.wait4(prosess.pid, 0)
+        ferdig.set()
+        måler.join()
+        prosess.returncode = os.waitstatus_to_exitcode(status)
+        output.seek(0)
+        tekst = output.read()
+
+    resultat = {
+        "dokument": dokument,
+        "ok": prosess.returncode == 0,
+        "sekunder": time.perf_counter() - start,
+        "cpu_sekunder": ressurser.ru_utime + ressurser.ru_stime,
+        "maks_minne_mb": max(maks_minne_mb, ressurser.ru_maxrss / 1024),
+        "feil": None if prosess.returncode == 0 else tekst,
+    }
+    if resultat["ok"]:
+        logging.info(f"Output fra quarto for {dokument}: \n{tekst}")
+    else:
+        logging.error(f"Feil ved rendering av quarto dokument {dokument}: {tekst}")
+    return resultat
+
+
+def minnebehov(
+    dokumenter: list[str], minnebudsjett: float, målinger: dict[str, float]
+) -> dict[str, float]:
+    """
+    Forventet minne (MB) per dokument: målingen fra forrige kjøring med påslag, høyst hele budsjettet.
+    Dokumenter uten måling får hele budsjettet og rendres alene, så første kjøring er seriell.
+    """
+    return {
+        dokument: min(målinger[dokument] * PÅSLAG_MÅLT_MINNE, minnebudsjett)
+        if dokument in målinger
+        else minnebudsjett
+        for dokument in dokumenter
+    }
+
+
+def render_dokumenter(
+    dokumenter: list[str],
+    minnebudsjett: float,
+    målinger: dict[str, float] | None = None,
+    arbeidere: int | None = None,
+) -> list[dict]:
+    """
+    Renderer dokumenter parallelt, slik at summen av forventet minne for dokumentene
+    som rendres samtidig holder seg innenfor minnebudsjettet (MB).
+    Hvert dokument rendres i sin egen kopi av prosjektet, og output flettes inn i pages
+    ett dokument om gangen, så quarto-prosessene ikke skriver search.json og site_libs samtidig.
+    De tyngste dokumentene startes først. Alle dokumenter forsøkes rendret,
+    og resultatet per dokument returneres i samme rekkefølge.
+    """
+    målinger = målinger or {}
+    arbeidere = arbeidere or os.process_cpu_count() or 1
+
+    behov = minnebehov(dokumenter, minnebudsjett, målinger)
+    ledig = minnebudsjett
+    betingelse = threading.Condition()
+    fletting = threading.Lock()
+
+    def render_innenfor_budsjett(dokument: str) -> dict:
+        nonlocal ledig
+        with betingelse:
+            betingelse.wait_for(lambda: ledig >= behov[dokument])
+            ledig -= behov[dokument]
+        try:
+            with tempfile.TemporaryDirectory(prefix="quarto-") as prosjekt:
+                kopier_prosjekt(prosjekt)
+                resultat = render_dokument(dokument, prosjekt)
+                if resultat["ok"]:
+                    with fletting:
+                        flett_inn_output(dokument, prosjekt)
+                return resultat
+        finally:
+            with betingelse:
+                ledig += behov[dokument]
+                betingelse.notify_all()
+
+    logging.info(
+        f"Renderer {len(dokumenter)} dokumenter med opptil {arbeidere} samtidig innenfor {minnebudsjett:.0f} MB"
+    )
+    with ThreadPoolExecutor(max_workers=arbeidere) as executor:
+        futures = {
+            dokument: executor.submit(render_innenfor_budsjett, dokument)
+            for dokument in sorted(dokumenter, key=behov.get, reverse=True)
+        }
+        return [futures[dokument].result() for dokument in dokumenter]
+
+
+def logg_renderrapport(resultater: list[dict]) -> None:
+    """
+    Logger tid, maks minne og status for hvert dokument, og en oppsummering.
+    """
+    for resultat in resultater:
+        logging.info(
+            f"{'OK' if resultat['ok'] else 'FEILET':<6} {resultat['sekunder']:7.1f} s {resultat['maks_minne_mb']:7.0f} MB  {resultat['dokument']}"
+        )
+    feilet = [resultat["dokument"] for resultat in resultater if not resultat["ok"]]
+    logging.info(
+        f"Rendret {len(resultater) - len(feilet)} av {len(resultater)} dokumenter, "
+        f"sum rendertid {sum(resultat['sekunder'] for resultat in resultater):.0f} s"
+    )
+    if feilet:
+        logging.error(f"Rendering feilet for: {', '.join(feilet)}")
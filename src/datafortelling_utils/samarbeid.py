@@ -4,8 +4,10 @@ import pandas as pd
 import plotly.graph_objects as go
 
 from datafortelling_utils.helper import annotate_ikke_offisiell_statistikk
+from datafortelling_utils.sporing import spor
 
 
+@spor
 def plot_antall_samarbeid_over_tid(data_samarbeid: pd.DataFrame) -> go.Figure:
     """
     Plotter antall spørreundersøkelser av type spr_type over tid, gruppert per uke.
@@ -80,6 +82,7 @@ def plot_antall_samarbeid_over_tid(data_samarbeid: pd.DataFrame) -> go.Figure:
     return annotate_ikke_offisiell_statistikk(fig, y=1.15, color="red", weight="bold")
 
 
+@spor
 def plot_gjennomførte_spørreundersøkelser_over_tid(
     data_spørreundersøkelse: pd.DataFrame,
     spr_type: str,
@@ -193,6 +196,7 @@ def plot_gjennomførte_spørreundersøkelser_over_tid(
     return annotate_ikke_offisiell_statistikk(fig, y=1.15, color="red", weight="bold")
 
 
+@spor
 def plot_tid_mellom_hendelser(
     df: pd.DataFrame,
     kolonne_start: str,
@@ -306,6 +310,7 @@ def plot_tid_mellom_hendelser(
     return fig, yaxis_max
 
 
+@spor
 def plot_antall_saker_per_antall_samarbeid(
     data_samarbeid: pd.DataFrame, normalisert=False
 ) -> go.Figure:
@@ -395,6 +400,7 @@ def plot_antall_saker_per_antall_samarbeid(
     return annotate_ikke_offisiell_statistikk(fig)
 
 
+@spor
 def trakt_antall_samarbeid(
     data_samarbeid: pd.DataFrame,
     data_spørreundersøkelse: pd.DataFrame,
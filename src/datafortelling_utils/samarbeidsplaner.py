@@ -2,8 +2,10 @@ import pandas as pd
 import plotly.graph_objects as go
 
 from datafortelling_utils.konstanter import undertema_labels, undertema_navn
+from datafortelling_utils.sporing import spor
 
 
+@spor
 def plot_samarbeidsplaner_etter_status(
     data: pd.DataFrame,
     undertema_navn: list[str] = undertema_navn,
@@ -17,6 +19,7 @@ def plot_samarbeidsplaner_etter_status(
     if data.empty:
         return go.Figure()
 
+    # Like antall sorteres stabilt, så undertemaene beholder rekkefølgen i undertema_navn
     # Data PÅGÅR
     inkluderte_undertemaer: pd.DataFrame = data[data["inkludert"]]
     pågående_undertemaer: pd.DataFrame = inkluderte_undertemaer[
@@ -26,7 +29,7 @@ def plot_samarbeidsplaner_etter_status(
         pågående_undertemaer["navn"]
         .value_counts()
         .reindex(undertema_navn, fill_value=0)
-        .sort_values(ascending=True)
+        .sort_values(ascending=True, kind="stable")
     )
 
     # Data PLANLAGT
@@ -38,7 +41,7 @@ def plot_samarbeidsplaner_etter_status(
         planlagte_undertemaer["navn"]
         .value_counts()
         .reindex(undertema_navn, fill_value=0)
-        .sort_values(ascending=True)
+        .sort_values(ascending=True, kind="stable")
     )
 
     # Data FULLFØRT
@@ -50,7 +53,7 @@ def plot_samarbeidsplaner_etter_status(
         fullførte_undertemaer["navn"]
         .value_counts()
         .reindex(undertema_navn, fill_value=0)
-        .sort_values(ascending=True)
+        .sort_values(ascending=True, kind="stable")
     )
 
     # Data AVBRUTT
@@ -62,7 +65,7 @@ def plot_samarbeidsplaner_etter_status(
         avbrutte_undertemaer["navn"]
         .value_counts()
         .reindex(undertema_navn, fill_value=0)
-        .sort_values(ascending=True)
+        .sort_values(ascending=True, kind="stable")
     )
 
     fig = go.Figure()
@@ -0,0 +1,114 @@
+import json
+import logging
+import os
+from datetime import UTC, datetime
+from pathlib import Path
+
+import pandas as pd
+
+# Miljøvariabel som peker på katalogen med snapshot, settes av main.py før rendering
+SNAPSHOT_MILJØVARIABEL = "FIA_SNAPSHOT"
+MANIFEST_FILNAVN = "manifest.json"
+
+
+def tabell_filnavn(table: str) -> str:
+    return f"{table}.parquet"
+
+
+def les_manifest(katalog: str | Path) -> dict:
+    """
+    Leser manifestet til et snapshot. Returnerer tom dict om manifestet ikke finnes.
+    """
+    manifest_fil = Path(katalog) / MANIFEST_FILNAVN
+    if not manifest_fil.exists():
+        return {}
+    with open(manifest_fil, encoding="utf-8") as fil:
+        return json.load(fil)
+
+
+def skriv_manifest(katalog: str | Path, manifest: dict) -> None:
+    manifest_fil = Path(katalog) / MANIFEST_FILNAVN
+    with open(manifest_fil, "w", encoding="utf-8") as fil:
+        json.dump(manifest, fil, indent=2, ensure_ascii=False)
+
+
+def skriv_tabell_til_snapshot(
+    katalog: str | Path,
+    project: str,
+    dataset: str,
+    table: str,
+    data: pd.DataFrame,
+) -> dict:
+    """
+    Skriver en deduplisert tabell til snapshot som parquet og oppdaterer manifestet.
+    Returnerer manifest-innslaget for tabellen.
+    """
+    katalog = Path(katalog)
+    katalog.mkdir(parents=True, exist_ok=True)
+
+    fil = katalog / tabell_filnavn(table)
+    data.to_parquet(fil, index=False)
+
+    maks_tidsstempel = (
+        data["tidsstempel"].max() if "tidsstempel" in data.columns else None
+    )
+    innslag = {
+        "fil": fil.name,
+        "rader": len(data),
+        "bytes": fil.stat().st_size,
+        "maks_tidsstempel": None
+        if maks_tidsstempel is None or pd.isna(maks_tidsstempel)
+        else pd.Timestamp(maks_tidsstempel).isoformat(),
+    }
+
+    manifest = les_manifest(katalog)
+    manifest["project"] = project
+    manifest["dataset"] = dataset
+    manifest["opprettet"] = datetime.now(UTC).isoformat()
+    manifest.setdefault("tabeller", {})[table] = innslag
+    skriv_manifest(katalog, manifest)
+
+    logging.info(
+        f"Skrev {innslag['rader']} rader fra {table} til snapshot ({innslag['bytes'] / 1024 / 1024:.2f} MB)"
+    )
+    return innslag
+
+
+def finn_snapshot(project: str, dataset: str) -> Path | None:
+    """
+    Returnerer katalogen til snapshot for gitt prosjekt og dataset, om det er satt opp et.
+    """
+    katalog = os.environ.get(SNAPSHOT_MILJØVARIABEL)
+    if not katalog:
+        return None
+
+    manifest = les_manifest(katalog)
+    if manifest.get("project") != project or manifest.get("dataset") != dataset:
+        logging.warning(
+            f"Snapshot i {katalog} er ikke laget for {project}.{dataset}, henter fra BigQuery"
+        )
+        return None
+
+    return Path(katalog)
+
+
+def les_tabell_fra_snapshot(
+    katalog: str | Path,
+    table: str,
+    kolonner: list[str] | None = None,
+    filtre: list[list[tuple]] | None = None,
+) -> pd.DataFrame | None:
+    """
+    Leser en tabell fra snapshot. Med kolonner leses kun de oppgitte kolonnene.
+    Filtre er på formen til pyarrow (liste av lister med betingelser, OR av AND),
+    og brukes ved lesing av parquet-filen.
+    Returnerer None om tabellen ikke finnes i snapshot.
+    """
+    innslag = les_manifest(katalog).get("tabeller", {}).get(table)
+    if innslag is None:
+        return None
+
+    logging.info(f"Leser {table} fra snapshot i {katalog}")
+    return pd.read_parquet(
+        Path(katalog) / innslag["fil"], columns=kolonner, filters=filtre
+    )
@@ -0,0 +1,234 @@
+import functools
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+import pandas as pd
+import plotly.graph_objects as go
+
+from datafortelling_utils.profilering import DOKUMENT_MILJØVARIABEL
+
+# Miljøvariabel som slår på sporing: "stdout", eller en fil spans legges til i som OTLP JSON
+SPORING_MILJØVARIABEL = "FIA_SPORING"
+# Måler allokert minne per span med tracemalloc, som gjør pandas-koden flere ganger tregere
+MINNE_MILJØVARIABEL = "FIA_SPORING_MINNE"
+STDOUT = "stdout"
+TJENESTE = "fia-datafortelling"
+
+_aktiv: ContextVar[dict | None] = ContextVar("aktiv_span", default=None)
+_ferdige: dict[str, list[dict]] = {}
+_lås = threading.Lock()
+
+
+def _tabeller(verdier) -> list[pd.DataFrame | pd.Series]:
+    return [verdi for verdi in verdier if isinstance(verdi, pd.DataFrame | pd.Series)]
+
+
+def _data_attributter(verdier, retning: str) -> dict:
+    """
+    Antall rader og bytes (uten innhold i object-kolonner) i DataFrames og Series blant verdiene.
+    """
+    tabeller = _tabeller(verdier)
+    if not tabeller:
+        return {}
+    return {
+        f"rader.{retning}": sum(len(tabell) for tabell in tabeller),
+        f"bytes.{retning}": int(
+            sum(
+                tabell.memory_usage(index=True, deep=False).sum() for tabell in tabeller
+            )
+        ),
+    }
+
+
+def _som_liste(resultat) -> list:
+    return list(resultat) if isinstance(resultat, tuple) else [resultat]
+
+
+def _resultat_attributter(resultat) -> dict:
+    verdier = _som_liste(resultat)
+    figurer = [verdi for verdi in verdier if isinstance(verdi, go.Figure)]
+    attributter = _data_attributter(verdier, "ut")
+    if figurer:
+        attributter["figur.spor"] = sum(len(figur.data) for figur in figurer)
+    return attributter
+
+
+def _start_minne(forelder: dict | None) -> int:
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+    nå, topp = tracemalloc.get_traced_memory()
+    if forelder is not None:
+        forelder["topp"] = max(forelder.get("topp", 0), topp)
+    tracemalloc.reset_peak()
+    return nå
+
+
+@contextmanager
+def spenn(navn: str, **attributter):
+    """
+    Måler et span med varighet, og med FIA_SPORING_MINNE allokert minne fra tracemalloc (topp og netto).
+    Spans som startes inni blir barn av dette, også i tråder som kjøres med contextvars.copy_context().
+    Gir attributtene, så de kan utvides inni blokken, f.eks. med "rader.ut".
+    Gjør ingenting om FIA_SPORING ikke er satt.
+    """
+    if not os.environ.get(SPORING_MILJØVARIABEL):
+        yield attributter
+        return
+
+    forelder = _aktiv.get()
+    span = {
+        "navn": navn,
+        "trace_id": os.urandom(16).hex() if forelder is None else forelder["trace_id"],
+        "span_id": os.urandom(8).hex(),
+        "forelder": None if forelder is None else forelder["span_id"],
+        "start_ns": time.time_ns(),
+        "feil": None,
+        "attributter": attributter,
+    }
+    if os.environ.get(MINNE_MILJØVARIABEL):
+        span["start_minne"] = span["topp"] = _start_minne(forelder)
+    token = _aktiv.set(span)
+    try:
+        yield attributter
+    except BaseException as e:
+        span["feil"] = type(e).__name__
+        raise
+    finally:
+        _aktiv.reset(token)
+        _avslutt(span, forelder)
+
+
+def _avslutt(span: dict, forelder: dict | None) -> None:
+    span["slutt_ns"] = time.time_ns()
+    if "start_minne" in span:
+        nå, topp = tracemalloc.get_traced_memory()
+        span["topp"] = max(span["topp"], topp)
+        span["attributter"]["minne.topp_bytes"] = span["topp"] - span["start_minne"]
+        span["attributter"]["minne.netto_bytes"] = nå - span["start_minne"]
+    with _lås:
+        if forelder is not None and "topp" in forelder and "topp" in span:
+            forelder["topp"] = max(forelder["topp"], span["topp"])
+        _ferdige.setdefault(span["trace_id"], []).append(span)
+        if forelder is not None:
+            return
+        spans = _ferdige.pop(span["trace_id"])
+    _eksporter(spans)
+
+
+def spor(funksjon):
+    """
+    Decorator som måler hvert kall til funksjonen som et span, med rader og bytes inn og ut.
+    Sporing slås på med FIA_SPORING før pakken importeres, ellers returneres funksjonen uendret.
+    """
+    if not os.environ.get(SPORING_MILJØVARIABEL):
+        return funksjon
+    navn = f"{funksjon.__module__.rsplit('.', 1)[-1]}.{funksjon.__qualname__}"
+
+    @functools.wraps(funksjon)
+    def sporet(*args, **kwargs):
+        with spenn(navn, **_data_attributter([*args, *kwargs.values()], "inn")) as span:
+            resultat = funksjon(*args, **kwargs)
+            span.update(_resultat_attributter(resultat))
+            return resultat
+
+    return sporet
+
+
+def _otlp_verdi(verdi) -> dict:
+    # OTLP JSON koder int64 som tekst
+    if isinstance(verdi, bool):
+        return {"boolValue": verdi}
+    if isinstance(verdi, int):
+        return {"intValue": str(verdi)}
+    if isinstance(verdi, float):
+        return {"doubleValue": verdi}
+    return {"stringValue": str(verdi)}
+
+
+def _otlp_attributter(attributter: dict) -> list[dict]:
+    return [
+        {"key": nøkkel, "value": _otlp_verdi(verdi)}
+        for nøkkel, verdi in attributter.items()
+        if verdi is not None
+    ]
+
+
+def _otlp_span(span: dict) -> dict:
+    otlp = {
+        "traceId": span["trace_id"],
+        "spanId": span["span_id"],
+        "name": span["navn"],
+        # SPAN_KIND_INTERNAL
+        "kind": 1,
+        "startTimeUnixNano": str(span["start_ns"]),
+        "endTimeUnixNano": str(span["slutt_ns"]),
+        "attributes": _otlp_attributter(span["attributter"]),
+        # STATUS_CODE_OK og STATUS_CODE_ERROR
+        "status": {"code": 1}
+        if span["feil"] is None
+        else {"code": 2, "message": span["feil"]},
+    }
+    if span["forelder"] is not None:
+        otlp["parentSpanId"] = span["forelder"]
+    return otlp
+
+
+def _eksporter(spans: list[dict]) -> None:
+    """
+    Skriver spans i en trace, enten som én JSON-linje per span til stdout, for Loki og Elastic,
+    eller som én OTLP ExportTraceServiceRequest per linje i filen i FIA_SPORING.
+    """
+    mål = os.environ.get(SPORING_MILJØVARIABEL)
+    dokument = os.environ.get(DOKUMENT_MILJØVARIABEL, "main.py")
+
+    if mål == STDOUT:
+        linjer = [
+            json.dumps(
+                {
+                    "span": span["navn"],
+                    "trace_id": span["trace_id"],
+                    "span_id": span["span_id"],
+                    "parent_span_id": span["forelder"],
+                    "dokument": dokument,
+                    "millisekunder": (span["slutt_ns"] - span["start_ns"]) / 1e6,
+                    "feil": span["feil"],
+                    **span["attributter"],
+                },
+                ensure_ascii=False,
+            )
+            for span in spans
+        ]
+        # sys.stdout i en jupyter-kjerne havner i dokumentet, så det skrives til prosessens stdout
+        sys.__stdout__.write("\n".join(linjer) + "\n")
+        sys.__stdout__.flush()
+        return
+
+    linje = json.dumps(
+        {
+            "resourceSpans": [
+                {
+                    "resource": {
+                        "attributes": _otlp_attributter(
+                            {"service.name": TJENESTE, "dokument": dokument}
+                        )
+                    },
+                    "scopeSpans": [
+                        {
+                            "scope": {"name": "datafortelling_utils"},
+                            "spans": [_otlp_span(span) for span in spans],
+                        }
+                    ],
+                }
+            ]
+        },
+        ensure_ascii=False,
+    )
+    # Flere kjerner skriver til samme fil, én write per linje med append holder linjene hele
+    with open(mål, "a", encoding="utf-8") as f:
+        f.write(linje + "\n")
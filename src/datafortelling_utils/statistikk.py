@@ -1,5 +1,3 @@
-from datetime import datetime
-
 import pandas as pd
 import plotly.graph_objects as go
 from plotly.colors import hex_to_rgb
@@ -9,6 +7,7 @@ from datafortelling_utils.datahandler import filtrer_bort_saker_på_avsluttet_ti
 from datafortelling_utils.helper import (
     alle_måneder_mellom_datoer,
     annotate_ikke_offisiell_statistikk,
+    nå,
 )
 from datafortelling_utils.konstanter import (
     intervall_sortering,
@@ -16,29 +15,36 @@ from datafortelling_utils.konstanter import (
     resultatområder,
     statusordre,
 )
+from datafortelling_utils.sporing import spor
+from datafortelling_utils.tidslinje import (
+    beholdning,
+    lag_tidslinje,
+    strømmer_per_periode,
+)
 
 
-def saker_per_status_per_måned(data_status: pd.DataFrame) -> go.Figure:
+@spor
+def saker_per_status_per_måned(
+    data_status: pd.DataFrame, tidslinje: pd.DataFrame | None = None
+) -> go.Figure:
+    """
+    Antall saker i hver status ved starten av hver av de siste 12 månedene.
+    Tidslinjen fra lag_tidslinje kan gis med om den allerede er laget for data_status.
+    """
     data_status = filtrer_bort_saker_på_avsluttet_tidspunkt(
         data_status, antall_dager=365
     )
+    tidslinje = (
+        lag_tidslinje(data_status)
+        if tidslinje is None
+        else tidslinje[tidslinje.saksnummer.isin(data_status.saksnummer)]
+    )
 
     alle_måneder = alle_måneder_mellom_datoer(data_status["endretTidspunkt"].min())
     statuser = [status for status in statusordre if status != "NY"]
-
-    status_per_måned = dict(zip(statuser, [[0]] * len(statuser)))
-    for måned in alle_måneder:
-        data_måned = data_status[
-            data_status["endretTidspunkt"].dt.strftime("%Y-%m") == måned
-        ]
-        for status in statuser:
-            sist_count = status_per_måned[status][-1]
-            count = (
-                sist_count
-                - len(data_måned[data_måned["forrige_status"] == status])
-                + len(data_måned[data_måned["status"] == status])
-            )
-            status_per_måned[status] = status_per_måned[status] + [count]
+    status_per_måned = beholdning(
+        tidslinje, pd.PeriodIndex(alle_måneder, freq="M").to_timestamp(), statuser
+    )
 
     fig = go.Figure()
     antall_mnd = min(len(alle_måneder), 12)
@@ -46,7 +52,7 @@ def saker_per_status_per_måned(data_status: pd.DataFrame) -> go.Figure:
         fig.add_trace(
             go.Scatter(
                 x=alle_måneder[-antall_mnd:],
-                y=status_per_måned[status][-antall_mnd - 1 : -1],
+                y=status_per_måned[status].tolist()[-antall_mnd:],
                 name=status.capitalize().replace("_", " "),
             )
         )
@@ -61,56 +67,54 @@ def saker_per_status_per_måned(data_status: pd.DataFrame) -> go.Figure:
     return annotate_ikke_offisiell_statistikk(fig)
 
 
+@spor
 def saker_per_status_over_tid(
-    data_status: pd.DataFrame, valgte_resultatområder=None
+    data_status: pd.DataFrame,
+    valgte_resultatområder=None,
+    tidslinje: pd.DataFrame | None = None,
 ) -> go.Figure:
     første_dato = data_status["endretTidspunkt"].min()
-    siste_dato = datetime.now()
+    siste_dato = nå()
     alle_datoer = pd.date_range(første_dato, siste_dato, freq="d", normalize=True)
     statuser = [status for status in statusordre if status != "NY"]
 
-    def beregn_status_per_dato(data, datoer):
-        status_per_dato = dict(zip(statuser, [[0]] * len(statuser)))
-        for dato in datoer:
-            data_dato = data[data["endretTidspunkt"].dt.date == dato.date()]
-            for status in statuser:
-                sist_count = status_per_dato[status][-1]
-                count = (
-                    sist_count
-                    - len(data_dato[data_dato["forrige_status"] == status])
-                    + len(data_dato[data_dato["status"] == status])
-                )
-                status_per_dato[status] = status_per_dato[status] + [count]
-        return status_per_dato
+    if not valgte_resultatområder:
+        valgte_resultatområder = list(set(resultatområder.values()))
+
+    # Antall saker i hver status ved starten av hver dato, og ved slutten av siste dato
+    tidslinje = lag_tidslinje(data_status) if tidslinje is None else tidslinje
+    tidspunkter = alle_datoer.append(alle_datoer[-1:] + pd.Timedelta(days=1))
+    status_per_dato = beholdning(tidslinje, tidspunkter, statuser)
+    status_per_område = beholdning(
+        tidslinje, tidspunkter, statuser, gruppe="resultatomrade"
+    )
 
     fig = go.Figure()
 
     # En strek for hver status med alle fylker inkludert
-    status_per_dato = beregn_status_per_dato(data_status, alle_datoer)
     for status in statuser:
         fig.add_trace(
             go.Scatter(
                 visible=True,
                 x=alle_datoer,
-                y=status_per_dato[status],
+                y=status_per_dato[status].tolist(),
                 name=status.capitalize().replace("_", " "),
             )
         )
 
-    if not valgte_resultatområder:
-        valgte_resultatområder = list(set(resultatområder.values()))
-
     # En strek for hver kombinasjon av fylke og status
     for resultatområde in [s.replace(" ", "_").lower() for s in valgte_resultatområder]:
-        status_per_dato = beregn_status_per_dato(
-            data_status[data_status.resultatomrade == resultatområde], alle_datoer
+        status_per_dato = (
+            status_per_område[resultatområde]
+            if resultatområde in status_per_område.columns.get_level_values(0)
+            else pd.DataFrame(0, index=tidspunkter, columns=statuser)
         )
         for status in statuser:
             fig.add_trace(
                 go.Scatter(
                     visible=False,
                     x=alle_datoer,
-                    y=status_per_dato[status],
+                    y=status_per_dato[status].tolist(),
                     name=status.capitalize().replace("_", " "),
                 )
             )
@@ -160,6 +164,7 @@ def saker_per_status_over_tid(
     return annotate_ikke_offisiell_statistikk(fig)
 
 
+@spor
 def aktive_saker_per_kolonne(data_status: pd.DataFrame, kolonne: str) -> go.Figure:
     kolonne_ordre: list = (
         data_status[data_status.aktiv_sak]
@@ -174,11 +179,11 @@ def aktive_saker_per_kolonne(data_status: pd.DataFrame, kolonne: str) -> go.Figu
         .groupby([kolonne, "siste_status"])
         .saksnummer.nunique()
         .reset_index()
+        # siste_status er kategorier i statusordre
+        .sort_values(by="siste_status")
         .sort_values(
-            by="siste_status", key=lambda col: col.map(lambda e: statusordre.index(e))
-        )
-        .sort_values(
-            by=kolonne, key=lambda col: -col.map(lambda e: kolonne_ordre.index(e))
+            by=kolonne,
+            key=lambda col: -col.map(lambda e: kolonne_ordre.index(e)).astype(int),
         )
     )
 
@@ -206,14 +211,14 @@ def aktive_saker_per_kolonne(data_status: pd.DataFrame, kolonne: str) -> go.Figu
     return annotate_ikke_offisiell_statistikk(fig)
 
 
+@spor
 def antall_saker_per_status(data_status: pd.DataFrame) -> go.Figure:
     saker_per_status = (
         data_status.groupby("siste_status")["saksnummer"]
         .nunique()
         .reset_index()
-        .sort_values(
-            by="siste_status", key=lambda col: -col.map(lambda e: statusordre.index(e))
-        )
+        # siste_status er kategorier i statusordre
+        .sort_values(by="siste_status", ascending=False)
         .reset_index()
     )
 
@@ -235,6 +240,7 @@ def antall_saker_per_status(data_status: pd.DataFrame) -> go.Figure:
     return annotate_ikke_offisiell_statistikk(fig)
 
 
+@spor
 def virksomhetsprofil(data_input: pd.DataFrame) -> go.Figure:
     data = data_input.sort_values(
         ["saksnummer", "endretTidspunkt"], ascending=True
@@ -354,6 +360,7 @@ def hexfarge_til_rgba(hex_farge: str, alpha: float) -> str:
     return f"rgba({r}, {g}, {b}, {alpha})"
 
 
+@spor
 def statusflyt(
     data_status: pd.DataFrame,
     farger_nodes: dict[str, str] = {
@@ -381,7 +388,12 @@ def statusflyt(
     statusordre_uslettet: list[str] = [x for x in statusordre if x != "SLETTET"]
 
     status_indexes = dict(zip(statusordre_uslettet, range(len(statusordre_uslettet))))
-    status_endringer = data_status_uslettet.value_counts(["forrige_status", "status"])
+    # Status er kategorier, som tekst teller value_counts kun statusendringer som finnes
+    status_endringer = (
+        data_status_uslettet[["forrige_status", "status"]]
+        .astype("string")
+        .value_counts()
+    )
     source_status = status_endringer.index.get_level_values(0).map(status_indexes)
     target_status = status_endringer.index.get_level_values(1).map(status_indexes)
     count_endringer = status_endringer.values
@@ -431,23 +443,19 @@ def statusflyt(
     return annotate_ikke_offisiell_statistikk(fig)
 
 
-def gjennomstrømmingstall(data_status: pd.DataFrame, status="VI_BISTÅR") -> go.Figure:
+@spor
+def gjennomstrømmingstall(
+    data_status: pd.DataFrame,
+    status="VI_BISTÅR",
+    tidslinje: pd.DataFrame | None = None,
+) -> go.Figure:
     alle_måneder = alle_måneder_mellom_datoer(data_status.endretTidspunkt.min())
     antall_mnd = min(len(alle_måneder), 12)
-    inn = (
-        data_status[data_status.status == status]
-        .endretTidspunkt.dt.strftime("%Y-%m")
-        .value_counts()
-        .sort_index()
-        .reindex(alle_måneder, fill_value=0)[-antall_mnd:]
-    )
-    ut = (
-        data_status[data_status.forrige_status == status]
-        .endretTidspunkt.dt.strftime("%Y-%m")
-        .value_counts()
-        .sort_index()
-        .reindex(alle_måneder, fill_value=0)[-antall_mnd:]
-    )
+    tidslinje = lag_tidslinje(data_status) if tidslinje is None else tidslinje
+    strømmer = strømmer_per_periode(
+        tidslinje, status, pd.PeriodIndex(alle_måneder, freq="M")
+    ).set_axis(alle_måneder)[-antall_mnd:]
+    inn, ut = strømmer["inn"], strømmer["ut"]
 
     fig = go.Figure()
     fig.add_trace(go.Scatter(x=inn.index, y=inn.values, name="inn"))
@@ -461,6 +469,7 @@ def gjennomstrømmingstall(data_status: pd.DataFrame, status="VI_BISTÅR") -> go
     return annotate_ikke_offisiell_statistikk(fig)
 
 
+@spor
 def dager_mellom_statusendringer(data_status: pd.DataFrame) -> go.Figure:
     saker_per_intervall = (
         data_status.groupby("intervall_tid_siden_siste_endring")
@@ -487,6 +496,7 @@ def dager_mellom_statusendringer(data_status: pd.DataFrame) -> go.Figure:
     return annotate_ikke_offisiell_statistikk(fig)
 
 
+@spor
 def median_og_gjennomsnitt_av_tid_mellom_statusendringer(
     data_status: pd.DataFrame,
 ) -> go.Figure:
@@ -549,6 +559,7 @@ def median_og_gjennomsnitt_av_tid_mellom_statusendringer(
     return annotate_ikke_offisiell_statistikk(fig)
 
 
+@spor
 def antall_saker_per_eier(data_status: pd.DataFrame) -> go.Figure():
     saker_per_eier = (
         data_status[data_status.siste_status.isin(["VI_BISTÅR"])]
@@ -586,6 +597,7 @@ def antall_saker_per_eier(data_status: pd.DataFrame) -> go.Figure():
     return annotate_ikke_offisiell_statistikk(fig)
 
 
+@spor
 def fullført_per_måned(data_status: pd.DataFrame) -> go.Figure():
     fullført_per_måned = (
         data_status[data_status.status == "FULLFØRT"]
@@ -611,6 +623,7 @@ def fullført_per_måned(data_status: pd.DataFrame) -> go.Figure():
     return annotate_ikke_offisiell_statistikk(fig)
 
 
+@spor
 def antall_brukere_per_resultatområde(data_statistikk: pd.DataFrame) -> go.Figure():
     bruker_per_resultatområde = (
         data_statistikk.groupby("resultatomrade").endretAv.nunique().sort_values()
@@ -634,6 +647,7 @@ def antall_brukere_per_resultatområde(data_statistikk: pd.DataFrame) -> go.Figu
     return annotate_ikke_offisiell_statistikk(fig)
 
 
+@spor
 def antall_brukere_per_resultatområde_og_nav_enhet(
     data_statistikk: pd.DataFrame,
 ) -> go.Figure():
@@ -695,6 +709,7 @@ def antall_brukere_per_resultatområde_og_nav_enhet(
     return annotate_ikke_offisiell_statistikk(fig)
 
 
+@spor
 def antall_brukere_per_måned(data_statistikk: pd.DataFrame) -> go.Figure():
     antall_brukere_per_måned = data_statistikk.groupby(
         "endretTidspunkt_måned"
@@ -717,6 +732,7 @@ def antall_brukere_per_måned(data_statistikk: pd.DataFrame) -> go.Figure():
     return annotate_ikke_offisiell_statistikk(fig)
 
 
+@spor
 def andel_statusendringer_gjort_av_superbrukere(
     data_statistikk: pd.DataFrame,
 ) -> go.Figure():
@@ -752,6 +768,7 @@ def andel_statusendringer_gjort_av_superbrukere(
     return annotate_ikke_offisiell_statistikk(fig)
 
 
+@spor
 def andel_superbrukere(data_statistikk: pd.DataFrame) -> go.Figure():
     antall_superbrukere_per_måned = (
         data_statistikk[data_statistikk.endretAvRolle == "SUPERBRUKER"]
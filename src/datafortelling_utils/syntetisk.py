@@ -0,0 +1,802 @@
+import argparse
+import json
+import logging
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from datafortelling_utils.datahandler import arrow_til_pandas
+from datafortelling_utils.konstanter import (
+    ikkeaktuell_hovedgrunn,
+    statusordre,
+    undertema_navn,
+)
+from datafortelling_utils.snapshot import les_manifest, skriv_manifest, tabell_filnavn
+
+# Syntetiske data med samme skjema som tabellene i BigQuery, for testing av ytelse uten produksjonsdata.
+# Filene skrives som <tabell>.parquet og leses med DuckDBDatakilde (miljøvariabel FIA_DATAKILDE).
+
+SYNTETISK_PROJECT = "syntetisk"
+SYNTETISK_DATASET = "syntetisk"
+
+# Saksgangen følger statusordre: NY, VURDERES, KONTAKTES, KARTLEGGES, VI_BISTÅR,
+# og avsluttes med FULLFØRT (fra VI_BISTÅR), SLETTET (fra NY) eller IKKE_AKTUELL.
+_FREMOVER = statusordre[:5]
+_FULLFØRT, _IKKE_AKTUELL, _SLETTET = 5, 6, 7
+
+# Sannsynlighet for å gå videre fra hver status (fra VI_BISTÅR er videre FULLFØRT)
+_sannsynlighet_videre = np.array([0.93, 0.55, 0.6, 0.7, 0.85])
+
+# Gjennomsnittlig antall dager i hver status før neste hendelse
+_dager_i_status = np.array([2.0, 14.0, 21.0, 30.0, 120.0])
+
+# Sannsynlighet for at en statusendring angres med tilbake-knappen én eller to ganger
+_sannsynlighet_tilbake = 0.03
+_sannsynlighet_dobbel_tilbake = 0.005
+
+_hendelse_for_status: list[str] = [
+    "OPPRETT_SAK_FOR_VIRKSOMHET",
+    "VIRKSOMHET_VURDERES",
+    "VIRKSOMHET_SKAL_KONTAKTES",
+    "VIRKSOMHET_KARTLEGGES",
+    "VIRKSOMHET_SKAL_BISTÅS",
+    "FULLFØR_BISTAND",
+    "VIRKSOMHET_ER_IKKE_AKTUELL",
+    "SLETT_SAK",
+]
+
+# Omtrentlig folketall (i tusen) per fylke, brukes som vekt for hvor sakene ligger
+_folketall_per_fylke: dict[str, int] = {
+    "03": 717,
+    "11": 497,
+    "15": 270,
+    "18": 243,
+    "31": 311,
+    "32": 718,
+    "33": 272,
+    "34": 375,
+    "39": 256,
+    "40": 177,
+    "42": 318,
+    "46": 650,
+    "50": 483,
+    "55": 169,
+    "56": 75,
+}
+
+_sektorer: list[str] = ["PRIVAT", "KOMMUNAL", "STATLIG"]
+_sektor_vekter = np.array([0.62, 0.3, 0.08])
+
+# Næringer per sektor: (kode, navn, bransjeprogram, vekt)
+_næringer: dict[str, list[tuple[str, str, str | None, float]]] = {
+    "PRIVAT": [
+        (
+            "47.111",
+            "Butikkhandel med bredt vareutvalg med hovedvekt på nærings- og nytelsesmidler",
+            None,
+            4,
+        ),
+        ("41.200", "Oppføring av bygninger", "BYGG", 3),
+        ("43.210", "Elektrisk installasjonsarbeid", "BYGG", 2),
+        ("42.110", "Bygging av veier og motorveier", "ANLEGG", 1),
+        ("56.101", "Drift av restauranter og kafeer", None, 2),
+        ("49.410", "Godstransport på vei", "TRANSPORT", 2),
+        ("49.391", "Rutebiltransport utenfor by- og forstadsområde", "TRANSPORT", 1),
+        (
+            "10.200",
+            "Bearbeiding og konservering av fisk, krepsdyr og bløtdyr",
+            "NÆRINGSMIDDELINDUSTRI",
+            1,
+        ),
+        ("81.210", "Rengjøring av bygninger", None, 2),
+        ("78.200", "Utleie av arbeidskraft", None, 1),
+        ("62.010", "Programmeringstjenester", None, 1),
+        ("87.102", "Drift av sykehjem", "SYKEHJEM", 1),
+        ("88.911", "Barnehager", "BARNEHAGER", 1),
+    ],
+    "KOMMUNAL": [
+        (
+            "87.101",
+            "Pleie- og omsorgstjenester i institusjon for eldre og funksjonshemmede",
+            "SYKEHJEM",
+            3,
+        ),
+        ("88.101", "Hjemmetjenester for eldre og funksjonshemmede", None, 3),
+        ("85.201", "Ordinær grunnskoleundervisning", None, 2),
+        ("88.911", "Barnehager", "BARNEHAGER", 2),
+        ("84.110", "Generell offentlig administrasjon", None, 1),
+    ],
+    "STATLIG": [
+        ("86.101", "Alminnelige somatiske sykehus", None, 3),
+        ("85.421", "Universiteter", None, 1),
+        ("84.240", "Politi- og påtalemyndighet", None, 1),
+        (
+            "84.120",
+            "Offentlig administrasjon tilknyttet helsestell, sosial virksomhet, undervisning, kirke, kultur og miljøvern",
+            None,
+            1,
+        ),
+    ],
+}
+
+_TIMESTAMP = pa.timestamp("us", tz="UTC")
+_DATETIME = pa.timestamp("us")
+
+
+def _fordeling(vekter) -> np.ndarray:
+    vekter = np.asarray(vekter, dtype=float)
+    return vekter / vekter.sum()
+
+
+def _sekunder_til_tidspunkt(sekunder: np.ndarray, type: pa.DataType) -> pa.Array:
+    return pa.array(sekunder.astype("int64") * 1_000_000, pa.int64()).cast(type)
+
+
+def _tekst(tall: np.ndarray, prefiks: str = "", bredde: int = 0) -> pa.Array:
+    tekst = pc.cast(pa.array(tall, pa.int64()), pa.string())
+    if bredde:
+        tekst = pc.utf8_lpad(tekst, width=bredde, padding="0")
+    if prefiks:
+        tekst = pc.binary_join_element_wise(prefiks, tekst, "")
+    return tekst
+
+
+def _hent_kategori(kategorier: list, indekser: np.ndarray) -> pa.Array:
+    return pa.array(kategorier, pa.string()).take(pa.array(indekser, pa.int64()))
+
+
+def _innenfor_sak(lengder: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Gir sak og posisjon i saken for hver rad, når sakene har gitt antall rader.
+    """
+    sak = np.repeat(np.arange(len(lengder)), lengder)
+    starter = np.cumsum(lengder) - lengder
+    return sak, np.arange(len(sak)) - np.repeat(starter, lengder)
+
+
+def _geografi(
+    rng: np.random.Generator, antall: int
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    adm_enheter = pd.read_csv(
+        Path(__file__).resolve().parent / "data" / "administrative_enheter.csv",
+        dtype=str,
+    )
+    adm_enheter = adm_enheter[adm_enheter["fylkesnummer"].isin(_folketall_per_fylke)]
+    # Folketallet fordeles likt på kommunene i fylket
+    kommuner_i_fylke = adm_enheter["fylkesnummer"].map(
+        adm_enheter["fylkesnummer"].value_counts()
+    )
+    vekter = adm_enheter["fylkesnummer"].map(_folketall_per_fylke) / kommuner_i_fylke
+    valgt = rng.choice(len(adm_enheter), size=antall, p=_fordeling(vekter))
+    return (
+        adm_enheter["fylkesnummer"].to_numpy()[valgt],
+        adm_enheter["kommunenummer"].to_numpy()[valgt],
+        adm_enheter["fylkesnavn"].to_numpy()[valgt],
+    )
+
+
+def _neringer(rng: np.random.Generator, sektor: np.ndarray):
+    """
+    Trekker én eller to næringer per sak ut fra sektor. Returnerer neringer som json
+    (samme format som i BigQuery) og bransjeprogram til hovednæringen.
+    """
+    katalog = [
+        (s, kode, navn, bransje, vekt)
+        for s, næringer in _næringer.items()
+        for kode, navn, bransje, vekt in næringer
+    ]
+    hoved = np.empty(len(sektor), dtype=np.int64)
+    for s_indeks, s in enumerate(_sektorer):
+        i_sektor = np.flatnonzero(sektor == s_indeks)
+        kandidater = [i for i, rad in enumerate(katalog) if rad[0] == s]
+        hoved[i_sektor] = rng.choice(
+            kandidater,
+            size=len(i_sektor),
+            p=_fordeling([katalog[i][4] for i in kandidater]),
+        )
+    bi = np.where(
+        rng.random(len(sektor)) < 0.2, rng.integers(0, len(katalog), len(sektor)), -1
+    )
+    bi[bi == hoved] = -1
+
+    # Json lages kun én gang per kombinasjon av næringer
+    kombinasjoner, indekser = np.unique(
+        hoved * (len(katalog) + 1) + (bi + 1), return_inverse=True
+    )
+    tekster = []
+    for kombinasjon in kombinasjoner:
+        valgte = [kombinasjon // (len(katalog) + 1)]
+        if kombinasjon % (len(katalog) + 1):
+            valgte.append(kombinasjon % (len(katalog) + 1) - 1)
+        tekster.append(
+            json.dumps(
+                [{"kode": katalog[i][1], "navn": katalog[i][2]} for i in valgte],
+                ensure_ascii=False,
+            )
+        )
+    return (
+        _hent_kategori(tekster, indekser),
+        _hent_kategori([rad[3] for rad in katalog], hoved),
+    )
+
+
+def _ikke_aktuell_begrunnelser(rng: np.random.Generator, antall: int) -> pa.Array:
+    grunner = list(ikkeaktuell_hovedgrunn)
+    første = rng.integers(0, len(grunner), antall)
+    andre = np.where(
+        rng.random(antall) < 0.3, rng.integers(0, len(grunner), antall), -1
+    )
+    andre[andre == første] = -1
+    tekster = [f"[{grunn}]" for grunn in grunner] + [
+        f"[{a}, {b}]" for a in grunner for b in grunner
+    ]
+    return _hent_kategori(
+        tekster,
+        np.where(andre < 0, første, len(grunner) + første * len(grunner) + andre),
+    )
+
+
+def lag_syntetiske_tabeller(
+    antall_saker: int,
+    start: str = "2023-01-01",
+    slutt: str | None = None,
+    seed: int = 0,
+    første_sak: int = 0,
+    andel_duplikater: float = 0.02,
+) -> dict[str, pa.Table]:
+    """
+    Lager syntetiske data for ia-sak-statistikk-v1, samarbeid-v1, sporreundersokelse-v1 og samarbeidsplan-v1.
+    Sakene følger saksgangen i statusordre med tilbake-hendelser, og fordeles på fylker,
+    sektorer og næringer omtrent som i produksjon. Det blir 4-5 hendelser per sak.
+    Tabellene er ikke deduplisert: andel_duplikater av hendelsene eksporteres på nytt,
+    og samarbeid, spørreundersøkelser og samarbeidsplaner har tidligere versjoner.
+    første_sak gir unike id-er når data lages i flere omganger (samarbeid får id fra første_sak * 3).
+    """
+    rng = np.random.default_rng([seed, første_sak])
+    start_s = pd.Timestamp(start, tz="UTC").timestamp()
+    slutt_s = (
+        pd.Timestamp(slutt, tz="UTC") if slutt else pd.Timestamp.now(tz="UTC")
+    ).timestamp()
+    n = antall_saker
+
+    # Saker: flere saker opprettes mot slutten av perioden
+    opprettet = start_s + (slutt_s - start_s) * np.sqrt(rng.random(n))
+    sektor = rng.choice(len(_sektorer), size=n, p=_sektor_vekter)
+    fylkesnummer, kommunenummer, fylkesnavn = _geografi(rng, n)
+    neringer, bransjeprogram = _neringer(rng, sektor)
+    antall_personer = np.maximum(np.round(rng.lognormal(3.4, 1.1, n)), 0)
+    mulige_dagsverk = np.round(antall_personer * rng.uniform(55, 65, n), 1)
+    sykefraværsprosent = np.round(rng.gamma(4, 1.6, n), 1)
+    antall_saksbehandlere = max(20, n // 200)
+    saksbehandler = rng.integers(0, antall_saksbehandlere, n)
+    superbruker = rng.integers(0, max(5, antall_saksbehandlere // 10), n)
+    orgnr = rng.integers(0, max(1, int(n * 0.8)), n) + første_sak
+
+    # Saksgang: hvor langt saken kommer, og hvordan den avsluttes
+    videre = rng.random((n, len(_FREMOVER))) < _sannsynlighet_videre
+    stopp = np.where(videre.all(axis=1), len(_FREMOVER), (~videre).argmax(axis=1))
+    avslutning = np.select(
+        [stopp == len(_FREMOVER), stopp == 0], [_FULLFØRT, _SLETTET], _IKKE_AKTUELL
+    )
+    lengde = np.minimum(stopp, len(_FREMOVER) - 1) + 2
+
+    sak, posisjon = _innenfor_sak(lengde)
+    er_avslutning = posisjon == lengde[sak] - 1
+    status = np.where(er_avslutning, avslutning[sak], posisjon)
+
+    # Tid i forrige status, minst én time
+    dager = _dager_i_status[np.maximum(posisjon - 1, 0)]
+    pause = np.where(
+        posisjon == 0, 0, np.maximum(rng.exponential(dager) * 86_400, 3_600)
+    )
+    kumulativ = np.cumsum(pause)
+    tidspunkt = (
+        opprettet[sak]
+        + kumulativ
+        - np.repeat(kumulativ[np.cumsum(lengde) - lengde], lengde)
+    )
+
+    # Saker som ikke har kommet til slutten av saksgangen før slutt er fortsatt aktive
+    behold = tidspunkt <= slutt_s
+    sak, posisjon, status, tidspunkt = (
+        sak[behold],
+        posisjon[behold],
+        status[behold],
+        tidspunkt[behold],
+    )
+    # Radene er sortert på sak og tid, så siste rad per sak er der saken skifter
+    siste_rad = np.flatnonzero(np.append(sak[1:] != sak[:-1], True))
+    siste_tidspunkt = np.full(n, np.nan)
+    siste_tidspunkt[sak[siste_rad]] = tidspunkt[siste_rad]
+    siste_status = np.zeros(n, dtype=np.int64)
+    siste_status[sak[siste_rad]] = status[siste_rad]
+
+    def status_i_posisjon(s: np.ndarray, p: np.ndarray) -> np.ndarray:
+        return np.where(p == lengde[s] - 1, avslutning[s], p)
+
+    # Tilbake-knappen: statusendringen angres (en eller to ganger) og gjøres på nytt,
+    # hver tilbake-hendelse setter status til den før endringen som angres
+    trekk = rng.random(len(sak))
+    dybde = np.select(
+        [
+            (posisjon >= 2) & (trekk < _sannsynlighet_dobbel_tilbake),
+            (posisjon >= 1) & (trekk < _sannsynlighet_tilbake),
+        ],
+        [2, 1],
+        0,
+    )
+    hendelse_rad, j = _innenfor_sak(1 + 2 * dybde)
+    d = dybde[hendelse_rad]
+    er_tilbake = (j >= 1) & (j <= d)
+    ny_posisjon = np.where(
+        j == 0,
+        posisjon[hendelse_rad],
+        np.where(
+            er_tilbake,
+            posisjon[hendelse_rad] - j,
+            posisjon[hendelse_rad] - 2 * d + j,
+        ),
+    )
+    sak_status = sak[hendelse_rad]
+    status_status = status_i_posisjon(sak_status, ny_posisjon)
+    tid_status = (
+        tidspunkt[hendelse_rad] + j * rng.integers(60, 300, len(sak))[hendelse_rad]
+    )
+    hendelse_status = np.where(er_tilbake, len(_hendelse_for_status), status_status)
+
+    # Eierskap tas en halvtime etter at saken begynner å vurderes
+    vurderes = status == 1
+    ta_eierskap = vurderes & (rng.random(len(sak)) < 0.9)
+    eierskap_tid = np.full(n, np.inf)
+    eierskap_tid[sak[ta_eierskap]] = tidspunkt[ta_eierskap] + 1_800
+
+    # Samarbeid opprettes når saken kartlegges
+    kartlegges = status == 3
+    sak_med_samarbeid = sak[kartlegges]
+    antall_samarbeid = 1 + rng.binomial(2, 0.15, len(sak_med_samarbeid))
+    samarbeid_indeks, samarbeid_nr = _innenfor_sak(antall_samarbeid)
+    samarbeid_sak = sak_med_samarbeid[samarbeid_indeks]
+    samarbeid_opprettet = (
+        tidspunkt[kartlegges][samarbeid_indeks] + 2_700 + samarbeid_nr * 60
+    )
+    samarbeid_id = første_sak * 3 + np.arange(len(samarbeid_sak))
+
+    hendelser_sak = np.concatenate([sak_status, sak[ta_eierskap], samarbeid_sak])
+    hendelser_tid = np.concatenate(
+        [tid_status, eierskap_tid[sak[ta_eierskap]], samarbeid_opprettet]
+    )
+    hendelser_status = np.concatenate(
+        [
+            status_status,
+            np.full(ta_eierskap.sum(), 1),
+            np.full(len(samarbeid_sak), 3),
+        ]
+    )
+    hendelse_navn = [
+        *_hendelse_for_status,
+        "TILBAKE",
+        "TA_EIERSKAP_I_SAK",
+        "NY_PROSESS",
+    ]
+    hendelser_hendelse = np.concatenate(
+        [
+            hendelse_status,
+            np.full(ta_eierskap.sum(), len(_hendelse_for_status) + 1),
+            np.full(len(samarbeid_sak), len(_hendelse_for_status) + 2),
+        ]
+    )
+    behold = hendelser_tid <= slutt_s
+    rekkefølge = np.lexsort((hendelser_tid[behold], hendelser_sak[behold]))
+    h_sak = hendelser_sak[behold][rekkefølge]
+    h_tid = hendelser_tid[behold][rekkefølge]
+    h_status = hendelser_status[behold][rekkefølge]
+    h_hendelse = hendelser_hendelse[behold][rekkefølge]
+    antall_hendelser = len(h_sak)
+
+    er_avsluttet = np.isin(h_status, [_FULLFØRT, _IKKE_AKTUELL, _SLETTET])
+    superbruker_hendelse = np.isin(h_status, [0, 1, _SLETTET]) & (
+        h_hendelse != len(_hendelse_for_status) + 1
+    )
+    har_eier = h_tid >= eierskap_tid[h_sak]
+    saksbehandler_ident = _tekst(saksbehandler[h_sak], prefiks="Z", bredde=6)
+    superbruker_ident = _tekst(superbruker[h_sak], prefiks="S", bredde=6)
+    begrunnelse = _ikke_aktuell_begrunnelser(rng, antall_hendelser)
+    null_tekst = pa.nulls(antall_hendelser, pa.string())
+    # Kolonnene datafortellingene ikke henter (se statistikk_kolonner) er med for samme skjema, uten verdier
+    null_heltall = pa.nulls(antall_hendelser, pa.int64())
+    null_tall = pa.nulls(antall_hendelser, pa.float64())
+    saksnummer = _tekst(np.arange(n) + første_sak, prefiks="01", bredde=24)
+
+    statistikk = pa.table(
+        {
+            "saksnummer": saksnummer.take(pa.array(h_sak)),
+            "orgnr": _tekst(orgnr[h_sak] + 800_000_000),
+            "eierAvSak": pc.if_else(har_eier, saksbehandler_ident, null_tekst),
+            "status": _hent_kategori(statusordre, h_status),
+            "hendelse": _hent_kategori(hendelse_navn, h_hendelse),
+            "endretAvHendelseId": _tekst(
+                np.arange(antall_hendelser), prefiks=f"h{første_sak}-"
+            ),
+            "endretTidspunkt": _sekunder_til_tidspunkt(h_tid, _TIMESTAMP),
+            "opprettetTidspunkt": _sekunder_til_tidspunkt(opprettet[h_sak], _TIMESTAMP),
+            "avsluttetTidspunkt": pc.if_else(
+                er_avsluttet,
+                _sekunder_til_tidspunkt(h_tid, _TIMESTAMP),
+                pa.nulls(antall_hendelser, _TIMESTAMP),
+            ),
+            "ikkeAktuelBegrunnelse": pc.if_else(
+                h_status == _IKKE_AKTUELL, begrunnelse, null_tekst
+            ),
+            "antallPersoner": pa.array(
+                antall_personer[h_sak].astype("int64"), pa.int64()
+            ),
+            "tapteDagsverk": pa.array(
+                np.round(mulige_dagsverk[h_sak] * sykefraværsprosent[h_sak] / 100, 1)
+            ),
+            "muligeDagsverk": pa.array(mulige_dagsverk[h_sak]),
+            "sykefraversprosent": pa.array(sykefraværsprosent[h_sak]),
+            "arstall": null_heltall,
+            "kvartal": null_heltall,
+            "kvartaler": null_tekst,
+            "tapteDagsverkSiste4Kvartal": null_tall,
+            "muligeDagsverkSiste4Kvartal": null_tall,
+            "sykefraversprosentSiste4Kvartal": null_tall,
+            "sektor": _hent_kategori(_sektorer, sektor[h_sak]),
+            "neringer": neringer.take(pa.array(h_sak)),
+            "bransjeprogram": bransjeprogram.take(pa.array(h_sak)),
+            "postnummer": null_tekst,
+            "kommunenummer": pa.array(kommunenummer[h_sak], pa.string()),
+            "fylkesnummer": pa.array(fylkesnummer[h_sak], pa.string()),
+            "endretAv": pc.if_else(
+                superbruker_hendelse, superbruker_ident, saksbehandler_ident
+            ),
+            "endretAvRolle": pc.if_else(
+                superbruker_hendelse, "SUPERBRUKER", "SAKSBEHANDLER"
+            ),
+            "enhetsnummer": null_tekst,
+            "enhetsnavn": pc.binary_join_element_wise(
+                "Nav arbeidslivssenter ",
+                pa.array(fylkesnavn[h_sak], pa.string()),
+                "",
+            ),
+            "tapteDagsverkGradert": null_tall,
+            "graderingsprosent": null_tall,
+            "tapteDagsverkGradertSiste4Kvartal": null_tall,
+            "graderingsprosentSiste4Kvartal": null_tall,
+            "tidsstempel": _sekunder_til_tidspunkt(
+                h_tid + rng.integers(1, 600, antall_hendelser), _TIMESTAMP
+            ),
+        }
+    )
+    duplikater = np.flatnonzero(rng.random(antall_hendelser) < andel_duplikater)
+    if len(duplikater):
+        kopi = statistikk.take(pa.array(duplikater))
+        kopi = kopi.set_column(
+            kopi.schema.get_field_index("tidsstempel"),
+            "tidsstempel",
+            _sekunder_til_tidspunkt(
+                h_tid[duplikater] + rng.integers(600, 86_400, len(duplikater)),
+                _TIMESTAMP,
+            ),
+        )
+        statistikk = pa.concat_tables([statistikk, kopi])
+
+    # Samarbeid: status følger hvordan saken endte
+    antall_s = len(samarbeid_sak)
+    endte_status = siste_status[samarbeid_sak]
+    trekk = rng.random(antall_s)
+    samarbeid_status = np.select(
+        [
+            trekk < 0.03,
+            (endte_status == _FULLFØRT) & (trekk < 0.9),
+            endte_status >= _FULLFØRT,
+        ],
+        [3, 1, 2],
+        0,
+    )
+    samarbeid_statuser = ["AKTIV", "FULLFØRT", "AVBRUTT", "SLETTET"]
+    samarbeid_fullført = np.where(
+        samarbeid_status == 1, siste_tidspunkt[samarbeid_sak], np.nan
+    )
+    samarbeid_endret = np.fmax(
+        samarbeid_opprettet,
+        np.where(samarbeid_status == 0, np.nan, siste_tidspunkt[samarbeid_sak]),
+    )
+    samarbeid = pa.table(
+        {
+            "id": pa.array(samarbeid_id, pa.int64()),
+            "saksnummer": saksnummer.take(pa.array(samarbeid_sak)),
+            "status": _hent_kategori(samarbeid_statuser, samarbeid_status),
+            "opprettet": _sekunder_til_tidspunkt(samarbeid_opprettet, _DATETIME),
+            "fullfort": pc.if_else(
+                samarbeid_status == 1,
+                _sekunder_til_tidspunkt(np.nan_to_num(samarbeid_fullført), _DATETIME),
+                pa.nulls(antall_s, _DATETIME),
+            ),
+            "tidsstempel": _sekunder_til_tidspunkt(samarbeid_endret + 5, _TIMESTAMP),
+        }
+    )
+    samarbeid = _med_tidligere_versjon(
+        samarbeid,
+        samarbeid_status != 0,
+        {"status": "AKTIV", "fullfort": None},
+        _sekunder_til_tidspunkt(samarbeid_opprettet + 1, _TIMESTAMP),
+    )
+
+    ikke_slettet = np.flatnonzero(samarbeid_status != 3)
+
+    # Spørreundersøkelser: behovsvurdering etter oppstart, evaluering før fullføring
+    behovsvurdering = ikke_slettet[rng.random(len(ikke_slettet)) < 0.8]
+    evaluering = ikke_slettet[
+        (samarbeid_status[ikke_slettet] == 1) & (rng.random(len(ikke_slettet)) < 0.5)
+    ]
+    spørreundersøkelse_samarbeid = np.concatenate([behovsvurdering, evaluering])
+    spørreundersøkelse_type = np.repeat([0, 1], [len(behovsvurdering), len(evaluering)])
+    antall_u = len(spørreundersøkelse_samarbeid)
+    spørreundersøkelse_opprettet = np.where(
+        spørreundersøkelse_type == 0,
+        samarbeid_opprettet[spørreundersøkelse_samarbeid]
+        + rng.exponential(10 * 86_400, antall_u),
+        np.nan_to_num(samarbeid_fullført[spørreundersøkelse_samarbeid])
+        - rng.exponential(7 * 86_400, antall_u),
+    )
+    behold = spørreundersøkelse_opprettet <= slutt_s
+    spørreundersøkelse_samarbeid = spørreundersøkelse_samarbeid[behold]
+    spørreundersøkelse_type = spørreundersøkelse_type[behold]
+    spørreundersøkelse_opprettet = spørreundersøkelse_opprettet[behold]
+    antall_u = len(spørreundersøkelse_samarbeid)
+
+    spørreundersøkelse_status = rng.choice(4, size=antall_u, p=[0.05, 0.05, 0.85, 0.05])
+    avsluttet = spørreundersøkelse_status == 2
+    spørreundersøkelse_fullført = np.minimum(
+        spørreundersøkelse_opprettet + rng.exponential(86_400, antall_u), slutt_s
+    )
+    # Noen avsluttede spørreundersøkelser mangler fullført tidspunkt, som i produksjon
+    mangler_fullført = rng.random(antall_u) < 0.4
+    spørreundersøkelse = pa.table(
+        {
+            "id": _tekst(np.arange(antall_u), prefiks=f"u{første_sak}-"),
+            "samarbeidId": pa.array(
+                samarbeid_id[spørreundersøkelse_samarbeid], pa.int64()
+            ),
+            "type": _hent_kategori(
+                ["Behovsvurdering", "Evaluering"], spørreundersøkelse_type
+            ),
+            "status": _hent_kategori(
+                ["OPPRETTET", "PÅGÅR", "AVSLUTTET", "SLETTET"],
+                spørreundersøkelse_status,
+            ),
+            "harMinstEttSvar": pa.array(
+                np.where(avsluttet, rng.random(antall_u) < 0.95, False)
+            ),
+            "endret": _sekunder_til_tidspunkt(
+                np.where(
+                    avsluttet, spørreundersøkelse_fullført, spørreundersøkelse_opprettet
+                ),
+                _DATETIME,
+            ),
+            "fullfort": pc.if_else(
+                avsluttet & ~mangler_fullført,
+                _sekunder_til_tidspunkt(spørreundersøkelse_fullført, _DATETIME),
+                pa.nulls(antall_u, _DATETIME),
+            ),
+            "tidsstempel": _sekunder_til_tidspunkt(
+                np.where(
+                    avsluttet, spørreundersøkelse_fullført, spørreundersøkelse_opprettet
+                )
+                + 5,
+                _TIMESTAMP,
+            ),
+        }
+    )
+    spørreundersøkelse = _med_tidligere_versjon(
+        spørreundersøkelse,
+        spørreundersøkelse_status != 0,
+        {"status": "OPPRETTET", "harMinstEttSvar": False, "fullfort": None},
+        _sekunder_til_tidspunkt(spørreundersøkelse_opprettet + 1, _TIMESTAMP),
+    )
+
+    # Samarbeidsplaner: én rad per undertema, status følger samarbeidet
+    med_plan = ikke_slettet[rng.random(len(ikke_slettet)) < 0.7]
+    plan_samarbeid = np.repeat(med_plan, len(undertema_navn))
+    undertema = np.tile(np.arange(len(undertema_navn)), len(med_plan))
+    antall_p = len(plan_samarbeid)
+    inkludert = rng.random(antall_p) < 0.3
+    trekk = rng.random(antall_p)
+    plan_samarbeid_status = samarbeid_status[plan_samarbeid]
+    plan_status = np.select(
+        [
+            ~inkludert,
+            plan_samarbeid_status == 2,
+            plan_samarbeid_status == 1,
+            trekk < 0.4,
+            trekk < 0.9,
+        ],
+        [0, 3, np.where(trekk < 0.7, 2, 3), 0, 1],
+        2,
+    )
+    start_dato = samarbeid_opprettet[plan_samarbeid] + 14 * 86_400
+    slutt_dato = start_dato + rng.integers(90, 365, antall_p) * 86_400
+    plan_endret = np.minimum(
+        samarbeid_opprettet[plan_samarbeid] + rng.exponential(30 * 86_400, antall_p),
+        slutt_s,
+    )
+    samarbeidsplan = pa.table(
+        {
+            "id": pa.array(np.arange(antall_p) + første_sak * 33, pa.int64()),
+            "plan_id": _tekst(
+                np.searchsorted(med_plan, plan_samarbeid), prefiks=f"p{første_sak}-"
+            ),
+            "samarbeid_id": pa.array(samarbeid_id[plan_samarbeid], pa.int64()),
+            "navn": _hent_kategori(undertema_navn, undertema),
+            "inkludert": pa.array(inkludert),
+            "status": _hent_kategori(
+                ["PLANLAGT", "PÅGÅR", "FULLFØRT", "AVBRUTT"], plan_status
+            ),
+            "start_dato": _sekunder_til_tidspunkt(start_dato, _DATETIME).cast(
+                pa.date32()
+            ),
+            "slutt_dato": _sekunder_til_tidspunkt(slutt_dato, _DATETIME).cast(
+                pa.date32()
+            ),
+            "tidsstempel": _sekunder_til_tidspunkt(plan_endret + 5, _TIMESTAMP),
+        }
+    )
+    samarbeidsplan = _med_tidligere_versjon(
+        samarbeidsplan,
+        plan_status != 0,
+        {"status": "PLANLAGT"},
+        _sekunder_til_tidspunkt(samarbeid_opprettet[plan_samarbeid] + 1, _TIMESTAMP),
+    )
+
+    return {
+        "ia-sak-statistikk-v1": statistikk,
+        "samarbeid-v1": samarbeid,
+        "sporreundersokelse-v1": spørreundersøkelse,
+        "samarbeidsplan-v1": samarbeidsplan,
+    }
+
+
+def _med_tidligere_versjon(
+    tabell: pa.Table,
+    maske: np.ndarray,
+    endringer: dict,
+    tidsstempel: pa.Array,
+) -> pa.Table:
+    """
+    Legger til en tidligere versjon av radene i maske, med endringer og tidligere tidsstempel,
+    slik at tabellen må dedupliseres som i BigQuery.
+    """
+    indekser = pa.array(np.flatnonzero(maske))
+    tidligere = tabell.take(indekser)
+    for kolonne, verdi in {**endringer, "tidsstempel": None}.items():
+        type = tabell.schema.field(kolonne).type
+        if kolonne == "tidsstempel":
+            ny = tidsstempel.take(indekser)
+        elif verdi is None:
+            ny = pa.nulls(len(tidligere), type)
+        else:
+            ny = pa.array(np.full(len(tidligere), verdi), type)
+        tidligere = tidligere.set_column(
+            tabell.schema.get_field_index(kolonne), kolonne, ny
+        )
+    return pa.concat_tables([tidligere, tabell])
+
+
+def lag_syntetiske_data(
+    antall_saker: int,
+    start: str = "2023-01-01",
+    slutt: str | None = None,
+    seed: int = 0,
+) -> dict[str, pd.DataFrame]:
+    """
+    Som lag_syntetiske_tabeller, men som DataFrames med samme datatyper som fra BigQuery.
+    """
+    return {
+        table: arrow_til_pandas(tabell)
+        for table, tabell in lag_syntetiske_tabeller(
+            antall_saker=antall_saker, start=start, slutt=slutt, seed=seed
+        ).items()
+    }
+
+
+def skriv_syntetiske_data(
+    katalog: str | Path,
+    antall_saker: int,
+    start: str = "2023-01-01",
+    slutt: str | None = None,
+    seed: int = 0,
+    saker_per_batch: int = 100_000,
+) -> dict:
+    """
+    Lager syntetiske data i batcher av saker og skriver dem som parquet med manifest,
+    slik at også titalls millioner hendelser kan lages uten å holde alt i minnet.
+    Returnerer manifestet.
+    """
+    katalog = Path(katalog)
+    katalog.mkdir(parents=True, exist_ok=True)
+    slutt = slutt or pd.Timestamp.now(tz="UTC").isoformat()
+
+    skrivere: dict[str, pq.ParquetWriter] = {}
+    rader: dict[str, int] = {}
+    maks_tidsstempel: dict[str, pd.Timestamp] = {}
+    try:
+        for første_sak in range(0, antall_saker, saker_per_batch):
+            tabeller = lag_syntetiske_tabeller(
+                antall_saker=min(saker_per_batch, antall_saker - første_sak),
+                start=start,
+                slutt=slutt,
+                seed=seed,
+                første_sak=første_sak,
+            )
+            for table, tabell in tabeller.items():
+                if table not in skrivere:
+                    skrivere[table] = pq.ParquetWriter(
+                        katalog / tabell_filnavn(table), tabell.schema
+                    )
+                skrivere[table].write_table(tabell)
+                rader[table] = rader.get(table, 0) + tabell.num_rows
+                maks = pc.max(tabell["tidsstempel"]).as_py()
+                if maks is not None:
+                    maks_tidsstempel[table] = max(
+                        maks, maks_tidsstempel.get(table, maks)
+                    )
+            logging.info(
+                f"Laget syntetiske data for {første_sak + min(saker_per_batch, antall_saker - første_sak)} av {antall_saker} saker"
+            )
+    finally:
+        for skriver in skrivere.values():
+            skriver.close()
+
+    manifest = les_manifest(katalog)
+    manifest["project"] = SYNTETISK_PROJECT
+    manifest["dataset"] = SYNTETISK_DATASET
+    manifest["opprettet"] = pd.Timestamp.now(tz="UTC").isoformat()
+    manifest["syntetisk"] = {
+        "antall_saker": antall_saker,
+        "start": start,
+        "slutt": slutt,
+        "seed": seed,
+    }
+    for table, antall in rader.items():
+        fil = katalog / tabell_filnavn(table)
+        manifest.setdefault("tabeller", {})[table] = {
+            "fil": fil.name,
+            "rader": antall,
+            "bytes": fil.stat().st_size,
+            "maks_tidsstempel": maks_tidsstempel[table].isoformat()
+            if table in maks_tidsstempel
+            else None,
+        }
+    skriv_manifest(katalog, manifest)
+
+    logging.info(
+        f"Skrev {rader.get('ia-sak-statistikk-v1', 0)} syntetiske hendelser for {antall_saker} saker til {katalog}"
+    )
+    return manifest
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+    )
+    parser = argparse.ArgumentParser(
+        description="Lager syntetiske Fia-data som parquet, les dem med FIA_DATAKILDE=<katalog>"
+    )
+    parser.add_argument("katalog", help="Mappe parquet-filene skrives til")
+    parser.add_argument("--saker", type=int, default=10_000, help="Antall saker")
+    parser.add_argument("--start", default="2023-01-01", help="Første dato for saker")
+    parser.add_argument("--slutt", default=None, help="Siste dato, standard er nå")
+    parser.add_argument("--seed", type=int, default=0)
+    argumenter = parser.parse_args()
+    skriv_syntetiske_data(
+        katalog=argumenter.katalog,
+        antall_saker=argumenter.saker,
+        start=argumenter.start,
+        slutt=argumenter.slutt,
+        seed=argumenter.seed,
+    )
@@ -1,12 +1,16 @@
-from datetime import datetime, timedelta
-
 import pandas as pd
 import plotly.graph_objects as go
 
-from datafortelling_utils.datahandler import beregn_siste_oppdatering
-from datafortelling_utils.helper import annotate_ikke_offisiell_statistikk
+from datafortelling_utils.datahandler import (
+    beregn_siste_oppdatering,
+    intervaller_mellom_endringer,
+    urørte_saker_per_dato,
+)
+from datafortelling_utils.helper import annotate_ikke_offisiell_statistikk, nå
+from datafortelling_utils.sporing import spor
 
 
+@spor
 def dager_siden_siste_oppdatering(
     data_status: pd.DataFrame, data_eierskap: pd.DataFrame, data_leveranse: pd.DataFrame
 ) -> go.Figure:
@@ -31,72 +35,74 @@ def dager_siden_siste_oppdatering(
     return annotate_ikke_offisiell_statistikk(fig)
 
 
+@spor
 def urørt_saker_over_tid(
     data_status: pd.DataFrame,
     data_eierskap: pd.DataFrame,
     data_leveranse: pd.DataFrame,
-    antall_dager: int,
+    antall_dager: int | list[int],
 ) -> go.Figure:
+    """
+    Antall saker per aktiv status som ikke har vært endret på mer enn antall_dager, per dato.
+    Med flere antall_dager velges det mellom dem i en meny, og den første vises først.
+    """
     første_dato = data_status.endretTidspunkt.min()
-    now = datetime.now()
+    now = nå()
     alle_datoer = pd.date_range(første_dato, now, freq="d", normalize=True)
     aktive_statuser = ["VURDERES", "KONTAKTES", "KARTLEGGES", "VI_BISTÅR"]
-
-    data = pd.concat(
-        [
-            data_status[["saksnummer", "status", "endretTidspunkt"]],
-            data_eierskap[["saksnummer", "status", "endretTidspunkt"]],
-            (
-                data_leveranse[["saksnummer", "sistEndret"]]
-                .rename(columns={"sistEndret": "endretTidspunkt"})
-                .assign(status="VI_BISTÅR")
-            ),
-        ]
+    alle_antall_dager = (
+        antall_dager if isinstance(antall_dager, list) else [antall_dager]
     )
-    data = data.sort_values(
-        ["saksnummer", "endretTidspunkt"], ascending=True
-    ).reset_index()
-    data["aktiv_status"] = data.status.isin(aktive_statuser)
-    data.loc[
-        data.saksnummer == data.saksnummer.shift(-1),
-        "neste_endretTidspunkt",
-    ] = data.endretTidspunkt.shift(-1)
-    data.loc[
-        data.neste_endretTidspunkt.astype(str) == "NaT", "neste_endretTidspunkt"
-    ] = now
-    data["antall_dager"] = (data.neste_endretTidspunkt - data.endretTidspunkt).dt.days
-    data["mer_enn_x_dager"] = data.antall_dager > antall_dager
 
-    urørt_per_status_og_dato = dict(
-        zip(aktive_statuser, [[0] * len(alle_datoer)] * len(aktive_statuser))
+    intervaller = intervaller_mellom_endringer(
+        data_status, data_eierskap, data_leveranse, now
     )
 
-    for _, row in data[data.mer_enn_x_dager & data.aktiv_status].iterrows():
-        status = row["status"]
-        endretTidspunkt = row["endretTidspunkt"]
-        neste_endretTidspunkt = row["neste_endretTidspunkt"]
-
-        urørt_intervall = []
-        for dato in alle_datoer:
-            if (dato > endretTidspunkt + timedelta(days=antall_dager)) & (
-                dato < neste_endretTidspunkt
-            ):
-                urørt_intervall.append(1)
-            else:
-                urørt_intervall.append(0)
-        urørt_per_status_og_dato[status] = [
-            sum(x) for x in zip(urørt_per_status_og_dato[status], urørt_intervall)
-        ]
-
     fig = go.Figure()
 
-    for status in aktive_statuser:
-        fig.add_trace(
-            go.Scatter(
-                x=alle_datoer,
-                y=urørt_per_status_og_dato[status],
-                name=status.capitalize().replace("_", " "),
+    for index, dager in enumerate(alle_antall_dager):
+        urørt_per_status_og_dato = urørte_saker_per_dato(
+            intervaller, alle_datoer, dager, aktive_statuser
+        )
+        for status in aktive_statuser:
+            fig.add_trace(
+                go.Scatter(
+                    x=alle_datoer,
+                    y=urørt_per_status_og_dato[status].tolist(),
+                    name=status.capitalize().replace("_", " "),
+                    visible=None if index == 0 else False,
+                )
             )
+
+    if len(alle_antall_dager) > 1:
+        knapper = [
+            dict(
+                args=[
+                    {
+                        "visible": [
+                            trace_index // len(aktive_statuser) == knapp_index
+                            for trace_index in range(len(fig.data))
+                        ]
+                    }
+                ],
+                label=f"Urørt i mer enn {dager} dager",
+                method="update",
+            )
+            for knapp_index, dager in enumerate(alle_antall_dager)
+        ]
+        fig.update_layout(
+            updatemenus=[
+                dict(
+                    active=0,
+                    direction="down",
+                    buttons=knapper,
+                    showactive=True,
+                    xanchor="left",
+                    yanchor="top",
+                    x=0,
+                    y=1.3,
+                ),
+            ],
         )
 
     fig.update_layout(
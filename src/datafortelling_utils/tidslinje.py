@@ -0,0 +1,113 @@
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+
+def lag_tidslinje(hendelser: pd.DataFrame, nå: datetime | None = None) -> pd.DataFrame:
+    """
+    Lager tidslinjen til sakene: én rad per periode en sak har vært i en status, med
+    saksnummer, status, gyldig_fra og gyldig_til, og resultatomrade om hendelsene har det.
+    gyldig_til er tidspunktet for neste hendelse på saken. For siste hendelse er det nå,
+    eller NaT om nå ikke er oppgitt.
+    Hendelsene sorteres stabilt på sak og tidspunkt, så rekkefølgen fra preprocess_data_status
+    beholdes for hendelser med likt tidspunkt.
+    """
+    hendelser = hendelser.sort_values(
+        ["saksnummer", "endretTidspunkt"], kind="stable"
+    ).reset_index(drop=True)
+    gyldig_til = hendelser.endretTidspunkt.shift(-1).where(
+        hendelser.saksnummer == hendelser.saksnummer.shift(-1)
+    )
+    if nå is not None:
+        gyldig_til = gyldig_til.fillna(nå)
+
+    kolonner = ["saksnummer", "status"]
+    if "resultatomrade" in hendelser.columns:
+        kolonner.append("resultatomrade")
+    return (
+        hendelser[kolonner]
+        .astype("category")
+        .assign(gyldig_fra=hendelser.endretTidspunkt, gyldig_til=gyldig_til)
+    )
+
+
+def _sorterte_tidspunkter(tidspunkter: pd.Series) -> np.ndarray:
+    return np.sort(tidspunkter.dropna().to_numpy(dtype="datetime64[ns]"))
+
+
+def beholdning(
+    tidslinje: pd.DataFrame,
+    tidspunkter: pd.DatetimeIndex,
+    statuser: list[str],
+    gruppe: str | None = None,
+) -> pd.DataFrame:
+    """
+    Antall saker i hver status rett før hvert tidspunkt: perioder som startet før tidspunktet,
+    og ikke sluttet før det. Telles med binærsøk i sorterte start- og sluttidspunkter.
+    Med gruppe, f.eks. "resultatomrade", har kolonnene to nivåer (gruppe, status),
+    kun for grupper som finnes i tidslinjen.
+    """
+    tider = np.asarray(tidspunkter, dtype="datetime64[ns]")
+    nøkler = [gruppe, "status"] if gruppe else ["status"]
+    antall = {
+        nøkkel: np.searchsorted(
+            _sorterte_tidspunkter(perioder.gyldig_fra), tider, side="left"
+        )
+        - np.searchsorted(
+            _sorterte_tidspunkter(perioder.gyldig_til), tider, side="left"
+        )
+        for nøkkel, perioder in tidslinje.groupby(nøkler, observed=True)
+    }
+    resultat = pd.DataFrame(
+        antall,
+        index=tidspunkter,
+        columns=pd.MultiIndex.from_tuples(list(antall), names=nøkler),
+    )
+    if gruppe is None:
+        resultat.columns = resultat.columns.get_level_values("status")
+        return resultat.reindex(columns=statuser, fill_value=0)
+    grupper = resultat.columns.get_level_values(gruppe).unique()
+    return resultat.reindex(
+        columns=pd.MultiIndex.from_product([grupper, statuser]), fill_value=0
+    )
+
+
+def strømmer_per_periode(
+    tidslinje: pd.DataFrame, status: str, perioder: pd.PeriodIndex
+) -> pd.DataFrame:
+    """
+    Antall saker som gikk inn i (inn) og ut av (ut) statusen i hver periode, f.eks. måned.
+    """
+    i_status = tidslinje[tidslinje.status == status]
+    return pd.DataFrame(
+        {
+            retning: tidspunkt.dt.to_period(perioder.freq)
+            .value_counts()
+            .reindex(perioder, fill_value=0)
+            for retning, tidspunkt in [
+                ("inn", i_status.gyldig_fra),
+                ("ut", i_status.gyldig_til),
+            ]
+        }
+    )
+
+
+def status_på(tidslinje: pd.DataFrame, tidspunkt: datetime) -> pd.DataFrame:
+    """
+    Perioden hver sak var i rett før tidspunktet, for saker som fantes da.
+    """
+    return tidslinje[
+        (tidslinje.gyldig_fra < tidspunkt) & ~(tidslinje.gyldig_til < tidspunkt)
+    ].drop_duplicates("saksnummer", keep="last")
+
+
+def oppholdstid(tidslinje: pd.DataFrame, nå: datetime | None = None) -> pd.Series:
+    """
+    Antall dager hver periode i tidslinjen varte, for fordeling av tid i hver status.
+    Perioder som ikke er avsluttet regnes frem til nå, eller utelates om nå ikke er oppgitt.
+    """
+    gyldig_til = tidslinje.gyldig_til if nå is None else tidslinje.gyldig_til.fillna(nå)
+    return (
+        (gyldig_til - tidslinje.gyldig_fra).dt.total_seconds().dropna() / 60 / 60 / 24
+    )
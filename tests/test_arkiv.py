@@ -0,0 +1,69 @@
+import pytest
+
+from datafortelling_utils import arkiv
+from datafortelling_utils.arkiv import (
+    arkiver_dokumenter,
+    arkivversjon,
+    dokumentfiler,
+    hent_arkiverte_dokumenter,
+)
+
+side = "datafortelling/sak/norge"
+
+
+@pytest.fixture
+def pages(tmp_path):
+    pages = tmp_path / "pages"
+    (pages / f"{side}_files" / "libs").mkdir(parents=True)
+    (pages / "site_libs" / "quarto-nav").mkdir(parents=True)
+    (pages / f"{side}.html").write_text(
+        '<script src="../../site_libs/quarto-nav/quarto-nav.js"></script>'
+        '<link href="../../site_libs/bootstrap.min.css" rel="stylesheet">'
+        '<script src="norge_files/libs/plotly.js"></script>'
+        '<a href="../../index.html">Forside</a>'
+        '<a href="https://data.nav.no">NADA</a>'
+    )
+    (pages / f"{side}_files" / "libs" / "plotly.js").write_text("plotly")
+    (pages / "site_libs" / "quarto-nav" / "quarto-nav.js").write_text("nav")
+    (pages / "site_libs" / "bootstrap.min.css").write_text("css")
+    (pages / "site_libs" / "ubrukt.js").write_text("ubrukt")
+    (pages / "index.html").write_text("index")
+    return pages
+
+
+def test_dokumentfiler_har_ressurser_og_brukte_site_libs(pages):
+    assert [fil.as_posix() for fil in dokumentfiler(f"{side}.qmd", pages)] == [
+        f"{side}.html",
+        f"{side}_files/libs/plotly.js",
+        "site_libs/bootstrap.min.css",
+        "site_libs/quarto-nav/quarto-nav.js",
+    ]
+
+
+def test_arkivert_side_hentes_med_site_libs(pages, tmp_path):
+    arkiver_dokumenter(tmp_path / "arkiv", "saksflyt", "1", [f"{side}.qmd"], pages)
+    nye_pages = tmp_path / "nye_pages"
+
+    hentet = hent_arkiverte_dokumenter(tmp_path / "arkiv", "saksflyt", "1", nye_pages)
+
+    assert hentet == [f"{side}.qmd"]
+    assert (
+        nye_pages / "site_libs" / "quarto-nav" / "quarto-nav.js"
+    ).read_text() == "nav"
+    assert (nye_pages / f"{side}_files" / "libs" / "plotly.js").exists()
+    assert not (nye_pages / "site_libs" / "ubrukt.js").exists()
+
+
+def test_arkivversjon_endres_med_quarto_og_konfigurasjon(tmp_path, monkeypatch):
+    konfigurasjon = tmp_path / "_quarto.yml"
+    konfigurasjon.write_text("project:\n  type: website\n")
+    monkeypatch.setattr(arkiv, "quarto_versjon", lambda: "1.7.32")
+    versjon = arkivversjon("1", konfigurasjon)
+
+    monkeypatch.setattr(arkiv, "quarto_versjon", lambda: "1.8.0")
+    ny_quarto = arkivversjon("1", konfigurasjon)
+    konfigurasjon.write_text("project:\n  type: book\n")
+    ny_konfigurasjon = arkivversjon("1", konfigurasjon)
+
+    assert versjon.startswith("1-quarto1.7.32-")
+    assert len({versjon, ny_quarto, ny_konfigurasjon}) == 3
@@ -0,0 +1,282 @@
+from datetime import datetime
+
+import pandas as pd
+import pyarrow as pa
+import pytest
+from google.cloud import bigquery, bigquery_storage
+from google.cloud.bigquery.table import RowIterator
+
+from datafortelling_utils.datahandler import (
+    antall_i_intervaller_per_dato,
+    arrow_til_pandas,
+    intervaller_mellom_endringer,
+    last_ned_arrow,
+    preprocess_data_status,
+    urørte_saker_per_dato,
+)
+
+skjema = [
+    bigquery.SchemaField("saksnummer", "STRING"),
+    bigquery.SchemaField("antall", "INTEGER"),
+    bigquery.SchemaField("aktiv", "BOOLEAN"),
+    bigquery.SchemaField("andel", "FLOAT"),
+    bigquery.SchemaField("tidsstempel", "TIMESTAMP"),
+    bigquery.SchemaField("endretTidspunkt", "DATETIME"),
+]
+
+# Samme rader som BigQuery sender over REST API (tabledata.list) og som Arrow fra Storage Read API
+rest_rader = [
+    ["A1", "3", "true", "0.5", "1767225600000000", "2026-01-01T10:00:00"],
+    ["B2", None, "false", None, "1767312000500000", "2026-01-02T11:30:00.500000"],
+    [None, "-7", None, "1.25", None, None],
+]
+arrow_skjema = pa.schema(
+    [
+        ("saksnummer", pa.string()),
+        ("antall", pa.int64()),
+        ("aktiv", pa.bool_()),
+        ("andel", pa.float64()),
+        ("tidsstempel", pa.timestamp("us", tz="UTC")),
+        ("endretTidspunkt", pa.timestamp("us")),
+    ]
+)
+
+
+@pytest.fixture
+def arrow_ipc(tmp_path):
+    """
+    Arrow IPC-fil med radene i to record batches, i stedet for strømmene fra Storage Read API.
+    """
+    tabell = pa.table(
+        {
+            "saksnummer": ["A1", "B2", None],
+            "antall": [3, None, -7],
+            "aktiv": [True, False, None],
+            "andel": [0.5, None, 1.25],
+            "tidsstempel": [
+                pd.Timestamp("2026-01-01", tz="UTC"),
+                pd.Timestamp("2026-01-02 00:00:00.5", tz="UTC"),
+                None,
+            ],
+            "endretTidspunkt": [
+                pd.Timestamp("2026-01-01 10:00"),
+                pd.Timestamp("2026-01-02 11:30:00.5"),
+                None,
+            ],
+        },
+        schema=arrow_skjema,
+    )
+    fil = tmp_path / "resultat.arrow"
+    with pa.ipc.new_file(fil, arrow_skjema) as skriver:
+        for batch in tabell.to_batches(max_chunksize=2):
+            skriver.write_batch(batch)
+    return fil
+
+
+class IpcRader:
+    def __init__(self, fil):
+        self.fil = fil
+        self.total_rows = pa.ipc.open_file(fil).read_all().num_rows
+        self.kall = []
+
+    def to_arrow_iterable(self, bqstorage_client=None, max_stream_count=None):
+        self.kall.append((bqstorage_client, max_stream_count))
+        leser = pa.ipc.open_file(self.fil)
+        for i in range(leser.num_record_batches):
+            yield leser.get_batch(i)
+
+
+class IpcJobb:
+    def __init__(self, rader):
+        self.rader = rader
+
+    def result(self):
+        return self.rader
+
+
+def test_strømmet_arrow_gir_samme_data_som_rest(arrow_ipc, monkeypatch):
+    klient = object()
+    monkeypatch.setattr(bigquery_storage, "BigQueryReadClient", lambda: klient)
+    rader = IpcRader(arrow_ipc)
+
+    strømmet = arrow_til_pandas(last_ned_arrow(IpcJobb(rader), "tabell"))
+    rest = RowIterator(
+        client=None,
+        api_request=None,
+        path="/",
+        schema=skjema,
+        first_page_response={
+            "rows": [{"f": [{"v": v} for v in rad]} for rad in rest_rader]
+        },
+        total_rows=len(rest_rader),
+    ).to_dataframe(create_bqstorage_client=False)
+
+    assert rader.kall == [(klient, 4)]
+    pd.testing.assert_frame_equal(
+        strømmet, rest.astype({"saksnummer": pd.StringDtype(storage="pyarrow")})
+    )
+
+
+def test_rest_når_storage_api_ikke_er_installert(arrow_ipc, monkeypatch):
+    def ikke_installert():
+        raise ImportError
+
+    monkeypatch.setattr(bigquery_storage, "BigQueryReadClient", ikke_installert)
+    rader = IpcRader(arrow_ipc)
+
+    tabell = last_ned_arrow(IpcJobb(rader), "tabell")
+
+    assert rader.kall == [(None, 4)]
+    assert tabell.num_rows == 3
+
+
+def test_antall_i_intervaller_per_dato():
+    datoer = pd.date_range("2024-01-01", "2024-01-05")
+    intervaller = pd.DataFrame(
+        [
+            ("2024-01-01", "2024-01-03", "X"),  # 2. jan
+            ("2023-12-31", "2024-01-05 12:00", "X"),  # 1.-5. jan
+            ("2024-01-02 12:00", "2024-01-04", "Y"),  # 3. jan
+            ("2024-01-03", "2024-01-03", "Y"),  # tomt
+            ("2024-01-04", "2024-01-10", "Y"),  # 5. jan
+            ("2024-01-01", "2024-01-10", "Z"),  # ikke med i grupper
+        ],
+        columns=["start", "slutt", "gruppe"],
+    ).astype({"start": "datetime64[us]", "slutt": "datetime64[us]"})
+
+    antall = antall_i_intervaller_per_dato(
+        datoer,
+        start=intervaller.start,
+        slutt=intervaller.slutt,
+        gruppe=intervaller.gruppe,
+        grupper=["X", "Y"],
+    )
+
+    pd.testing.assert_frame_equal(
+        antall,
+        pd.DataFrame({"X": [1, 2, 1, 1, 1], "Y": [0, 0, 1, 0, 1]}, index=datoer),
+        check_dtype=False,
+    )
+
+
+def test_urørte_saker_teller_saker_som_ikke_er_endret_siden_frem_til_nå():
+    data_status = pd.DataFrame(
+        {
+            "saksnummer": ["S1", "S1"],
+            "status": ["NY", "KONTAKTES"],
+            "endretTidspunkt": pd.to_datetime(["2024-01-01", "2024-01-20"]),
+        }
+    )
+    tom = data_status.iloc[:0]
+    tom_leveranse = pd.DataFrame({"saksnummer": [], "sistEndret": pd.to_datetime([])})
+    nå = datetime(2024, 2, 1)
+    datoer = pd.date_range("2024-01-01", nå)
+
+    urørte = urørte_saker_per_dato(
+        intervaller_mellom_endringer(data_status, tom, tom_leveranse, nå),
+        datoer,
+        antall_dager=5,
+        statuser=["NY", "KONTAKTES"],
+    )
+
+    # NY 1.-20. jan er urørt fra 7. til 19. jan, KONTAKTES fra 20. jan er urørt fra 26. til 31. jan
+    assert urørte.index[urørte.NY == 1].equals(
+        pd.date_range("2024-01-07", "2024-01-19")
+    )
+    assert urørte.index[urørte.KONTAKTES == 1].equals(
+        pd.date_range("2024-01-26", "2024-01-31")
+    )
+    assert urørte.to_numpy().max() == 1
+
+
+def hendelser(*saker: tuple[str, list[tuple[str, str]]]) -> pd.DataFrame:
+    """
+    Statusendringer per sak som (hendelse, status), med ett minutts mellomrom.
+    """
+    return pd.DataFrame(
+        [
+            (
+                saksnummer,
+                hendelse,
+                status,
+                pd.Timestamp("2024-01-01") + pd.Timedelta(minutes=i),
+            )
+            for saksnummer, endringer in saker
+            for i, (hendelse, status) in enumerate(endringer)
+        ],
+        columns=["saksnummer", "hendelse", "status", "endretTidspunkt"],
+    )
+
+
+def statuser_etter_tilbake(data: pd.DataFrame) -> dict[str, list[tuple[str, int]]]:
+    """
+    Status og minutt for radene som er igjen per sak.
+    """
+    return {
+        saksnummer: [
+            (rad.status, rad.endretTidspunkt.minute) for rad in sak.itertuples()
+        ]
+        for saksnummer, sak in data.groupby("saksnummer")
+    }
+
+
+def test_tilbake_angrer_siste_rad_som_ikke_er_angret():
+    data = hendelser(
+        (
+            "enkel",
+            [
+                ("OPPRETT_SAK_FOR_VIRKSOMHET", "NY"),
+                ("VIRKSOMHET_VURDERES", "VURDERES"),
+                ("VIRKSOMHET_SKAL_KONTAKTES", "KONTAKTES"),
+                ("TILBAKE", "VURDERES"),
+                ("VIRKSOMHET_SKAL_KONTAKTES", "KONTAKTES"),
+                ("VIRKSOMHET_KARTLEGGES", "KARTLEGGES"),
+            ],
+        ),
+        (
+            "dobbel",
+            [
+                ("OPPRETT_SAK_FOR_VIRKSOMHET", "NY"),
+                ("VIRKSOMHET_VURDERES", "VURDERES"),
+                ("VIRKSOMHET_SKAL_KONTAKTES", "KONTAKTES"),
+                ("TILBAKE", "VURDERES"),
+                ("TILBAKE", "NY"),
+                ("VIRKSOMHET_VURDERES", "VURDERES"),
+            ],
+        ),
+        (
+            "to_ganger",
+            [
+                ("OPPRETT_SAK_FOR_VIRKSOMHET", "NY"),
+                ("VIRKSOMHET_VURDERES", "VURDERES"),
+                ("TILBAKE", "NY"),
+                ("VIRKSOMHET_VURDERES", "VURDERES"),
+                ("VIRKSOMHET_SKAL_KONTAKTES", "KONTAKTES"),
+                ("TILBAKE", "VURDERES"),
+                ("VIRKSOMHET_ER_IKKE_AKTUELL", "IKKE_AKTUELL"),
+            ],
+        ),
+        (
+            "feil_tilbake",
+            [
+                ("OPPRETT_SAK_FOR_VIRKSOMHET", "NY"),
+                ("VIRKSOMHET_VURDERES", "VURDERES"),
+                ("TILBAKE", "VURDERES"),
+            ],
+        ),
+    )
+
+    resultat = preprocess_data_status(data.sample(frac=1, random_state=1))
+
+    assert statuser_etter_tilbake(resultat) == {
+        "enkel": [("NY", 0), ("VURDERES", 1), ("KONTAKTES", 4), ("KARTLEGGES", 5)],
+        "dobbel": [("NY", 0), ("VURDERES", 5)],
+        "to_ganger": [("NY", 0), ("VURDERES", 3), ("IKKE_AKTUELL", 6)],
+        # Tilbake som ikke endret status fjernes uten å angre noe
+        "feil_tilbake": [("NY", 0), ("VURDERES", 1)],
+    }
+    enkel = resultat[resultat.saksnummer == "enkel"]
+    assert enkel.forrige_status.tolist()[1:] == ["NY", "VURDERES", "KONTAKTES"]
+    assert (enkel.siste_status == "KARTLEGGES").all()
+    assert enkel.aktiv_sak.all()
+    assert not resultat[resultat.saksnummer == "to_ganger"].aktiv_sak.any()
@@ -0,0 +1,42 @@
+import pandas as pd
+import pytest
+
+from datafortelling_utils import dataloader
+from datafortelling_utils.dataloader import geografisk_oppslag, geografisk_oppslag_fil
+from datafortelling_utils.snapshot import SNAPSHOT_MILJØVARIABEL
+
+
+@pytest.fixture(autouse=True)
+def tom_cache():
+    geografisk_oppslag.cache_clear()
+    yield
+    geografisk_oppslag.cache_clear()
+
+
+def test_geografisk_oppslag_lagres_i_snapshot_og_leses_derfra(tmp_path, monkeypatch):
+    monkeypatch.setenv(SNAPSHOT_MILJØVARIABEL, str(tmp_path))
+    bygget = geografisk_oppslag()
+    fil = geografisk_oppslag_fil()
+    assert fil.parent == tmp_path / "oppslag"
+    assert fil.exists()
+
+    geografisk_oppslag.cache_clear()
+    monkeypatch.setattr(dataloader, "_regional_tilhørighet", None)
+    pd.testing.assert_frame_equal(geografisk_oppslag(), bygget)
+
+
+def test_ny_fil_når_csv_endres(tmp_path, monkeypatch):
+    monkeypatch.setenv(SNAPSHOT_MILJØVARIABEL, str(tmp_path))
+    fil = geografisk_oppslag_fil()
+    csv = tmp_path / "administrative_enheter.csv"
+    csv.write_bytes(dataloader.ADMINISTRATIVE_ENHETER.read_bytes() + b"\n")
+    monkeypatch.setattr(dataloader, "ADMINISTRATIVE_ENHETER", csv)
+
+    assert geografisk_oppslag_fil() != fil
+
+
+def test_ingen_fil_uten_snapshot(monkeypatch):
+    monkeypatch.delenv(SNAPSHOT_MILJØVARIABEL, raising=False)
+
+    assert geografisk_oppslag_fil() is None
+    assert not geografisk_oppslag().empty
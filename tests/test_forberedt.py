@@ -0,0 +1,94 @@
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from datafortelling_utils.datakilde import DATAKILDE_MILJØVARIABEL, DuckDBDatakilde
+from datafortelling_utils.forberedt import (
+    FORBEREDT_MILJØVARIABEL,
+    forbered_data,
+    last_inn_saksflyt,
+    last_inn_samarbeidsdata,
+)
+from datafortelling_utils.konstanter import Resultatområde
+from datafortelling_utils.snapshot import tabell_filnavn
+from datafortelling_utils.syntetisk import lag_syntetiske_tabeller
+
+
+@pytest.fixture
+def flyttet_sak(tmp_path):
+    """
+    Syntetiske data der en sak med samarbeid flytter fra Oslo til Rogaland etter første hendelse.
+    Returnerer katalogen med parquet-filene og saksnummeret.
+    """
+    tabeller = lag_syntetiske_tabeller(300, slutt="2026-03-01", seed=1)
+    statistikk = tabeller["ia-sak-statistikk-v1"].to_pandas()
+    samarbeid = tabeller["samarbeid-v1"].to_pandas()
+    i_oslo = statistikk.groupby("saksnummer").fylkesnummer.agg(
+        lambda fylker: (fylker == "03").all()
+    )
+    kandidater = statistikk[
+        statistikk.saksnummer.isin(i_oslo.index[i_oslo])
+        & statistikk.saksnummer.isin(samarbeid.saksnummer)
+    ]
+    saksnummer = kandidater.groupby("saksnummer").size().idxmax()
+
+    sak = statistikk[statistikk.saksnummer == saksnummer].sort_values("endretTidspunkt")
+    etter_første = sak.index[sak.endretTidspunkt > sak.endretTidspunkt.min()]
+    statistikk.loc[etter_første, ["fylkesnummer", "kommunenummer"]] = ["11", "1103"]
+    tabeller["ia-sak-statistikk-v1"] = pa.Table.from_pandas(
+        statistikk,
+        schema=tabeller["ia-sak-statistikk-v1"].schema,
+        preserve_index=False,
+    )
+
+    for table, tabell in tabeller.items():
+        pq.write_table(tabell, tmp_path / tabell_filnavn(table))
+    return tmp_path, saksnummer
+
+
+def test_sak_som_flytter_har_kun_historikken_i_hvert_resultatområde(
+    flyttet_sak, tmp_path, monkeypatch
+):
+    kilde, saksnummer = flyttet_sak
+    forberedt = tmp_path / "forberedt"
+    forbered_data(
+        project="p", dataset="d", katalog=forberedt, datakilde=DuckDBDatakilde(kilde)
+    )
+    monkeypatch.setenv(DATAKILDE_MILJØVARIABEL, str(kilde))
+
+    for resultatområde in [None, Resultatområde.OSLO, Resultatområde.ROGALAND]:
+        monkeypatch.delenv(FORBEREDT_MILJØVARIABEL, raising=False)
+        lastet = [
+            last_inn_saksflyt("p", "d", resultatområde),
+            *last_inn_samarbeidsdata("p", "d", resultatområde),
+        ]
+        monkeypatch.setenv(FORBEREDT_MILJØVARIABEL, str(forberedt))
+        lest = [
+            last_inn_saksflyt("p", "d", resultatområde),
+            *last_inn_samarbeidsdata("p", "d", resultatområde),
+        ]
+
+        # Samme utsnitt som når resultatområdet lastes inn alene.
+        # Kategoriene er str etter parquet og string fra DuckDB, så dtype sammenlignes ikke.
+        for fra_forberedt, fra_kilde in zip(lest, lastet, strict=True):
+            pd.testing.assert_frame_equal(
+                fra_forberedt,
+                fra_kilde.reset_index(drop=True),
+                check_dtype=False,
+                check_categorical=False,
+            )
+
+        status, samarbeid, _, _ = lest
+        sak = status[status.saksnummer == saksnummer]
+        if resultatområde is None:
+            assert set(sak.resultatomrade) == {"oslo", "rogaland"}
+            assert (
+                samarbeid[samarbeid.saksnummer == saksnummer].resultatomrade
+                == "rogaland"
+            ).all()
+        else:
+            # Saken har kun radene i resultatområdet, og statusen den hadde der
+            assert set(sak.resultatomrade) == {resultatområde.value}
+            assert (sak.siste_status == sak.status.iloc[-1]).all()
+            assert (samarbeid.saksnummer == saksnummer).any()
@@ -0,0 +1,157 @@
+import http.server
+import re
+import threading
+
+import pytest
+import requests
+
+from datafortelling_utils import opplasting
+from datafortelling_utils.opplasting import (
+    finn_filer,
+    last_opp_endringer,
+    les_publisert,
+)
+
+filnavn_re = re.compile(rb'filename="([^"]+)"')
+
+
+class NadaStandIn(http.server.ThreadingHTTPServer):
+    """
+    Lokal HTTP-server i stedet for quarto/update i NADA. Lagrer metode og filnavn i hver
+    forespørsel, og svarer med statuskodene i svar etter tur, deretter 200.
+    """
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), NadaHandler)
+        self.forespørsler: list[tuple[str, list[str]]] = []
+        self.svar: list[int] = []
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/quarto/update/1"
+
+
+class NadaHandler(http.server.BaseHTTPRequestHandler):
+    def _håndter(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        filer = [navn.decode() for navn in filnavn_re.findall(body)]
+        self.server.forespørsler.append((self.command, filer))
+        self.send_response(self.server.svar.pop(0) if self.server.svar else 200)
+        self.end_headers()
+
+    do_PUT = do_PATCH = _håndter
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def nada():
+    server = NadaStandIn()
+    tråd = threading.Thread(target=server.serve_forever, daemon=True)
+    tråd.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def pages(tmp_path, monkeypatch):
+    monkeypatch.setattr(opplasting, "VENTETID_SEKUNDER", 0)
+    pages = tmp_path / "pages"
+    (pages / "figurer").mkdir(parents=True)
+    (pages / "index.html").write_text("index")
+    (pages / "side.html").write_text("side")
+    (pages / "figurer" / "0.json.gz").write_bytes(b"figur")
+    return pages
+
+
+def publiser(nada, pages, lager, delvis=True):
+    last_opp_endringer(nada.url, "token", finn_filer(pages), lager, delvis=delvis)
+
+
+def test_første_publisering_laster_opp_alt_med_put(nada, pages, tmp_path):
+    publiser(nada, pages, tmp_path / "lager")
+
+    assert nada.forespørsler == [
+        ("PUT", ["figurer/0.json.gz", "index.html", "side.html"])
+    ]
+    assert les_publisert(tmp_path / "lager", nada.url).keys() == {
+        "figurer/0.json.gz",
+        "index.html",
+        "side.html",
+    }
+
+
+def test_ingen_opplasting_uten_endringer(nada, pages, tmp_path):
+    publiser(nada, pages, tmp_path / "lager")
+    publiser(nada, pages, tmp_path / "lager")
+
+    assert len(nada.forespørsler) == 1
+
+
+def test_patch_med_kun_endrede_filer_oppdaterer_manifestet(nada, pages, tmp_path):
+    publiser(nada, pages, tmp_path / "lager")
+    før = les_publisert(tmp_path / "lager", nada.url)
+    (pages / "side.html").write_text("ny side")
+    publiser(nada, pages, tmp_path / "lager")
+
+    assert nada.forespørsler[1] == ("PATCH", ["side.html"])
+    etter = les_publisert(tmp_path / "lager", nada.url)
+    assert etter["side.html"] != før["side.html"]
+    assert etter["index.html"] == før["index.html"]
+
+
+def test_put_uten_delvis_opplasting(nada, pages, tmp_path):
+    publiser(nada, pages, tmp_path / "lager")
+    (pages / "side.html").write_text("ny side")
+    publiser(nada, pages, tmp_path / "lager", delvis=False)
+
+    assert nada.forespørsler[1] == (
+        "PUT",
+        ["figurer/0.json.gz", "index.html", "side.html"],
+    )
+
+
+def test_put_når_patch_avvises_med_405(nada, pages, tmp_path):
+    publiser(nada, pages, tmp_path / "lager")
+    (pages / "side.html").write_text("ny side")
+    nada.svar = [405]
+    publiser(nada, pages, tmp_path / "lager")
+
+    assert [metode for metode, _ in nada.forespørsler] == ["PUT", "PATCH", "PUT"]
+    assert nada.forespørsler[2][1] == ["figurer/0.json.gz", "index.html", "side.html"]
+
+
+def test_put_når_side_er_fjernet(nada, pages, tmp_path):
+    publiser(nada, pages, tmp_path / "lager")
+    (pages / "side.html").unlink()
+    publiser(nada, pages, tmp_path / "lager")
+
+    assert nada.forespørsler[1] == ("PUT", ["figurer/0.json.gz", "index.html"])
+
+
+def test_patch_når_kun_figurer_er_fjernet(nada, pages, tmp_path):
+    publiser(nada, pages, tmp_path / "lager")
+    (pages / "figurer" / "0.json.gz").unlink()
+    (pages / "side.html").write_text("ny side")
+    publiser(nada, pages, tmp_path / "lager")
+
+    assert nada.forespørsler[1] == ("PATCH", ["side.html"])
+
+
+def test_prøver_på_nytt_ved_503(nada, pages, tmp_path):
+    nada.svar = [503, 503]
+    publiser(nada, pages, tmp_path / "lager")
+
+    assert [metode for metode, _ in nada.forespørsler] == ["PUT", "PUT", "PUT"]
+    assert les_publisert(tmp_path / "lager", nada.url) is not None
+
+
+def test_feiler_uten_manifest_når_alle_forsøk_feiler(nada, pages, tmp_path):
+    nada.svar = [503] * opplasting.ANTALL_FORSØK
+    with pytest.raises(requests.RequestException):
+        publiser(nada, pages, tmp_path / "lager")
+
+    assert len(nada.forespørsler) == opplasting.ANTALL_FORSØK
+    assert les_publisert(tmp_path / "lager", nada.url) is None
@@ -0,0 +1,151 @@
+import json
+import os
+import subprocess
+import sys
+import textwrap
+from pathlib import Path
+
+import pytest
+
+from datafortelling_utils.rendering import (
+    PROSJEKTFILER,
+    flett_inn_output,
+    minnebehov,
+    prosesstre_minne_mb,
+    render_dokumenter,
+)
+
+sider = [f"datafortelling/sak/{område}" for område in ["norge", "agder", "oslo"]]
+
+
+def søkeoppføringer(side: str, tekst: str) -> list[dict]:
+    return [
+        {"href": f"{side}.html", "title": tekst, "text": tekst},
+        {"href": f"{side}.html#seksjon", "title": tekst, "text": tekst},
+    ]
+
+
+def les_søkeindeks(pages: Path) -> dict[str, str]:
+    with open(pages / "search.json", encoding="utf-8") as f:
+        return {oppføring["href"]: oppføring["text"] for oppføring in json.load(f)}
+
+
+def test_flett_inn_output_erstatter_kun_siden_som_er_rendret(tmp_path):
+    pages = tmp_path / "pages"
+    (pages / f"{sider[0]}_files" / "gammel").mkdir(parents=True)
+    (pages / f"{sider[0]}.html").write_text("gammel")
+    (pages / "site_libs").mkdir()
+    (pages / "site_libs" / "quarto.js").write_text("index")
+    (pages / "search.json").write_text(
+        json.dumps(
+            søkeoppføringer("index", "forside") + søkeoppføringer(sider[0], "gammel")
+        )
+    )
+    prosjekt = tmp_path / "kopi"
+    fra = prosjekt / "pages"
+    (fra / f"{sider[0]}_files" / "ny").mkdir(parents=True)
+    (fra / f"{sider[0]}.html").write_text("ny")
+    (fra / "site_libs").mkdir()
+    (fra / "site_libs" / "plotly.js").write_text("plotly")
+    (fra / "search.json").write_text(
+        json.dumps(søkeoppføringer("index", "kopi") + søkeoppføringer(sider[0], "ny"))
+    )
+
+    flett_inn_output(f"{sider[0]}.qmd", prosjekt, pages)
+
+    assert (pages / f"{sider[0]}.html").read_text() == "ny"
+    assert [fil.name for fil in (pages / f"{sider[0]}_files").iterdir()] == ["ny"]
+    assert sorted(fil.name for fil in (pages / "site_libs").iterdir()) == [
+        "plotly.js",
+        "quarto.js",
+    ]
+    assert les_søkeindeks(pages) == {
+        "index.html": "forside",
+        "index.html#seksjon": "forside",
+        f"{sider[0]}.html": "ny",
+        f"{sider[0]}.html#seksjon": "ny",
+    }
+
+
+def test_dokumenter_uten_måling_får_hele_budsjettet():
+    assert minnebehov(["målt", "stor", "ny"], 4000, {"målt": 800, "stor": 5000}) == {
+        "målt": 1000,
+        "stor": 4000,
+        "ny": 4000,
+    }
+
+
+@pytest.mark.skipif(not Path("/proc/self/status").exists(), reason="krever /proc")
+def test_prosesstre_minne_er_summen_for_barnebarn():
+    # Barnet starter et barnebarn som holder 200 MB, og venter på det
+    barnebarn = "b = bytearray(200 * 1024 * 1024); print(flush=True); input()"
+    barn = (
+        f"import subprocess, sys; subprocess.run([sys.executable, '-c', {barnebarn!r}])"
+    )
+    prosess = subprocess.Popen(
+        [sys.executable, "-c", barn],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    try:
+        prosess.stdout.readline()
+        assert prosesstre_minne_mb(prosess.pid) > 200
+    finally:
+        prosess.communicate("\n")
+
+
+@pytest.fixture
+def prosjekt(tmp_path, monkeypatch):
+    """
+    Prosjekt med en quarto som skriver html og search.json i pages der den kjøres, som quarto
+    gjør for en nettside: oppføringene for andre sider i search.json beholdes.
+    """
+    for navn in PROSJEKTFILER:
+        if Path(navn).suffix:
+            (tmp_path / navn).write_text(navn)
+        else:
+            (tmp_path / navn).mkdir()
+    (tmp_path / "bin").mkdir()
+    quarto = tmp_path / "bin" / "quarto"
+    quarto.write_text(
+        f"#!{sys.executable}\n"
+        + textwrap.dedent(
+            """
+            import json, sys
+            from pathlib import Path
+
+            side = sys.argv[2].removesuffix(".qmd")
+            html = Path("pages") / f"{side}.html"
+            html.parent.mkdir(parents=True, exist_ok=True)
+            html.write_text(side)
+            indeks = Path("pages") / "search.json"
+            oppføringer = json.loads(indeks.read_text()) if indeks.exists() else []
+            oppføringer = [o for o in oppføringer if o["href"] != f"{side}.html"]
+            indeks.write_text(json.dumps(oppføringer + [{"href": f"{side}.html", "text": side}]))
+            """
+        )
+    )
+    quarto.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{tmp_path / 'bin'}{os.pathsep}{os.environ['PATH']}")
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def test_parallell_rendering_gir_søkeindeks_med_alle_sider(prosjekt):
+    subprocess.run(["quarto", "render", "index.qmd"], check=True)
+
+    resultater = render_dokumenter(
+        [f"{side}.qmd" for side in sider],
+        minnebudsjett=3000,
+        målinger={f"{side}.qmd": 100 for side in sider},
+    )
+
+    assert all(resultat["ok"] for resultat in resultater)
+    assert les_søkeindeks(prosjekt / "pages") == {
+        "index.html": "index",
+        **{f"{side}.html": side for side in sider},
+    }
+    assert sorted(fil.name for fil in (prosjekt / "pages").rglob("*.html")) == sorted(
+        ["index.html", "norge.html", "agder.html", "oslo.html"]
+    )
@@ -0,0 +1,142 @@
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+from datafortelling_utils.tidslinje import (
+    beholdning,
+    lag_tidslinje,
+    oppholdstid,
+    status_på,
+    strømmer_per_periode,
+)
+
+nå = datetime(2024, 1, 20)
+statuser = ["NY", "VURDERES", "KONTAKTES", "FULLFØRT"]
+
+
+@pytest.fixture
+def hendelser():
+    """
+    S1: NY 1. jan, VURDERES 5. jan, KONTAKTES 10. jan (agder)
+    S2: NY og VURDERES samtidig 3. jan (oslo)
+    S3: NY 8. jan (oslo)
+    Radene er stokket, men NY kommer før VURDERES for S2 som fra preprocess_data_status.
+    """
+    return pd.DataFrame(
+        [
+            ("S3", "NY", "2024-01-08", "oslo"),
+            ("S1", "KONTAKTES", "2024-01-10", "agder"),
+            ("S2", "NY", "2024-01-03", "oslo"),
+            ("S1", "NY", "2024-01-01", "agder"),
+            ("S2", "VURDERES", "2024-01-03", "oslo"),
+            ("S1", "VURDERES", "2024-01-05", "agder"),
+        ],
+        columns=["saksnummer", "status", "endretTidspunkt", "resultatomrade"],
+    ).astype({"endretTidspunkt": "datetime64[us]"})
+
+
+def test_lag_tidslinje(hendelser):
+    tidslinje = lag_tidslinje(hendelser, nå)
+
+    assert tidslinje[["saksnummer", "status"]].astype(str).values.tolist() == [
+        ["S1", "NY"],
+        ["S1", "VURDERES"],
+        ["S1", "KONTAKTES"],
+        ["S2", "NY"],
+        ["S2", "VURDERES"],
+        ["S3", "NY"],
+    ]
+    assert tidslinje.gyldig_til.dt.day.tolist() == [5, 10, 20, 3, 20, 20]
+    assert lag_tidslinje(hendelser).gyldig_til.isna().tolist() == [
+        False,
+        False,
+        True,
+        False,
+        True,
+        True,
+    ]
+
+
+def test_beholdning(hendelser):
+    tidspunkter = pd.to_datetime(
+        [
+            "2024-01-01",
+            "2024-01-03",
+            "2024-01-05",
+            "2024-01-09",
+            "2024-01-20",
+            "2024-01-21",
+        ]
+    )
+
+    antall = beholdning(lag_tidslinje(hendelser, nå), tidspunkter, statuser)
+
+    # Rett før hvert tidspunkt: S2 var NY i null tid 3. jan, og regnes ikke med 5. jan
+    pd.testing.assert_frame_equal(
+        antall,
+        pd.DataFrame(
+            {
+                "NY": [0, 1, 1, 1, 1, 0],
+                "VURDERES": [0, 0, 1, 2, 1, 0],
+                "KONTAKTES": [0, 0, 0, 0, 1, 0],
+                "FULLFØRT": [0, 0, 0, 0, 0, 0],
+            },
+            index=tidspunkter,
+        ).rename_axis(columns="status"),
+        check_dtype=False,
+    )
+
+
+def test_beholdning_per_resultatområde(hendelser):
+    tidspunkter = pd.to_datetime(["2024-01-09"])
+
+    antall = beholdning(
+        lag_tidslinje(hendelser, nå), tidspunkter, statuser, gruppe="resultatomrade"
+    )
+
+    assert antall.iloc[0].to_dict() == {
+        ("agder", "NY"): 0,
+        ("agder", "VURDERES"): 1,
+        ("agder", "KONTAKTES"): 0,
+        ("agder", "FULLFØRT"): 0,
+        ("oslo", "NY"): 1,
+        ("oslo", "VURDERES"): 1,
+        ("oslo", "KONTAKTES"): 0,
+        ("oslo", "FULLFØRT"): 0,
+    }
+
+
+def test_status_på(hendelser):
+    def status(tidslinje, tidspunkt):
+        rader = status_på(tidslinje, tidspunkt)
+        return dict(zip(rader.saksnummer.astype(str), rader.status.astype(str)))
+
+    tidslinje = lag_tidslinje(hendelser, nå)
+
+    # S3 fantes ikke før 8. jan, og S2 var VURDERES fra samme tidspunkt som den ble opprettet
+    assert status(tidslinje, datetime(2024, 1, 5)) == {"S1": "NY", "S2": "VURDERES"}
+    assert status(tidslinje, datetime(2024, 1, 3)) == {"S1": "NY"}
+    assert status(tidslinje, datetime(2024, 1, 21)) == {}
+    # Uten nå varer siste status for alltid
+    assert status(lag_tidslinje(hendelser), datetime(2024, 2, 1)) == {
+        "S1": "KONTAKTES",
+        "S2": "VURDERES",
+        "S3": "NY",
+    }
+
+
+def test_strømmer_per_periode(hendelser):
+    perioder = pd.period_range("2024-01", "2024-02", freq="M")
+
+    strømmer = strømmer_per_periode(lag_tidslinje(hendelser), "VURDERES", perioder)
+
+    assert strømmer.inn.tolist() == [2, 0]
+    assert strømmer.ut.tolist() == [1, 0]
+
+
+def test_oppholdstid(hendelser):
+    tidslinje = lag_tidslinje(hendelser)
+
+    assert oppholdstid(tidslinje).tolist() == [4, 5, 0]
+    assert oppholdstid(tidslinje, nå).tolist() == [4, 5, 10, 0, 17, 12]